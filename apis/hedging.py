@@ -0,0 +1,181 @@
+# apis/hedging.py
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+from utils.constants import HEDGE_CONFIG
+
+
+class _EndpointLatency:
+    """엔드포인트별 최근 응답 시간과 헤지 지연 (백분위수는 일정 표본마다 다시 계산)"""
+    
+    __slots__ = ('samples', 'since_update', 'delay', 'requests', 'hedged', 'hedge_wins')
+    
+    def __init__(self):
+        self.samples = deque(maxlen=HEDGE_CONFIG['WINDOW'])
+        self.since_update = 0
+        self.delay: Optional[float] = None  # 표본이 부족하면 None (헤지하지 않음)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+    
+    def record(self, latency: float):
+        self.samples.append(latency)
+        self.since_update += 1
+        if len(self.samples) < HEDGE_CONFIG['MIN_SAMPLES']:
+            return
+        if self.delay is None or self.since_update >= HEDGE_CONFIG['RECOMPUTE_EVERY']:
+            ordered = sorted(self.samples)
+            index = min(int(len(ordered) * HEDGE_CONFIG['PERCENTILE']), len(ordered) - 1)
+            self.delay = min(max(ordered[index], HEDGE_CONFIG['MIN_DELAY']), HEDGE_CONFIG['MAX_DELAY'])
+            self.since_update = 0
+
+
+class RequestHedger:
+    """
+    멱등 GET 요청 헤징
+    
+    요청이 엔드포인트별 최근 응답 시간 백분위수(PERCENTILE)를 넘도록 끝나지 않으면 같은 요청을 한 번 더 보내고
+    먼저 성공한 응답을 쓴다. 헤지 요청은 전체 요청 수의 BUDGET_RATIO 비율 토큰 버킷 안에서만 보내므로
+    업스트림 부하 증가는 그 비율 이하로 제한된다. 늦게 끝난 쪽 결과는 버린다.
+    """
+    
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or HEDGE_CONFIG['MAX_WORKERS']
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, _EndpointLatency] = {}
+        self._tokens = float(HEDGE_CONFIG['BUDGET_BURST'])
+        self._running = 0
+        self.budget_denied = 0
+        self.saturated = 0
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='tago-hedge')
+        return self._executor
+    
+    def _endpoint(self, endpoint: str) -> _EndpointLatency:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            with self._lock:
+                stats = self._endpoints.setdefault(endpoint, _EndpointLatency())
+        return stats
+    
+    def _timed(self, stats: _EndpointLatency, fn: Callable[[], Any]) -> Any:
+        started = time.monotonic()
+        try:
+            result = fn()
+        finally:
+            with self._lock:
+                self._running -= 1
+        # 실패는 응답 시간 분포에서 제외 (타임아웃이 지연을 끌어올리지 않게)
+        with self._lock:
+            stats.record(time.monotonic() - started)
+        return result
+    
+    def _submit(self, stats: _EndpointLatency, fn: Callable[[], Any]):
+        # 호출 스레드의 컨텍스트(현재 트레이스 스팬 등)를 복사해 헤징 스레드에서 실행
+        context = contextvars.copy_context()
+        return self._get_executor().submit(context.run, self._timed, stats, fn)
+    
+    def call(self, endpoint: str, fn: Callable[[], Any]) -> Any:
+        """
+        헤징을 적용해 요청 실행
+        
+        Args:
+            endpoint (str): 지연 통계를 모을 엔드포인트
+            fn (Callable): 요청 함수 (두 번 호출될 수 있으므로 멱등이어야 함)
+        
+        Returns:
+            Any: 먼저 성공한 요청의 결과 (둘 다 실패하면 먼저 실패한 예외)
+        """
+        stats = self._endpoint(endpoint)
+        with self._lock:
+            stats.requests += 1
+            self._tokens = min(self._tokens + HEDGE_CONFIG['BUDGET_RATIO'], HEDGE_CONFIG['BUDGET_BURST'])
+            delay = stats.delay
+            # 헤지 예산이 없으면 헤지할 수 없으므로 호출 스레드에서 바로 실행
+            if self._tokens < 1.0:
+                delay = None
+            # 헤지 스레드가 모자라면 대기열 지연이 생기므로 호출 스레드에서 바로 실행
+            elif delay is None or self._running + 2 > self.max_workers:
+                if delay is not None:
+                    self.saturated += 1
+                delay = None
+            else:
+                self._running += 1
+        
+        if delay is None:
+            started = time.monotonic()
+            result = fn()
+            with self._lock:
+                stats.record(time.monotonic() - started)
+            return result
+        
+        primary = self._submit(stats, fn)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        
+        with self._lock:
+            allowed = self._tokens >= 1.0
+            if allowed:
+                self._tokens -= 1.0
+                self._running += 1
+                stats.hedged += 1
+            else:
+                self.budget_denied += 1
+        if not allowed:
+            return primary.result()
+        
+        hedge = self._submit(stats, fn)
+        pending = {primary, hedge}
+        first_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            stats.hedge_wins += 1
+                    return future.result()
+                first_error = first_error or future.exception()
+        raise first_error
+    
+    def get_stats(self) -> Dict:
+        """헤징 통계 (엔드포인트별 헤지 지연·헤지 비율·헤지 승률)"""
+        with self._lock:
+            endpoints = {}
+            requests = hedged = wins = 0
+            for endpoint, stats in self._endpoints.items():
+                requests += stats.requests
+                hedged += stats.hedged
+                wins += stats.hedge_wins
+                endpoints[endpoint] = {
+                    'requests': stats.requests,
+                    'hedged': stats.hedged,
+                    'hedge_wins': stats.hedge_wins,
+                    'hedge_delay_ms': round(stats.delay * 1000, 1) if stats.delay is not None else None
+                }
+            return {
+                'enabled': HEDGE_CONFIG['ENABLED'],
+                'requests': requests,
+                'hedged': hedged,
+                'hedge_wins': wins,
+                'hedge_ratio': round(hedged / requests, 4) if requests else 0.0,
+                'win_rate': round(wins / hedged, 4) if hedged else 0.0,
+                'budget_denied': self.budget_denied,
+                'saturated': self.saturated,
+                'endpoints': endpoints
+            }
+
+
+# 프로세스 전역 요청 헤징 인스턴스 (모든 클라이언트 인스턴스가 공유)
+request_hedger = RequestHedger()
@@ -0,0 +1,254 @@
+# apis/key_pool.py
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Union
+from utils.constants import KEY_POOL_CONFIG
+from utils.exceptions import TAGOAPIError
+
+# 일일 호출 한도 초기화 기준 시간대 (공공데이터포털은 KST 자정 기준)
+_QUOTA_TZ = timezone(timedelta(hours=KEY_POOL_CONFIG['UTC_OFFSET_HOURS']))
+
+
+def parse_service_keys(value: Union[str, Iterable[str], None]) -> List[str]:
+    """쉼표·공백으로 구분된 서비스 키 문자열(또는 목록)을 중복 없는 키 목록으로 변환"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.replace(',', ' ').split()
+    keys = []
+    for key in value:
+        key = str(key).strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def _mask(key: str) -> str:
+    """통계용 키 표시 (앞뒤 4자만 노출)"""
+    return f'{key[:4]}…{key[-4:]}' if len(key) > 12 else '…'
+
+
+def _quota_day(now: float) -> str:
+    return datetime.fromtimestamp(now, _QUOTA_TZ).strftime('%Y%m%d')
+
+
+def _next_quota_reset(now: float) -> float:
+    local = datetime.fromtimestamp(now, _QUOTA_TZ)
+    midnight = (local + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight.timestamp()
+
+
+class _KeyState:
+    """서비스 키 하나의 사용량·오류율·제외 상태"""
+    
+    __slots__ = ('key', 'label', 'day', 'used', 'requests', 'errors', 'error_rate',
+                 'error_at', 'benched_until', 'bench_reason', 'service_benched_until', 'benched_count')
+    
+    def __init__(self, key: str):
+        self.key = key
+        self.label = _mask(key)
+        self.day = ''
+        self.used: Dict[str, int] = {}                    # 오늘 서비스별 호출 수
+        self.requests = 0
+        self.errors = 0
+        self.error_rate = 0.0                             # 네트워크·응답 오류 지수 이동 평균
+        self.error_at = 0.0                               # error_rate 갱신 시각 (시간이 지나면 반감)
+        self.benched_until = 0.0                          # 인증 오류로 키 전체 제외
+        self.bench_reason = ''
+        self.service_benched_until: Dict[str, float] = {}  # 한도 초과로 서비스별 제외
+        self.benched_count = 0
+    
+    def roll_day(self, day: str):
+        if self.day != day:
+            self.day = day
+            self.used.clear()
+            self.service_benched_until.clear()
+    
+    def available(self, service: str, now: float) -> bool:
+        return self.benched_until <= now and self.service_benched_until.get(service, 0.0) <= now
+    
+    def current_error_rate(self, now: float) -> float:
+        if not self.error_rate:
+            return 0.0
+        return self.error_rate * 0.5 ** ((now - self.error_at) / KEY_POOL_CONFIG['ERROR_RATE_HALF_LIFE'])
+    
+    def observe(self, error: bool, now: float):
+        alpha = KEY_POOL_CONFIG['ERROR_RATE_ALPHA']
+        self.error_rate = self.current_error_rate(now) * (1.0 - alpha) + (alpha if error else 0.0)
+        self.error_at = now
+    
+    def score(self, service: str, quota: int, now: float) -> float:
+        """남은 한도 비율 × (1 - 오류율), 클수록 우선"""
+        remaining = max(quota - self.used.get(service, 0), 0)
+        return remaining / quota * (1.0 - self.current_error_rate(now))
+
+
+class ServiceKeyPool:
+    """
+    TAGO 서비스 키 풀
+    
+    요청마다 해당 서비스(예: ArvlInfoInqireService)의 남은 일일 한도와 최근 오류율이 가장 좋은 키를 고른다.
+    TAGO가 한도 초과를 알리면 그 키를 해당 서비스에서 다음 날까지, 인증 오류를 알리면 키 전체를
+    AUTH_BENCH_SECONDS 동안 제외한다. 게이트웨이 속도 제한(HTTP 429)은 오류율에 반영하고 그 서비스에서
+    Retry-After 동안만 잠시 제외한다. 키 수만큼 일일 호출 한도가 늘어난다.
+    사용량은 프로세스별로 집계하므로 멀티 프로세스에서는 TAGO의 한도 초과 응답이 최종 기준이다.
+    """
+    
+    def __init__(self, keys: Union[str, Iterable[str]], daily_quota: int = None,
+                 service_quotas: Dict[str, int] = None, clock: Callable[[], float] = time.time):
+        keys = parse_service_keys(keys)
+        if not keys:
+            raise ValueError('TAGO 서비스 키가 없습니다')
+        self._states = [_KeyState(key) for key in keys]
+        self.daily_quota = daily_quota or KEY_POOL_CONFIG['DAILY_QUOTA']
+        self.service_quotas = dict(KEY_POOL_CONFIG['SERVICE_QUOTAS'], **(service_quotas or {}))
+        self._clock = clock                               # 현재 시각 함수 (테스트에서 교체)
+        self._lock = threading.Lock()
+        self._rotation = 0
+        self.exhausted = 0
+    
+    @property
+    def keys(self) -> List[str]:
+        return [state.key for state in self._states]
+    
+    def __len__(self) -> int:
+        return len(self._states)
+    
+    def quota(self, service: str) -> int:
+        return self.service_quotas.get(service, self.daily_quota)
+    
+    def acquire(self, service: str, exclude: Iterable[str] = ()) -> str:
+        """
+        요청에 사용할 서비스 키 선택 (선택한 키의 사용량을 미리 1 늘림)
+        
+        Args:
+            service (str): TAGO 서비스명 (엔드포인트 첫 경로)
+            exclude (Iterable[str]): 이번 요청에서 이미 실패한 키
+        
+        Returns:
+            str: 서비스 키
+        
+        Raises:
+            TAGOAPIError: 사용 가능한 키가 없을 때
+        """
+        now = self._clock()
+        day = _quota_day(now)
+        quota = self.quota(service)
+        with self._lock:
+            count = len(self._states)
+            start = self._rotation
+            self._rotation = (start + 1) % count
+            
+            best = None
+            best_score = 0.0
+            # 점수가 같으면 순환 시작점부터 먼저 만난 키 (키 사이 고르게 분산)
+            for offset in range(count):
+                state = self._states[(start + offset) % count]
+                state.roll_day(day)
+                if state.key in exclude or not state.available(service, now):
+                    continue
+                score = state.score(service, quota, now)
+                if best is None or score > best_score:
+                    best, best_score = state, score
+            
+            if best is None:
+                self.exhausted += 1
+                raise TAGOAPIError(f'사용 가능한 TAGO 서비스 키가 없습니다 ({service})')
+            best.used[service] = best.used.get(service, 0) + 1
+            best.requests += 1
+            return best.key
+    
+    def _state(self, key: str) -> Optional[_KeyState]:
+        for state in self._states:
+            if state.key == key:
+                return state
+        return None
+    
+    def report_success(self, key: str):
+        """정상 응답 기록"""
+        with self._lock:
+            state = self._state(key)
+            if state:
+                state.observe(False, self._clock())
+    
+    def report_error(self, key: str, service: str, result_code: str = None, retry_after: float = None) -> bool:
+        """
+        오류 응답 기록
+        
+        Args:
+            key (str): 사용한 서비스 키
+            service (str): TAGO 서비스명
+            result_code (str): TAGO resultCode (네트워크·형식 오류면 None)
+            retry_after (float): 속도 제한(HTTP 429) 응답의 재시도 대기 초 (속도 제한이 아니면 None)
+        
+        Returns:
+            bool: 키 문제(한도 초과·인증 오류·속도 제한)라서 다른 키로 재시도할 만한지
+        """
+        now = self._clock()
+        with self._lock:
+            state = self._state(key)
+            if state is None:
+                return False
+            # 오늘 날짜로 맞춘 뒤 기록 (다음 acquire의 날짜 갱신이 방금 기록한 제외를 지우지 않도록)
+            state.roll_day(_quota_day(now))
+            
+            if result_code in KEY_POOL_CONFIG['QUOTA_RESULT_CODES']:
+                state.service_benched_until[service] = _next_quota_reset(now)
+                state.used[service] = max(state.used.get(service, 0), self.quota(service))
+                state.bench_reason = f'quota:{service}'
+                state.benched_count += 1
+                print(f'서비스 키 {state.label} 한도 초과 ({service}), 다음 날까지 제외')
+                return True
+            if retry_after is not None:
+                delay = min(max(retry_after, 0.0), KEY_POOL_CONFIG['MAX_THROTTLE_SECONDS'])
+                state.service_benched_until[service] = max(state.service_benched_until.get(service, 0.0),
+                                                           now + delay)
+                state.bench_reason = f'throttle:{service}'
+                state.benched_count += 1
+                state.errors += 1
+                state.observe(True, now)
+                print(f'서비스 키 {state.label} 속도 제한 ({service}), {delay:.0f}초 동안 제외')
+                return True
+            if result_code in KEY_POOL_CONFIG['AUTH_RESULT_CODES']:
+                state.benched_until = now + KEY_POOL_CONFIG['AUTH_BENCH_SECONDS']
+                state.bench_reason = f'auth:{result_code}'
+                state.benched_count += 1
+                print(f'서비스 키 {state.label} 인증 오류 ({result_code}), '
+                      f'{KEY_POOL_CONFIG["AUTH_BENCH_SECONDS"]}초 동안 제외')
+                return True
+            
+            state.errors += 1
+            state.observe(True, now)
+            return False
+    
+    def get_stats(self) -> Dict:
+        """키별 사용량 통계 (키는 일부만 표시)"""
+        now = self._clock()
+        day = _quota_day(now)
+        with self._lock:
+            keys = []
+            for state in self._states:
+                state.roll_day(day)
+                benched = {service: datetime.fromtimestamp(until, _QUOTA_TZ).isoformat()
+                           for service, until in state.service_benched_until.items() if until > now}
+                keys.append({
+                    'key': state.label,
+                    'used_today': dict(state.used),
+                    'requests': state.requests,
+                    'errors': state.errors,
+                    'error_rate': round(state.current_error_rate(now), 3),
+                    'available': state.benched_until <= now,
+                    'benched_until': (datetime.fromtimestamp(state.benched_until, _QUOTA_TZ).isoformat()
+                                      if state.benched_until > now else None),
+                    'benched_services': benched,
+                    'bench_reason': state.bench_reason,
+                    'benched_count': state.benched_count
+                })
+            return {
+                'key_count': len(self._states),
+                'daily_quota': self.daily_quota,
+                'exhausted': self.exhausted,
+                'keys': keys
+            }
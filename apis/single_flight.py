@@ -0,0 +1,86 @@
+# apis/single_flight.py
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """진행 중인 요청 1건의 결과 보관용"""
+
+    __slots__ = ('done', 'result', 'error', 'shared')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.shared = 0
+
+
+class SingleFlight:
+    """
+    동일 키 동시 요청 병합 (single-flight)
+    
+    같은 키로 이미 실행 중인 요청이 있으면 새로 실행하지 않고
+    그 요청이 끝날 때까지 기다렸다가 결과(또는 예외)를 그대로 공유한다.
+    완료된 결과는 보관하지 않으므로 캐시와는 별개로 동작한다.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._executed = 0
+        self._shared = 0
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        키 기준으로 fn 실행 (동시 호출자는 결과 공유)
+        
+        Args:
+            key (Hashable): 요청 식별 키
+            fn (Callable): 실제 요청을 수행하는 함수
+            
+        Returns:
+            Any: fn의 반환값 (리더 호출자와 동일한 객체)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+                is_leader = True
+            else:
+                call.shared += 1
+                self._shared += 1
+                is_leader = False
+        
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+    
+    def in_flight(self) -> int:
+        """현재 진행 중인 요청 수"""
+        return len(self._calls)
+    
+    def get_stats(self) -> Dict:
+        """병합 통계 조회"""
+        total = self._executed + self._shared
+        return {
+            'executed': self._executed,
+            'shared': self._shared,
+            'in_flight': self.in_flight(),
+            'dedup_ratio': round(self._shared / total, 4) if total else 0.0
+        }
@@ -3,42 +3,182 @@
 import requests
 import json
 import math
-from typing import List, Dict, Optional, Tuple
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, List, Dict, Optional, Tuple, Union
+from config import Config
 from utils.exceptions import TAGOAPIError
-from utils.constants import TAGO_API_CONFIG
+from utils.cache import TTLCache
+from utils.constants import TAGO_API_CONFIG, CACHE_CONFIG, HEDGE_CONFIG, KEY_POOL_CONFIG, SHARED_CACHE_CONFIG
+from utils.shared_cache import fetch_shared
+from utils.tracing import tracer
+from .hedging import request_hedger
+from .key_pool import ServiceKeyPool
+from .single_flight import SingleFlight
+from .transport import HTTPTransport, get_shared_transport
+
+
+# 프로세스 전역 요청 병합 그룹 (모든 클라이언트 인스턴스가 공유)
+request_flight = SingleFlight()
+
+# 프로세스 전역 도착 정보 캐시: (city_code, station_id, route_id) -> 도착 정보 리스트
+arrival_cache = TTLCache(
+    ttl=CACHE_CONFIG['ARRIVAL_TTL'],
+    max_entries=CACHE_CONFIG['ARRIVAL_MAX_ENTRIES']
+)
+
+# 새 도착 정보를 받을 때마다 호출되는 리스너 (city_code, station_id, arrivals, fetched_at)
+_arrival_listeners: List[Callable[[str, str, List[Dict], float], None]] = []
+
+
+def add_arrival_listener(listener: Callable[[str, str, List[Dict], float], None]):
+    """TAGO에서 새로 조회한 도착 정보를 전달받을 리스너 등록"""
+    if listener not in _arrival_listeners:
+        _arrival_listeners.append(listener)
+
+
+def _notify_arrival_listeners(city_code: str, station_id: str, arrivals: List[Dict], fetched_at: float):
+    for listener in _arrival_listeners:
+        try:
+            listener(city_code, station_id, arrivals, fetched_at)
+        except Exception as e:
+            print(f'도착 정보 리스너 오류: {e}')
+
+
+# 키 오류를 resultCode 대신 알리는 게이트웨이 응답 (HTTP 상태 -> 대응 resultCode)
+# 429는 일일 한도 초과가 아닌 순간 속도 제한이므로 resultCode 22로 보지 않고 Retry-After만큼 잠시 제외
+_GATEWAY_RESULT_CODES = {401: '30', 403: '20'}
+_XML_REASON_CODE = re.compile(r'<returnReasonCode>\s*(\d+)\s*</returnReasonCode>')
+_XML_AUTH_MSG = re.compile(r'<returnAuthMsg>\s*([^<]*?)\s*</returnAuthMsg>')
+
+_default_client: Optional['TAGOAPIClient'] = None
+_default_client_settings: Optional[Tuple[str, str]] = None
+_default_client_lock = threading.Lock()
+
+
+def _retry_after_seconds(response) -> float:
+    """429 응답의 Retry-After (초 또는 HTTP 날짜, 없거나 잘못되면 기본 제외 시간)"""
+    value = (response.headers.get('Retry-After') or '').strip()
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            pass
+    return float(KEY_POOL_CONFIG['THROTTLE_BENCH_SECONDS'])
+
+
+def configure_default_client(api_key: str, base_url: str = None):
+    """공용 TAGO 클라이언트 설정 지정 (api_key는 쉼표로 여러 키 지정 가능, 이미 만들어진 클라이언트는 다음 사용 시 새로 생성)"""
+    global _default_client, _default_client_settings
+    with _default_client_lock:
+        _default_client_settings = (api_key, base_url)
+        _default_client = None
+
+
+def get_default_client() -> 'TAGOAPIClient':
+    """설정 기반 공용 TAGO 클라이언트 조회 (워커·서비스가 함께 사용, 최초 사용 시 생성)"""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                api_key, base_url = _default_client_settings or (Config.TAGO_API_KEY, Config.TAGO_BASE_URL)
+                _default_client = TAGOAPIClient(api_key=api_key, base_url=base_url)
+    return _default_client
 
 
 class TAGOAPIClient:
     """TAGO API 클라이언트"""
     
-    def __init__(self, api_key: str, base_url: str = None):
-        self.api_key = api_key
+    def __init__(self, api_key: Union[str, List[str]], base_url: str = None, transport: HTTPTransport = None,
+                 key_pool: ServiceKeyPool = None):
+        # 쉼표로 구분한 여러 키(또는 키 목록)를 주면 요청마다 한도·오류율에 따라 키를 고름
+        self.key_pool = key_pool or ServiceKeyPool(api_key)
+        self.api_key = self.key_pool.keys[0]
         self.base_url = base_url or "http://apis.data.go.kr/1613000"
-        self.session = requests.Session()
+        # 연결 풀은 프로세스 전체가 공유 (클라이언트별 상태 없음)
+        self.transport = transport or get_shared_transport()
         
+    @tracer.traced('tago.request', attributes=lambda self, endpoint, params: {'endpoint': endpoint})
     def _make_request(self, endpoint: str, params: Dict) -> Dict:
-        """API 요청 실행"""
+        """API 요청 실행 (동일한 요청이 진행 중이면 결과 공유, 느리면 헤지 요청)"""
+        # 서비스 키는 결과에 영향이 없으므로 병합 키에서 제외
+        key = (self.base_url, endpoint, tuple(sorted((k, str(v)) for k, v in params.items())))
+        send = lambda: self._send_request(endpoint, dict(params))
+        if HEDGE_CONFIG['ENABLED']:
+            # TAGO 조회는 모두 멱등 GET이라 같은 요청을 두 번 보내도 안전
+            return request_flight.do(key, lambda: request_hedger.call(endpoint, send))
+        return request_flight.do(key, send)
+    
+    def _send_request(self, endpoint: str, params: Dict) -> Dict:
+        """서비스 키를 골라 요청 실행 (한도 초과·인증 오류면 다른 키로 재시도)"""
+        service = endpoint.strip('/').split('/')[0]
+        tried = []
+        last_error = None
+        
+        while True:
+            try:
+                service_key = self.key_pool.acquire(service, exclude=tried)
+            except TAGOAPIError:
+                if last_error:
+                    raise last_error
+                raise
+            
+            try:
+                body = self._send_with_key(endpoint, dict(params), service_key)
+            except TAGOAPIError as e:
+                if not self.key_pool.report_error(service_key, service, e.result_code, e.retry_after):
+                    raise
+                tried.append(service_key)
+                last_error = e
+                continue
+            
+            self.key_pool.report_success(service_key)
+            return body
+    
+    def _send_with_key(self, endpoint: str, params: Dict, service_key: str) -> Dict:
+        """실제 HTTP 요청 실행"""
         # 공통 파라미터 추가
         params.update({
-            'serviceKey': self.api_key,
+            'serviceKey': service_key,
             '_type': 'json'
         })
         
         url = f"{self.base_url}{endpoint}"
         
         try:
-            response = self.session.get(url, params=params, timeout=10)
+            response = self.transport.get(url, params=params, timeout=TAGO_API_CONFIG['TIMEOUT'])
+            if response.status_code == 429:
+                raise TAGOAPIError("API Error: HTTP 429", retry_after=_retry_after_seconds(response))
+            if response.status_code in _GATEWAY_RESULT_CODES:
+                raise TAGOAPIError(f"API Error: HTTP {response.status_code}",
+                                   result_code=_GATEWAY_RESULT_CODES[response.status_code])
             response.raise_for_status()
             
-            data = response.json()
+            try:
+                data = response.json()
+            except ValueError as e:
+                # 키 관련 오류는 _type과 무관하게 XML(OpenAPI_ServiceResponse)로 응답
+                code = _XML_REASON_CODE.search(response.text)
+                if code:
+                    message = _XML_AUTH_MSG.search(response.text)
+                    raise TAGOAPIError(f"API Error: {message.group(1) if message else code.group(1)}",
+                                       result_code=code.group(1))
+                raise TAGOAPIError(f"JSON decode error: {str(e)}")
             
             # TAGO API 응답 구조 확인
             if 'response' not in data:
                 raise TAGOAPIError("Invalid API response structure")
                 
-            if data['response']['header']['resultCode'] != '00':
-                error_msg = data['response']['header']['resultMsg']
-                raise TAGOAPIError(f"API Error: {error_msg}")
+            header = data['response']['header']
+            if header['resultCode'] != '00':
+                error_msg = header['resultMsg']
+                raise TAGOAPIError(f"API Error: {error_msg}", result_code=header['resultCode'])
                 
             return data['response']['body']
             
@@ -80,6 +220,30 @@ class TAGOAPIClient:
         else:
             return closest_station, f"현재 위치: {closest_station['station_name']} ({distance:.0f}m)"
     
+    def find_nearest_stations(self, user_lat: float, user_lng: float, stations: List[Dict],
+                              k: int = 3, radius: float = None) -> List[Dict]:
+        """
+        현재 위치에서 가까운 정류소 k개 찾기
+        
+        Args:
+            user_lat (float): 사용자 위도
+            user_lng (float): 사용자 경도
+            stations (List[Dict]): 후보 정류소 리스트
+            k (int): 최대 정류소 수
+            radius (float): 검색 반경 (미터), 없으면 제한 없음
+            
+        Returns:
+            List[Dict]: 거리순 정류소 리스트 (각 항목에 'distance' 포함)
+        """
+        with_distance = []
+        for station in stations:
+            distance = self.calculate_distance(user_lat, user_lng, station['latitude'], station['longitude'])
+            if radius is None or distance <= radius:
+                with_distance.append({**station, 'distance': distance})
+        
+        with_distance.sort(key=lambda s: s['distance'])
+        return with_distance[:k]
+    
     def get_stations_by_location(self, lng: float, lat: float) -> List[Dict]:
         """
         GPS 좌표 기반 주변 정류소 검색
@@ -158,7 +322,59 @@ class TAGOAPIClient:
         except Exception as e:
             raise TAGOAPIError(f"Unexpected error in get_station_by_name: {str(e)}")
     
-    def get_bus_arrival_info(self, station_id: str, city_code: str, route_id: str = None) -> List[Dict]:
+    def get_city_stations(self, city_code: str, num_of_rows: int = 1000) -> List[Dict]:
+        """
+        도시 전체 정류소 목록 조회 (페이지를 모두 순회)
+        
+        Args:
+            city_code (str): 도시코드
+            num_of_rows (int): 페이지당 결과 수
+            
+        Returns:
+            List[Dict]: 정류소 정보 리스트
+        """
+        endpoint = "/BusSttnInfoInqireService/getSttnNoList"
+        
+        stations = []
+        page_no = 1
+        
+        try:
+            while True:
+                result = self._make_request(endpoint, {
+                    'cityCode': city_code,
+                    'pageNo': page_no,
+                    'numOfRows': num_of_rows
+                })
+                
+                if 'items' not in result or not result['items']:
+                    break
+                    
+                items = result['items']['item']
+                if isinstance(items, dict):
+                    items = [items]
+                
+                for item in items:
+                    station = self._format_station_info(item)
+                    # 이 서비스 응답에는 도시코드가 빠져 있는 경우가 있음
+                    station['city_code'] = station['city_code'] or city_code
+                    stations.append(station)
+                
+                total_count = int(result.get('totalCount', 0) or 0)
+                if page_no * num_of_rows >= total_count:
+                    break
+                page_no += 1
+                
+            return stations
+            
+        except TAGOAPIError:
+            raise
+        except Exception as e:
+            raise TAGOAPIError(f"Unexpected error in get_city_stations: {str(e)}")
+    
+    @tracer.traced('tago.arrivals', attributes=lambda self, station_id, city_code, *args, **kwargs: {
+        'station_id': station_id, 'city_code': city_code})
+    def get_bus_arrival_info(self, station_id: str, city_code: str, route_id: str = None,
+                             use_cache: bool = True) -> List[Dict]:
         """
         정류소별 버스 도착 정보 조회
         
@@ -166,10 +382,41 @@ class TAGOAPIClient:
             station_id (str): 정류소 ID
             city_code (str): 도시코드 (필수)
             route_id (str): 노선 ID (선택사항)
+            use_cache (bool): False면 캐시를 무시하고 새로 조회 후 캐시 갱신
             
         Returns:
             List[Dict]: 버스 도착 정보 리스트
         """
+        cache_key = (city_code, station_id, route_id)
+        if use_cache:
+            cached = arrival_cache.get(cache_key)
+            if cached is not None:
+                tracer.current().set_attribute('arrival_cache_hit', True)
+                return list(cached)
+        
+        # 동시에 캐시를 놓친 호출자는 한 번의 조회·캐시 저장·리스너 통지를 공유
+        # (강제 갱신이면 다른 서버 프로세스가 방금 갱신한 값만 인정)
+        max_age = CACHE_CONFIG['ARRIVAL_TTL'] if use_cache else SHARED_CACHE_CONFIG['FRESH_AGE']
+        arrivals = request_flight.do(
+            ('arrivals',) + cache_key,
+            lambda: self._refresh_bus_arrival_info(station_id, city_code, route_id, max_age)
+        )
+        return list(arrivals)
+    
+    def _refresh_bus_arrival_info(self, station_id: str, city_code: str, route_id: str = None,
+                                  max_age: float = 0) -> List[Dict]:
+        """도착 정보 조회 후 캐시 저장 및 리스너 통지 (프로세스 간 공유 캐시 사용 시 한 프로세스만 조회)"""
+        arrivals, fetched_at, _ = fetch_shared(
+            f'arrivals:{city_code}:{station_id}:{route_id or ""}', max_age,
+            lambda: self._fetch_bus_arrival_info(station_id, city_code, route_id)
+        )
+        arrival_cache.set((city_code, station_id, route_id), arrivals, stored_at=fetched_at)
+        if route_id is None:
+            _notify_arrival_listeners(city_code, station_id, arrivals, fetched_at)
+        return arrivals
+    
+    def _fetch_bus_arrival_info(self, station_id: str, city_code: str, route_id: str = None) -> List[Dict]:
+        """정류소별 버스 도착 정보 TAGO 조회"""
         endpoint = "/ArvlInfoInqireService/getSttnAcctoArvlPrearngeInfoList"
         
         params = {
@@ -191,7 +438,8 @@ class TAGOAPIClient:
             if isinstance(arrivals, dict):
                 arrivals = [arrivals]
                 
-            return [self._format_arrival_info(arrival) for arrival in arrivals]
+            with tracer.span('tago.format', items=len(arrivals)):
+                return [self._format_arrival_info(arrival) for arrival in arrivals]
             
         except TAGOAPIError:
             raise
@@ -225,6 +473,27 @@ class TAGOAPIClient:
         except Exception as e:
             raise TAGOAPIError(f"Specific bus arrival query failed: {str(e)}")
     
+    def get_multiple_bus_arrival(self, station_id: str, city_code: str, bus_numbers: List[str]) -> List[Dict]:
+        """
+        여러 버스 번호의 도착 정보를 정류소 도착 정보 1회 조회로 필터링
+        
+        Args:
+            station_id (str): 정류소 ID
+            city_code (str): 도시코드
+            bus_numbers (List[str]): 찾고자 하는 버스 번호 목록 (예: ["146", "341", "360"])
+        
+        Returns:
+            List[Dict]: 해당 버스 번호들의 도착 정보 리스트
+        """
+        try:
+            targets = {str(bus_number).strip() for bus_number in bus_numbers}
+            all_arrivals = self.get_bus_arrival_info(station_id, city_code)
+            
+            return [bus for bus in all_arrivals if str(bus['route_name']).strip() in targets]
+        
+        except Exception as e:
+            raise TAGOAPIError(f"Multiple bus arrival query failed: {str(e)}")
+    
     def find_fastest_bus(self, arrivals: List[Dict]) -> Optional[Dict]:
         """
         도착 정보 리스트에서 가장 빨리 오는 버스 찾기
@@ -276,12 +545,13 @@ class TAGOAPIClient:
         else:
             return f"{minutes}분 {remaining_seconds}초"
     
-    def get_route_info_by_route_id(self, route_id: str) -> Dict:
+    def get_route_info_by_route_id(self, route_id: str, city_code: str = None) -> Dict:
         """
         노선 ID로 노선 정보 조회
         
         Args:
             route_id (str): 노선 ID
+            city_code (str): 도시코드 (선택사항)
             
         Returns:
             Dict: 노선 정보
@@ -292,6 +562,9 @@ class TAGOAPIClient:
             'routeId': route_id
         }
         
+        if city_code:
+            params['cityCode'] = city_code
+        
         try:
             result = self._make_request(endpoint, params)
             
@@ -310,6 +583,127 @@ class TAGOAPIClient:
         except Exception as e:
             raise TAGOAPIError(f"Unexpected error in get_route_info_by_route_id: {str(e)}")
     
+    def get_routes_by_number(self, city_code: str, route_no: str) -> List[Dict]:
+        """
+        노선번호로 노선 목록 조회 (TAGO는 부분 일치 결과도 함께 반환)
+        
+        Args:
+            city_code (str): 도시코드
+            route_no (str): 노선번호 (예: "146")
+        
+        Returns:
+            List[Dict]: 노선 리스트 (route_id, route_name 등)
+        """
+        endpoint = "/BusRouteInfoInqireService/getRouteNoList"
+        
+        params = {
+            'cityCode': city_code,
+            'routeNo': route_no,
+            'numOfRows': 100
+        }
+        
+        try:
+            result = self._make_request(endpoint, params)
+            
+            if 'items' not in result or not result['items']:
+                return []
+            
+            routes = result['items']['item']
+            
+            if isinstance(routes, dict):
+                routes = [routes]
+            
+            return [self._format_route_search_info(route) for route in routes]
+        
+        except TAGOAPIError:
+            raise
+        except Exception as e:
+            raise TAGOAPIError(f"Unexpected error in get_routes_by_number: {str(e)}")
+    
+    def get_route_stations(self, city_code: str, route_id: str, num_of_rows: int = 1000) -> List[Dict]:
+        """
+        노선 경유 정류소 목록 조회 (정류소 순번 오름차순)
+        
+        Args:
+            city_code (str): 도시코드
+            route_id (str): 노선 ID
+            num_of_rows (int): 페이지당 결과 수
+            
+        Returns:
+            List[Dict]: 경유 정류소 리스트 (station_order 포함)
+        """
+        endpoint = "/BusRouteInfoInqireService/getRouteAcctoThrghSttnList"
+        
+        stations = []
+        page_no = 1
+        
+        try:
+            while True:
+                result = self._make_request(endpoint, {
+                    'cityCode': city_code,
+                    'routeId': route_id,
+                    'pageNo': page_no,
+                    'numOfRows': num_of_rows
+                })
+                
+                if 'items' not in result or not result['items']:
+                    break
+                    
+                items = result['items']['item']
+                if isinstance(items, dict):
+                    items = [items]
+                
+                stations.extend(self._format_route_station_info(item) for item in items)
+                
+                total_count = int(result.get('totalCount', 0) or 0)
+                if page_no * num_of_rows >= total_count:
+                    break
+                page_no += 1
+                
+            return sorted(stations, key=lambda station: station['station_order'])
+            
+        except TAGOAPIError:
+            raise
+        except Exception as e:
+            raise TAGOAPIError(f"Unexpected error in get_route_stations: {str(e)}")
+    
+    def get_route_vehicle_locations(self, city_code: str, route_id: str) -> List[Dict]:
+        """
+        노선별 운행 중인 버스 위치 조회
+        
+        Args:
+            city_code (str): 도시코드
+            route_id (str): 노선 ID
+            
+        Returns:
+            List[Dict]: 버스 위치 리스트 (마지막으로 지난 정류소 순번 포함)
+        """
+        endpoint = "/BusLcInfoInqireService/getRouteAcctoBusLcList"
+        
+        params = {
+            'cityCode': city_code,
+            'routeId': route_id,
+            'numOfRows': 100
+        }
+        
+        try:
+            result = self._make_request(endpoint, params)
+            
+            if 'items' not in result or not result['items']:
+                return []
+                
+            vehicles = result['items']['item']
+            
+            if isinstance(vehicles, dict):
+                vehicles = [vehicles]
+                
+            return [self._format_vehicle_location(vehicle) for vehicle in vehicles]
+            
+        except TAGOAPIError:
+            raise
+        except Exception as e:
+            raise TAGOAPIError(f"Unexpected error in get_route_vehicle_locations: {str(e)}")
+    
     def _format_station_info(self, station: Dict) -> Dict:
         """정류소 정보 포맷팅 - TAGO API 응답 필드 기준"""
         return {
@@ -345,6 +739,52 @@ class TAGOAPIClient:
             'arrival_time': arrival_time,                   # 도착예상시간(초)
         }
     
+    def _format_route_station_info(self, station: Dict) -> Dict:
+        """노선 경유 정류소 정보 포맷팅"""
+        try:
+            station_order = int(station.get('nodeord', 0))
+        except (ValueError, TypeError):
+            station_order = 0
+            
+        return {
+            'station_id': station.get('nodeid', ''),          # 정류소ID
+            'station_name': station.get('nodenm', ''),        # 정류소명
+            'station_order': station_order,                   # 노선 내 정류소 순번
+            'direction': station.get('updowncd', ''),         # 상하행 구분 (0: 상행, 1: 하행)
+            'latitude': float(station.get('gpslati', 0) or 0),
+            'longitude': float(station.get('gpslong', 0) or 0)
+        }
+    
+    def _format_vehicle_location(self, vehicle: Dict) -> Dict:
+        """버스 위치 정보 포맷팅"""
+        try:
+            station_order = int(vehicle.get('nodeord', 0))
+        except (ValueError, TypeError):
+            station_order = 0
+            
+        return {
+            'vehicle_no': vehicle.get('vehicleno', ''),       # 차량번호
+            'route_name': vehicle.get('routenm', ''),         # 노선번호
+            'route_type': vehicle.get('routetp', ''),         # 노선유형
+            'station_id': vehicle.get('nodeid', ''),          # 마지막으로 지난 정류소ID
+            'station_name': vehicle.get('nodenm', ''),        # 마지막으로 지난 정류소명
+            'station_order': station_order,                   # 마지막으로 지난 정류소 순번
+            'latitude': float(vehicle.get('gpslati', 0) or 0),
+            'longitude': float(vehicle.get('gpslong', 0) or 0)
+        }
+    
+    def _format_route_search_info(self, route: Dict) -> Dict:
+        """노선번호 검색 결과 포맷팅"""
+        return {
+            'route_id': route.get('routeid', ''),
+            'route_name': route.get('routeno', ''),
+            'route_type': route.get('routetp', ''),
+            'start_station': route.get('startnodenm', ''),
+            'end_station': route.get('endnodenm', ''),
+            'start_vehicle_time': route.get('startvehicletime', ''),  # 첫차 시각
+            'end_vehicle_time': route.get('endvehicletime', '')       # 막차 시각
+        }
+    
     def _format_route_info(self, route: Dict) -> Dict:
         """노선 정보 포맷팅"""
         return {
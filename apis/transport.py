@@ -0,0 +1,114 @@
+# apis/transport.py
+
+import threading
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from utils.constants import TRANSPORT_CONFIG
+
+
+class HTTPTransport:
+    """
+    프로세스 공용 HTTP 전송 계층
+    
+    모든 TAGOAPIClient가 하나의 requests.Session과 연결 풀을 공유해서
+    apis.data.go.kr 연결을 keep-alive로 재사용한다.
+    """
+    
+    def __init__(self, pool_connections: int = None, pool_maxsize: int = None):
+        self.pool_connections = pool_connections or TRANSPORT_CONFIG['POOL_CONNECTIONS']
+        self.pool_maxsize = pool_maxsize or TRANSPORT_CONFIG['POOL_MAXSIZE']
+        
+        self._adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=TRANSPORT_CONFIG['POOL_BLOCK'],
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        })
+        
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.errors = 0
+        self.gzip_responses = 0
+        self.bytes_received = 0
+    
+    def get(self, url: str, params: Dict = None, timeout: float = None) -> requests.Response:
+        """
+        GET 요청 실행
+        
+        Args:
+            url (str): 요청 URL
+            params (Dict): 쿼리 파라미터
+            timeout (float): 타임아웃 (초)
+        
+        Returns:
+            requests.Response: 응답 객체
+        """
+        try:
+            response = self.session.get(url, params=params, timeout=timeout)
+        except requests.RequestException:
+            with self._lock:
+                self.requests_sent += 1
+                self.errors += 1
+            raise
+        
+        with self._lock:
+            self.requests_sent += 1
+            self.bytes_received += len(response.content)
+            if response.headers.get('Content-Encoding', '').lower() == 'gzip':
+                self.gzip_responses += 1
+        return response
+    
+    def get_stats(self) -> Dict:
+        """연결 재사용 통계 조회"""
+        connections = 0
+        pool_requests = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            pool_requests += pool.num_requests
+        
+        return {
+            'pool_connections': self.pool_connections,
+            'pool_maxsize': self.pool_maxsize,
+            'hosts': len(pools),
+            'requests': self.requests_sent,
+            'errors': self.errors,
+            'connections_opened': connections,
+            'connection_reuse_ratio': round(1 - connections / pool_requests, 4) if pool_requests else 0.0,
+            'gzip_responses': self.gzip_responses,
+            'bytes_received': self.bytes_received
+        }
+
+
+_shared_transport: Optional[HTTPTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_shared_transport() -> HTTPTransport:
+    """프로세스 공용 전송 계층 조회 (최초 사용 시 생성)"""
+    global _shared_transport
+    if _shared_transport is None:
+        with _transport_lock:
+            if _shared_transport is None:
+                _shared_transport = HTTPTransport()
+    return _shared_transport
+
+
+def close_shared_transport():
+    """공용 전송 계층 연결 정리 (프로세스 종료 시)"""
+    global _shared_transport
+    with _transport_lock:
+        if _shared_transport is not None:
+            _shared_transport.session.close()
+            _shared_transport = None
@@ -1,54 +1,169 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, current_app
 from flask_socketio import SocketIO
 from flask_cors import CORS
 import json
+import os
+import atexit
+import threading
 
 from config import Config
-from websocket import init_websocket_handlers
-from routes import register_routes
-from utils.constants import APP_VERSION, API_FLOWS, WEBSOCKET_EVENTS
-from utils.middleware import handle_before_request, handle_after_request, register_error_handlers
-
-app = Flask(__name__)
-app.config.from_object(Config)
-app.config['SECRET_KEY'] = Config.FLASK_SECRET_KEY or 'dev-secret-key-change-in-production'
-
-# JSON 설정
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
-app.config['JSON_AS_ASCII'] = False
-app.config['JSON_SORT_KEYS'] = False
-
-# CORS 설정 강화
-CORS(app, 
-     origins=["*"],
-     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-     allow_headers=["Content-Type", "Authorization", "X-Requested-With", "X-Session-ID", "ngrok-skip-browser-warning"],
-     supports_credentials=True)
-
-# SocketIO 초기화 (로그 활성화)
-socketio = SocketIO(app, 
-                   cors_allowed_origins="*",
-                   cors_credentials=True,
-                   logger=True,  # Socket.IO 로그 활성화
-                   engineio_logger=True,  # Engine.IO 로그 활성화
-                   json=json)
-
-# WebSocket 핸들러 등록
-init_websocket_handlers(socketio)
-
-# REST API 라우트 등록
-register_routes(app)
-
-# 미들웨어 등록
-app.before_request(handle_before_request)
-app.after_request(handle_after_request)
-
-# 에러 핸들러 등록
-register_error_handlers(app)
+from apis.tago_api import configure_default_client
+from utils.constants import APP_VERSION, API_FLOWS, WEBSOCKET_EVENTS, SEARCH_CONFIG
+
+# SocketIO 인스턴스 (create_app에서 앱에 연결)
+socketio = SocketIO()
+
+_startup_lock = threading.Lock()
+_started_pid = None  # startup()을 실행한 프로세스 (fork된 워커는 다시 실행)
+
+
+def create_app(config=None) -> Flask:
+    """
+    Flask 앱 생성
+    
+    TAGO 클라이언트·연결 풀·캐시는 처음 사용할 때 만들어지므로 앱 생성은 가볍고,
+    프리포크 서버에서는 마스터가 앱을 만든 뒤 각 워커 프로세스가 startup()을 호출한다.
+    
+    Args:
+        config: 설정 객체 (없으면 Config)
+    
+    Returns:
+        Flask: 라우트·WebSocket 핸들러가 등록된 앱
+    """
+    config = config or Config
+    
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.config['SECRET_KEY'] = getattr(config, 'FLASK_SECRET_KEY', None) or 'dev-secret-key-change-in-production'
+    
+    # 리버스 프록시 뒤에서는 신뢰하는 프록시 수만큼만 X-Forwarded-For/Proto를 remote_addr·scheme에 반영
+    proxy_hops = int(getattr(config, 'TRUSTED_PROXY_HOPS', None) or os.getenv('TRUSTED_PROXY_HOPS') or 0)
+    if proxy_hops > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+    
+    # JSON 설정
+    app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+    app.config['JSON_AS_ASCII'] = False
+    app.config['JSON_SORT_KEYS'] = False
+    
+    # 공용 TAGO 클라이언트 설정 (생성은 최초 사용 시)
+    configure_default_client(config.TAGO_API_KEY, config.TAGO_BASE_URL)
+    
+    # CORS 설정 강화
+    CORS(app, 
+         origins=["*"],
+         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+         allow_headers=["Content-Type", "Authorization", "X-Requested-With", "X-Session-ID", "ngrok-skip-browser-warning"],
+         supports_credentials=True)
+    
+    # SocketIO 초기화 (로그 활성화)
+    socketio.init_app(app, 
+                      cors_allowed_origins="*",
+                      cors_credentials=True,
+                      logger=True,  # Socket.IO 로그 활성화
+                      engineio_logger=True,  # Engine.IO 로그 활성화
+                      json=json)
+    
+    # 라우트·핸들러 모듈은 앱 생성 시점에 로드
+    from websocket import init_websocket_handlers
+    from routes import register_routes
+    from utils.middleware import handle_before_request, handle_after_request, register_error_handlers
+    
+    # WebSocket 핸들러 등록
+    init_websocket_handlers(socketio)
+    
+    # REST API 라우트 등록
+    register_routes(app)
+    
+    # 미들웨어 등록
+    app.before_request(handle_before_request)
+    app.after_request(handle_after_request)
+    
+    # 에러 핸들러 등록
+    register_error_handlers(app)
+    
+    # 기본 라우트 등록
+    register_base_routes(app)
+    
+    return app
+
+
+def startup(app: Flask, config=None):
+    """
+    프로세스 시작 훅 (워커 프로세스마다 1회)
+    
+    설정 검증, 이전 실행 세션 복원, 이전 실행 통계 기반 캐시 워밍업, 검색 인덱스 선로딩을 수행하고
+    종료 시 shutdown()이 호출되도록 등록한다. 실행 여부는 프로세스별로 기록하므로 startup()을 마친
+    마스터에서 fork된 워커도 다시 호출하면 자기 프로세스에서 한 번 실행한다 (백그라운드 스레드는 fork로 복제되지 않음).
+    
+    Raises:
+        ValueError: 설정이 올바르지 않은 경우
+    """
+    global _started_pid
+    with _startup_lock:
+        if _started_pid == os.getpid():
+            return
+        (config or Config).validate()
+        _started_pid = os.getpid()
+    
+    from websocket.manager import session_manager
+    from websocket.prefetcher import arrival_prefetcher
+    from services.station_search import station_search_index
+    
+    # 재시작 전 세션 복원 (재접속한 클라이언트는 정류소 재조회 없이 이어서 모니터링)
+    session_manager.restore_snapshot()
+    
+    # 이전 실행에서 많이 조회된 정류소 캐시 워밍업
+    arrival_prefetcher.warm_up()
+    
+    # 정류소명 검색 인덱스 미리 생성 (백그라운드)
+    for city_code in SEARCH_CONFIG['PRELOAD_CITIES']:
+        station_search_index.ensure_city(city_code)
+    
+    atexit.register(shutdown)
+
+
+def shutdown():
+    """프로세스 종료 훅: 세션 스냅샷 저장, 모니터링 워커 중단, 통계 저장, 연결 풀 정리"""
+    global _started_pid
+    with _startup_lock:
+        if _started_pid != os.getpid():
+            return
+        _started_pid = None
+    
+    from websocket.manager import session_manager
+    from websocket.prefetcher import arrival_prefetcher
+    from apis.transport import close_shared_transport
+    from utils.shared_cache import close_shared_cache
+    
+    # 세션을 중단하기 전에 스냅샷 저장 (다음 시작 때 복원)
+    saved = session_manager.save_snapshot()
+    stopped = session_manager.stop_all_sessions()
+    arrival_prefetcher.shutdown()
+    close_shared_transport()
+    close_shared_cache()
+    print(f"서버 종료 처리 완료 (중단한 세션 {stopped}개, 스냅샷 저장 {saved}개)")
+
+
+def __getattr__(name):
+    """`from app import app` 호환: 기본 설정 앱은 처음 참조할 때 생성하고 이 프로세스의 startup() 실행"""
+    if name == 'app':
+        global app
+        app = create_app()
+        startup(app)
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # ===================== 기본 라우트들 =====================
 
-@app.route('/', methods=['GET', 'POST', 'OPTIONS'])
+def register_base_routes(app: Flask):
+    """홈·테스트 페이지·API 정보 라우트 등록"""
+    app.add_url_rule('/', 'home', home, methods=['GET', 'POST', 'OPTIONS'])
+    app.add_url_rule('/test', 'test_page', test_page)
+    app.add_url_rule('/api', 'api_info', api_info)
+
 def home():
     """홈 - 서버 상태 확인 (모든 메서드 허용)"""
     return jsonify({
@@ -62,12 +177,10 @@ def home():
         'mobile_app_ready': True
     })
 
-@app.route('/test')
 def test_page():
     """WebSocket 테스트 페이지"""
     return render_template('websocket_test.html')
 
-@app.route('/api')
 def api_info():
     """API 정보"""
     return jsonify({
@@ -78,7 +191,7 @@ def api_info():
             'flow1': {
                 'type': 'WebSocket',
                 'description': '특정 버스 실시간 모니터링',
-                'url': f'ws://{Config.HOST}:{Config.PORT}',
+                'url': f"ws://{current_app.config['HOST']}:{current_app.config['PORT']}",
                 'events': WEBSOCKET_EVENTS
             }
         }
@@ -87,9 +200,11 @@ def api_info():
 # ===================== 메인 실행 =====================
 
 if __name__ == '__main__':
-    # Config 검증
+    app = create_app(Config)
+    
+    # Config 검증, 캐시 워밍업·검색 인덱스 선로딩 및 종료 훅 등록
     try:
-        Config.validate()
+        startup(app, Config)
     except ValueError as e:
         print(f"설정 오류: {e}")
         exit(1)
@@ -107,4 +222,4 @@ if __name__ == '__main__':
         host=Config.HOST,
         port=Config.PORT,
         log_output=True  # 상세 로그 출력
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,334 @@
+# benchmarks/hot_paths.py
+"""
+워커 틱·플로우 2 핫 패스 마이크로 벤치마크 및 회귀 검사
+
+    python benchmarks/hot_paths.py [--quick] [--filter find_] [--tolerance 0.3] [--update]
+
+네트워크 없이 합성 정류소·도착 정보 데이터(크기별)로 틱마다 실행되는 순수 함수와
+미리 만든 TAGO 응답을 돌려주는 전송 계층으로 워커 틱(_get_bus_update) 전체를 측정한다.
+함수별 ops/s와 호출 1회의 최대 할당량(tracemalloc peak)을 출력하고 benchmarks/baselines.json의
+기준값과 비교해, 허용 범위를 넘어 느려지거나 할당이 늘면 종료 코드 1을 반환한다.
+--update를 주면 현재 측정값으로 기준값을 갱신한다. --quick은 짧게 측정해 비교 결과만 출력하고
+실패로 처리하지 않는다.
+
+항목마다 고정 파이썬 연산의 처리량(calibration)을 측정 묶음과 번갈아 측정해 둘 다 중앙값으로 저장하고,
+비교할 때 그 비율로 보정하므로 다른 머신에서도 같은 기준값 파일을 쓸 수 있고 측정 중 CPU 속도 변화
+(터보, 다른 부하)의 영향도 줄어든다.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from apis import tago_api  # noqa: E402
+from apis.tago_api import TAGOAPIClient, arrival_cache  # noqa: E402
+from services.station_services import StationService  # noqa: E402
+from utils.constants import HEDGE_CONFIG  # noqa: E402
+from utils.tracing import tracer  # noqa: E402
+from websocket.workers import BusMonitoringWorker  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+SIZES = (10, 100, 1000)
+QUICK_SIZES = (10, 100)
+DEFAULT_TOLERANCE = 0.3     # ops/s 감소·할당 증가 허용 비율
+ALLOC_SLACK_BYTES = 512     # 작은 할당량의 측정 흔들림 허용치
+
+CENTER = (36.3504, 127.3845)
+CITY_CODE = '25'
+STATION_ID = 'DJB8001793'
+TARGET_BUS = '102'
+
+
+class _CannedResponse:
+    """미리 직렬화한 TAGO 응답 (json()은 실제 응답처럼 매번 디코딩)"""
+    
+    status_code = 200
+    
+    def __init__(self, text: str):
+        self.text = text
+    
+    def json(self):
+        return json.loads(self.text)
+    
+    def raise_for_status(self):
+        pass
+
+
+class _CannedTransport:
+    """엔드포인트별 고정 응답을 돌려주는 전송 계층 (네트워크 없음)"""
+    
+    def __init__(self, responses: dict):
+        self.responses = {endpoint: _CannedResponse(json.dumps(body, ensure_ascii=False))
+                          for endpoint, body in responses.items()}
+    
+    def get(self, url, params=None, timeout=None):
+        return self.responses[url.rsplit('/', 2)[-2] + '/' + url.rsplit('/', 1)[-1]]
+
+
+class _SessionStub:
+    """워커가 호출하는 세션 매니저 메서드만 제공"""
+    
+    def is_session_active(self, session_id):
+        return True
+    
+    def update_session_station_info(self, session_id, station_info, worker=None):
+        pass
+
+
+def _tago_body(items: list) -> dict:
+    return {'response': {
+        'header': {'resultCode': '00', 'resultMsg': 'NORMAL SERVICE.'},
+        'body': {'items': {'item': items}, 'numOfRows': len(items), 'pageNo': 1, 'totalCount': len(items)}
+    }}
+
+
+def make_stations(rng: random.Random, count: int) -> list:
+    """중심 좌표 주변 약 1km 안의 합성 정류소 목록 (get_stations_by_location 결과 형식)"""
+    return [{
+        'station_id': f'DJB{8000000 + i}',
+        'station_name': f'정류소{i}',
+        'city_code': CITY_CODE,
+        'latitude': CENTER[0] + rng.uniform(-0.01, 0.01),
+        'longitude': CENTER[1] + rng.uniform(-0.01, 0.01)
+    } for i in range(count)]
+
+
+def make_raw_arrivals(rng: random.Random, count: int) -> list:
+    """합성 TAGO 도착 정보 항목 (버스 번호는 정수·문자열이 섞여 오는 실제 응답과 같게)"""
+    routes = max(count // 3, 1)
+    items = []
+    for i in range(count):
+        number = 102 if i % routes == 0 else 100 + i % routes + 3
+        items.append({
+            'nodeid': STATION_ID,
+            'nodenm': '정부청사',
+            'routeid': f'DJB{30300000 + number}',
+            'routeno': number if i % 2 else str(number),
+            'routetp': '간선버스',
+            'arrprevstationcnt': rng.randint(1, 20),
+            'vehicletp': '저상버스' if i % 4 == 0 else '일반차량',
+            'arrtime': rng.randint(0, 1800)
+        })
+    return items
+
+
+def build_cases(sizes: tuple) -> list:
+    """(이름, 호출 함수) 목록"""
+    rng = random.Random(1234)
+    client = TAGOAPIClient('bench-service-key', transport=_CannedTransport({}))
+    service = StationService()
+    cases = []
+    
+    points = [(CENTER[0] + rng.uniform(-0.01, 0.01), CENTER[1] + rng.uniform(-0.01, 0.01)) for _ in range(256)]
+    point_iter = _cycle(points)
+    cases.append(('calculate_distance', lambda: client.calculate_distance(CENTER[0], CENTER[1], *next(point_iter))))
+    
+    seconds_iter = _cycle([rng.randint(-10, 3600) for _ in range(256)])
+    cases.append(('format_arrival_time', lambda: client.format_arrival_time(next(seconds_iter))))
+    
+    raw_iter = _cycle(make_raw_arrivals(rng, 256))
+    cases.append(('_format_arrival_info', lambda: client._format_arrival_info(next(raw_iter))))
+    
+    for size in sizes:
+        stations = make_stations(rng, size)
+        raw = make_raw_arrivals(rng, size)
+        arrivals = [client._format_arrival_info(item) for item in raw]
+        cases.append((f'find_current_station[{size}]',
+                      lambda stations=stations: client.find_current_station(CENTER[0], CENTER[1], stations)))
+        cases.append((f'find_fastest_bus[{size}]', lambda arrivals=arrivals: client.find_fastest_bus(arrivals)))
+        cases.append((f'_process_buses_simple[{size}]',
+                      lambda arrivals=arrivals: service._process_buses_simple(arrivals)))
+        cases.append((f'_get_bus_update[{size}]', _bus_update_case(raw)))
+    return cases
+
+
+def _bus_update_case(raw: list):
+    """미리 만든 도착 정보 응답으로 워커 틱 1회 (캐시를 비워 TAGO 응답 디코딩·포맷팅부터 수행)"""
+    transport = _CannedTransport({'ArvlInfoInqireService/getSttnAcctoArvlPrearngeInfoList': _tago_body(raw)})
+    station = {'station_id': STATION_ID, 'station_name': '정부청사', 'city_code': CITY_CODE,
+               'latitude': CENTER[0], 'longitude': CENTER[1]}
+    worker = BusMonitoringWorker('bench-session', CENTER[0], CENTER[1], TARGET_BUS, 30, socketio=None,
+                                 session_manager=_SessionStub(), station_info=station)
+    worker.client = TAGOAPIClient('bench-service-key', transport=transport)
+    cache_key = (CITY_CODE, STATION_ID, None)
+    
+    def run():
+        arrival_cache.delete(cache_key)
+        worker.route_id = None  # 노선 위치 추적으로 넘어가지 않고 매번 정류소 조회 경로 측정
+        update = worker._get_bus_update()
+        if 'error' in update:
+            raise RuntimeError(update['error'])
+        return update
+    return run
+
+
+def _cycle(values: list):
+    while True:
+        yield from values
+
+
+def _calibration_op():
+    data = {i: i * i for i in range(64)}
+    return sum(value for key, value in data.items() if key % 3)
+
+
+def _loops_for(func, target_seconds: float) -> int:
+    """한 묶음이 target_seconds 정도 걸리는 반복 횟수"""
+    func()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= target_seconds / 5 or loops >= 1 << 22:
+            break
+        loops *= 2
+    return max(int(loops * target_seconds / max(elapsed, 1e-9)), 1)
+    
+
+def _run_loops(func, loops: int) -> float:
+    started = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return loops / (time.perf_counter() - started)
+
+
+def measure_ops(func, target_seconds: float, repeats: int) -> tuple:
+    """
+    (초당 호출 수, 같은 시점의 calibration 처리량)의 중앙값
+    
+    묶음마다 calibration 묶음을 바로 앞에 번갈아 실행하므로, 측정 중 CPU 속도가 바뀌어도
+    두 값이 같은 구간의 속도를 반영한다.
+    """
+    loops = _loops_for(func, target_seconds)
+    calibration_loops = _loops_for(_calibration_op, target_seconds / 2)
+    
+    ops, calibration = [], []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            calibration.append(_run_loops(_calibration_op, calibration_loops))
+            ops.append(_run_loops(func, loops))
+    finally:
+        gc.enable()
+    return statistics.median(ops), statistics.median(calibration)
+
+
+def measure_peak_bytes(func, calls: int = 20) -> int:
+    """호출 1회에 잡는 최대 메모리 (tracemalloc peak, 결과는 호출마다 버림)"""
+    func()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        for _ in range(calls):
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(peak - current, 0)
+
+
+def compare(name: str, result: dict, baseline: dict, tolerance: float) -> list:
+    """기준값 대비 회귀 목록 (속도는 항목별 머신 처리량 비율로 보정)"""
+    failures = []
+    expected_ops = baseline['ops_per_sec'] * result['calibration_ops_per_sec'] / baseline['calibration_ops_per_sec']
+    if result['ops_per_sec'] < expected_ops * (1 - tolerance):
+        failures.append(f"{name}: {result['ops_per_sec']:,.0f} ops/s < 기준 {expected_ops:,.0f} ops/s "
+                        f"(-{(1 - result['ops_per_sec'] / expected_ops) * 100:.0f}%)")
+    allowed_bytes = baseline['peak_bytes'] * (1 + tolerance) + ALLOC_SLACK_BYTES
+    if result['peak_bytes'] > allowed_bytes:
+        failures.append(f"{name}: 최대 할당 {result['peak_bytes']:,} B > 기준 {baseline['peak_bytes']:,} B")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='핫 패스 마이크로 벤치마크 및 회귀 검사')
+    parser.add_argument('--quick', action='store_true',
+                        help=f'작은 데이터셋({QUICK_SIZES})만, 짧게 측정 (비교 결과만 출력, 실패로 처리하지 않음)')
+    parser.add_argument('--filter', default='', help='이름에 이 문자열이 포함된 항목만 측정')
+    parser.add_argument('--tolerance', type=float, default=None, help='허용 회귀 비율 (기본: 기준값 파일 값)')
+    parser.add_argument('--update', action='store_true', help='측정값으로 기준값 파일 갱신')
+    args = parser.parse_args()
+    
+    # 틱의 CPU 비용만 측정 (헤지 스레드 전환·샘플링된 추적 기록 제외)
+    HEDGE_CONFIG['ENABLED'] = False
+    tracer.set_sample_rate(0.0)
+    tago_api.configure_default_client('bench-service-key')
+    
+    target_seconds, repeats = (0.05, 3) if args.quick else (0.1, 11)
+    cases = [(name, func) for name, func in build_cases(QUICK_SIZES if args.quick else SIZES)
+             if args.filter in name]
+    
+    results = {}
+    print(f'{"항목":32s} {"ops/s":>14s} {"us/op":>10s} {"최대 할당":>12s}')
+    for name, func in cases:
+        ops, calibration = measure_ops(func, target_seconds, repeats)
+        peak = measure_peak_bytes(func)
+        results[name] = {'ops_per_sec': round(ops, 1), 'peak_bytes': peak,
+                         'calibration_ops_per_sec': round(calibration, 1)}
+        print(f'{name:32s} {ops:14,.0f} {1e6 / ops:10.2f} {peak:10,d} B')
+    
+    try:
+        with open(BASELINE_FILE, encoding='utf-8') as f:
+            baselines = json.load(f)
+    except (OSError, ValueError):
+        baselines = None
+    
+    if args.update:
+        # 일부 항목만 측정했으면 나머지 항목의 기준값은 유지
+        merged = dict(baselines['results']) if baselines and args.filter else {}
+        merged.update(results)
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({
+                'tolerance': args.tolerance if args.tolerance is not None else
+                (baselines or {}).get('tolerance', DEFAULT_TOLERANCE),
+                'python': platform.python_version(),
+                'results': dict(sorted(merged.items()))
+            }, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f'기준값 갱신: {BASELINE_FILE} ({len(results)}개 항목)')
+        return 0
+    
+    if not baselines:
+        print(f'기준값 파일이 없습니다: --update로 생성하세요 ({BASELINE_FILE})')
+        return 0
+    
+    tolerance = args.tolerance if args.tolerance is not None else baselines.get('tolerance', DEFAULT_TOLERANCE)
+    print(f'허용 회귀 {tolerance * 100:.0f}%')
+    
+    failures = []
+    for name, result in results.items():
+        baseline = baselines['results'].get(name)
+        if baseline is None:
+            print(f'기준값 없음: {name}')
+            continue
+        failures.extend(compare(name, result, baseline, tolerance))
+    
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    if not failures:
+        print('OK: 기준값 대비 회귀 없음')
+    if args.quick:
+        # 짧은 측정은 잡음이 커서 참고용으로만 출력
+        if failures:
+            print('--quick 결과는 참고용입니다: 회귀 판정은 --quick 없이 다시 측정하세요')
+        return 0
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
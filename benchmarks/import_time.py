@@ -0,0 +1,107 @@
+# benchmarks/import_time.py
+"""
+앱 임포트·생성 시간 측정 및 예산 검사
+
+    python benchmarks/import_time.py [--runs 5]
+
+새 인터프리터에서 `import app`과 `create_app()`을 각각 측정하고, 지연 로딩 대상 모듈이
+앱 생성 시점에 로드되지 않았는지 확인한다. 예산을 넘으면 종료 코드 1을 반환한다.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 예산 (밀리초, 여러 번 실행한 값의 중앙값 기준)
+IMPORT_BUDGET_MS = 1000
+CREATE_APP_BUDGET_MS = 300
+
+# 앱 생성 후에도 로드되면 안 되는 모듈 (처음 사용할 때 로드)
+LAZY_MODULES = ['msgpack', 'cProfile', 'pstats', 'tracemalloc']
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app()
+created = time.perf_counter()
+
+import apis.tago_api as tago_api
+import apis.transport as transport
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'loaded_lazy_modules': [name for name in %r if name in sys.modules],
+    'client_created': tago_api._default_client is not None,
+    'transport_created': transport._shared_transport is not None
+}))
+""" % (LAZY_MODULES,)
+
+
+def _run_probe() -> dict:
+    result = subprocess.run(
+        [sys.executable, '-c', _PROBE],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    # 앱 로그 출력 뒤 마지막 줄이 측정 결과
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _top_modules(limit: int = 10) -> list:
+    """-X importtime 기준 자체 임포트 시간이 큰 프로젝트 모듈"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    project_packages = ('app', 'apis', 'routes', 'services', 'utils', 'websocket')
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if name.split('.')[0] in project_packages:
+            modules.append((int(cumulative_us), int(self_us), name))
+    return sorted(modules, reverse=True)[:limit]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='앱 임포트·생성 시간 예산 검사')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    
+    samples = [_run_probe() for _ in range(args.runs)]
+    import_ms = sorted(sample['import_ms'] for sample in samples)[len(samples) // 2]
+    create_ms = sorted(sample['create_app_ms'] for sample in samples)[len(samples) // 2]
+    last = samples[-1]
+    
+    print(f'import app      : {import_ms:7.1f} ms (예산 {IMPORT_BUDGET_MS} ms)')
+    print(f'create_app()    : {create_ms:7.1f} ms (예산 {CREATE_APP_BUDGET_MS} ms)')
+    print('프로젝트 모듈 누적 임포트 시간 상위:')
+    for cumulative_us, self_us, name in _top_modules():
+        print(f'  {cumulative_us / 1000:7.1f} ms (자체 {self_us / 1000:5.1f} ms)  {name}')
+    
+    failures = []
+    if import_ms > IMPORT_BUDGET_MS:
+        failures.append(f'import app {import_ms:.1f} ms > {IMPORT_BUDGET_MS} ms')
+    if create_ms > CREATE_APP_BUDGET_MS:
+        failures.append(f'create_app {create_ms:.1f} ms > {CREATE_APP_BUDGET_MS} ms')
+    if last['loaded_lazy_modules']:
+        failures.append(f"지연 로딩 대상 모듈이 로드됨: {', '.join(last['loaded_lazy_modules'])}")
+    if last['client_created'] or last['transport_created']:
+        failures.append('앱 생성 시점에 TAGO 클라이언트/연결 풀이 생성됨')
+    
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    if not failures:
+        print('OK: 예산 이내')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
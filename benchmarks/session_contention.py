@@ -0,0 +1,116 @@
+# benchmarks/session_contention.py
+"""
+세션 레지스트리 경합 벤치마크
+
+    python benchmarks/session_contention.py [--threads 64] [--ops 2000] [--sessions 1000]
+
+여러 스레드가 같은 세션 ID 풀에 대해 생성(재전송 포함)·워커 시작·중단·조회를 동시에
+호출한다. 샤드 1개(전역 락과 같은 구성)와 기본 샤드 수를 비교하고, 제한 시간 안에
+끝나지 않으면 교착 상태로 보고 종료 코드 1을 반환한다.
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.constants import SESSION_CONFIG  # noqa: E402
+from websocket.manager import SessionManager  # noqa: E402
+
+
+class _IdleWorker:
+    """TAGO를 호출하지 않는 벤치마크용 워커 (스레드 생성 비용은 실제 워커와 같게 유지)"""
+    
+    def __init__(self, **kwargs):
+        self.session_id = kwargs['session_id']
+    
+    def start(self):
+        thread = threading.Thread(target=lambda: None)
+        thread.daemon = True
+        thread.start()
+    
+    def stop(self):
+        pass
+
+
+def _run(shards: int, threads: int, ops: int, sessions: int, timeout: float) -> dict:
+    manager = SessionManager(shards=shards, worker_class=_IdleWorker)
+    session_ids = [f'sid-{i}' for i in range(sessions)]
+    latencies = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads)
+    
+    def client(index: int):
+        rng = random.Random(index)
+        samples = latencies[index]
+        barrier.wait()
+        for _ in range(ops):
+            session_id = rng.choice(session_ids)
+            action = rng.random()
+            started = time.perf_counter()
+            if action < 0.3:
+                # start_bus_monitoring 재전송과 같은 경로 (기존 세션 교체 + 워커 시작)
+                manager.create_session(session_id, 36.35, 127.38, '102')
+                manager.start_monitoring(session_id, None)
+            elif action < 0.45:
+                manager.stop_session(session_id)
+            elif action < 0.55:
+                manager.update_session_station_info(session_id, {'station_id': 'DJB8001793'})
+            elif action < 0.65:
+                manager.touch(session_id)
+            else:
+                manager.is_session_active(session_id)
+                manager.get_session_info(session_id)
+            samples.append(time.perf_counter() - started)
+    
+    workers = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    deadline = time.time() + timeout
+    for worker in workers:
+        worker.join(max(deadline - time.time(), 0))
+    elapsed = time.perf_counter() - started
+    
+    if any(worker.is_alive() for worker in workers):
+        return {'shards': shards, 'deadlocked': True}
+    
+    merged = sorted(sample for samples in latencies for sample in samples)
+    return {
+        'shards': shards,
+        'deadlocked': False,
+        'ops': len(merged),
+        'ops_per_sec': len(merged) / elapsed,
+        'p50_us': merged[len(merged) // 2] * 1e6,
+        'p99_us': merged[int(len(merged) * 0.99)] * 1e6,
+        'max_us': merged[-1] * 1e6,
+        'sessions_left': manager.get_active_sessions_count()
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='세션 레지스트리 경합 벤치마크')
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--ops', type=int, default=2000, help='스레드당 호출 수')
+    parser.add_argument('--sessions', type=int, default=1000, help='세션 ID 풀 크기')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+    
+    failed = False
+    for shards in (1, SESSION_CONFIG['SHARDS']):
+        result = _run(shards, args.threads, args.ops, args.sessions, args.timeout)
+        if result['deadlocked']:
+            print(f"샤드 {shards:3d}개: {args.timeout:.0f}초 안에 끝나지 않음 (교착 상태 의심)")
+            failed = True
+            continue
+        print(f"샤드 {shards:3d}개: {result['ops']}회, {result['ops_per_sec']:,.0f} ops/s, "
+              f"p50 {result['p50_us']:.1f}us, p99 {result['p99_us']:.1f}us, "
+              f"최대 {result['max_us']:.0f}us, 남은 세션 {result['sessions_left']}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
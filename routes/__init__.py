@@ -1,6 +1,12 @@
 from .station_routes import station_bp
+from .timeseries_routes import timeseries_bp
+from .admin_routes import admin_bp
+from .stream_routes import stream_bp
 
 def register_routes(app):
     """버스 도착 정보 리스트 REST API 라우트 등록"""
     app.register_blueprint(station_bp, url_prefix='/api')
+    app.register_blueprint(timeseries_bp, url_prefix='/api')
+    app.register_blueprint(admin_bp, url_prefix='/api')
+    app.register_blueprint(stream_bp, url_prefix='/api')
     print("REST API 등록 완료")
\ No newline at end of file
@@ -0,0 +1,139 @@
+from flask import Blueprint, Response, request
+from utils.middleware import require_admin
+from utils.profiling import profiler, memory_tracker
+from utils.tracing import tracer
+from utils.response_formatter import success_response, error_response
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/admin/profile', methods=['GET'])
+@require_admin
+def get_profile_status():
+    """프로파일링 상태 및 등록된 대상 조회"""
+    return success_response({
+        'cpu': profiler.status(),
+        'memory': memory_tracker.status()
+    })
+
+@admin_bp.route('/admin/profile/start', methods=['POST'])
+@require_admin
+def start_profile():
+    """
+    CPU 프로파일링 시작
+    
+    Request: {"mode": "sample"|"cprofile", "duration": 초, "count": 대상 호출 수,
+              "targets": ["bus_update", "flow2", "socketio"], "interval": 샘플링 간격(초)}
+    """
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        duration = float(data['duration']) if data.get('duration') else None
+        count = int(data['count']) if data.get('count') else None
+        interval = float(data['interval']) if data.get('interval') else None
+    except (TypeError, ValueError):
+        return error_response('duration, count, interval은 숫자여야 합니다.', 'INVALID_REQUEST'), 400
+    
+    targets = data.get('targets')
+    if targets is not None and not isinstance(targets, list):
+        return error_response('targets는 리스트여야 합니다.', 'INVALID_REQUEST'), 400
+    
+    try:
+        session = profiler.start(mode=data.get('mode', 'sample'), duration=duration,
+                                 count=count, targets=targets, interval=interval)
+    except ValueError as e:
+        return error_response(str(e), 'INVALID_REQUEST'), 400
+    except RuntimeError as e:
+        return error_response(str(e), 'PROFILE_ACTIVE'), 409
+    
+    return success_response({'session': session})
+
+@admin_bp.route('/admin/profile/stop', methods=['POST'])
+@require_admin
+def stop_profile():
+    """CPU 프로파일링 종료 (결과 요약 반환)"""
+    result = profiler.stop()
+    if result is None:
+        return error_response('프로파일링 결과가 없습니다.', 'NO_PROFILE'), 404
+    return success_response({key: value for key, value in result.items()
+                             if key not in ('collapsed', 'pstats')})
+
+@admin_bp.route('/admin/profile/result', methods=['GET'])
+@require_admin
+def get_profile_result():
+    """
+    마지막 프로파일링 결과 조회
+    
+    Query: format=collapsed(기본, flamegraph.pl/speedscope 입력용 텍스트) | pstats | json
+    """
+    result = profiler.last_result
+    if result is None:
+        return error_response('프로파일링 결과가 없습니다.', 'NO_PROFILE'), 404
+    
+    output_format = request.args.get('format', 'collapsed')
+    if output_format == 'collapsed':
+        return Response(result.get('collapsed', '') + '\n', mimetype='text/plain')
+    if output_format == 'pstats':
+        if 'pstats' not in result:
+            return error_response('pstats 결과는 cprofile 모드에서만 제공됩니다.', 'INVALID_REQUEST'), 400
+        return Response(result['pstats'], mimetype='text/plain')
+    return success_response({'result': result})
+
+@admin_bp.route('/admin/memory/snapshot', methods=['POST'])
+@require_admin
+def take_memory_snapshot():
+    """tracemalloc 기준 스냅샷 저장 (꺼져 있으면 추적 시작)"""
+    return success_response(memory_tracker.snapshot())
+
+@admin_bp.route('/admin/memory/diff', methods=['GET'])
+@require_admin
+def get_memory_diff():
+    """
+    기준 스냅샷 이후 메모리 증가 위치 조회
+    
+    Query: top(상위 항목 수), group_by=lineno|filename|traceback
+    """
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return error_response('group_by는 lineno, filename, traceback 중 하나여야 합니다.', 'INVALID_REQUEST'), 400
+    
+    try:
+        return success_response(memory_tracker.diff(top=request.args.get('top', type=int), group_by=group_by))
+    except RuntimeError as e:
+        return error_response(str(e), 'NO_SNAPSHOT'), 404
+
+@admin_bp.route('/admin/memory/stop', methods=['POST'])
+@require_admin
+def stop_memory_tracking():
+    """tracemalloc 종료 (추적 오버헤드 제거)"""
+    return success_response(memory_tracker.stop())
+
+@admin_bp.route('/admin/traces', methods=['GET'])
+@require_admin
+def get_traces():
+    """
+    샘플링된 최근 트레이스 조회 (최신순)
+    
+    Query: limit(최대 개수), min_ms(최소 소요 시간), name(루트 구간 이름, 예: worker.tick, http.flow2)
+    """
+    limit = request.args.get('limit', 50, type=int)
+    min_ms = request.args.get('min_ms', 0, type=float)
+    return success_response({
+        'tracing': tracer.get_stats(),
+        'traces': tracer.memory.recent(limit=max(limit, 1), min_duration_ms=min_ms,
+                                       name=request.args.get('name'))
+    })
+
+@admin_bp.route('/admin/traces/config', methods=['POST'])
+@require_admin
+def configure_tracing():
+    """
+    샘플링 비율 변경 (재시작 시 TRACING_CONFIG 값으로 돌아감)
+    
+    Request: {"sample_rate": 0.01}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        tracer.set_sample_rate(float(data.get('sample_rate')))
+    except (TypeError, ValueError):
+        return error_response('sample_rate는 0~1 사이 숫자여야 합니다.', 'INVALID_REQUEST'), 400
+    return success_response({'tracing': tracer.get_stats()})
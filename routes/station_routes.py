@@ -1,19 +1,25 @@
+import time
 from flask import Blueprint, request
 from services.station_services import StationService
+from services.station_search import station_search_index
 from utils.response_formatter import success_response, error_response
 from utils.exceptions import TAGOAPIError
+from utils.constants import BATCH_CONFIG, SEARCH_CONFIG
+from utils.tracing import tracer
 from websocket.manager import session_manager
 
 station_bp = Blueprint('station', __name__)
 station_service = StationService()
 
 @station_bp.route('/station/buses', methods=['POST'])
+@tracer.traced('http.flow2', root=True, attributes=lambda: {'session_id': request.headers.get('X-Session-ID', '')})
 def get_station_all_buses():
     """
     플로우 2: 전체 버스 정보 조회 (세션 기반)
     
-    Request: 빈 POST 요청
+    Request: 빈 POST 요청 또는 {"enrich": true} (?enrich=1도 가능)
     Response: 세션 정보 기반 전체 버스 정보
+              (enrich 지정 시 노선 유형·첫차/막차·배차간격 등 캐시된 노선 정보 포함)
     """
     try:
         # WebSocket 세션 ID 확인 (여러 방법 중 선택 가능)
@@ -30,6 +36,9 @@ def get_station_all_buses():
                 'NO_ACTIVE_SESSION'
             ), 401
         
+        # 플로우 2 호출도 클라이언트 활동으로 보고 하트비트 갱신
+        session_manager.touch(session_id)
+        
         # 세션에서 정류소 정보 가져오기
         session_info = session_manager.get_session_info(session_id)
         if not session_info:
@@ -38,8 +47,15 @@ def get_station_all_buses():
                 'SESSION_NOT_FOUND'
             ), 401
         
+        # 노선 정보 확장 응답 여부 (선택)
+        data = request.get_json(silent=True) or {}
+        enrich = request.args.get('enrich', '').lower() in ('1', 'true') or (
+            isinstance(data, dict) and data.get('enrich') is True
+        )
+        
         # 전체 버스 정보 조회 (세션 정보 활용)
-        result = station_service.get_all_buses_from_session(session_info)
+        tracer.current().set_attribute('station_id', (session_info.get('station_info') or {}).get('station_id', ''))
+        result = station_service.get_all_buses_from_session(session_info, enrich=enrich)
         
         return success_response(result)
         
@@ -54,4 +70,129 @@ def get_station_all_buses():
         return error_response(
             '서버 내부 오류가 발생했습니다',
             'INTERNAL_SERVER_ERROR'
-        ), 500
\ No newline at end of file
+        ), 500
+
+@station_bp.route('/station/buses/batch', methods=['POST'])
+@tracer.traced('http.flow2_batch', root=True)
+def get_station_buses_batch():
+    """
+    플로우 2 일괄 조회: 여러 세션 또는 정류소의 전체 버스 정보
+    
+    Request: {
+        "session_ids": ["abc123", ...],                               # 선택
+        "stations": [{"city_code": "25", "station_id": "DJB..."}],    # 선택
+        "deadline": 3.0                                               # 선택, 초
+    }
+    Response: 항목별 status(ok/error/timeout/not_found/invalid)가 포함된 결과
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        session_ids = data.get('session_ids') or []
+        stations = data.get('stations') or []
+        
+        if not isinstance(session_ids, list) or not isinstance(stations, list):
+            return error_response(
+                'session_ids와 stations는 리스트여야 합니다.',
+                'INVALID_REQUEST'
+            ), 400
+        
+        if not session_ids and not stations:
+            return error_response(
+                '조회할 session_ids 또는 stations가 필요합니다.',
+                'INVALID_REQUEST'
+            ), 400
+        
+        if len(session_ids) + len(stations) > BATCH_CONFIG['MAX_ITEMS']:
+            return error_response(
+                f'한 번에 최대 {BATCH_CONFIG["MAX_ITEMS"]}개까지 조회할 수 있습니다.',
+                'TOO_MANY_ITEMS'
+            ), 400
+        
+        try:
+            deadline = float(data.get('deadline', BATCH_CONFIG['DEFAULT_DEADLINE']))
+        except (TypeError, ValueError):
+            deadline = BATCH_CONFIG['DEFAULT_DEADLINE']
+        deadline = min(max(deadline, 0.1), BATCH_CONFIG['MAX_DEADLINE'])
+        
+        # 플로우 2 조건을 만족하는 세션만 세션 정보 전달 (나머지는 not_found)
+        sessions = [
+            (session_id, session_manager.get_session_info(session_id)
+             if session_manager.is_session_valid_for_flow2(session_id) else None)
+            for session_id in session_ids
+        ]
+        station_pairs = [station if isinstance(station, dict) else {} for station in stations]
+        
+        result = station_service.get_buses_batch(sessions, station_pairs, deadline)
+        
+        return success_response(result)
+        
+    except Exception as e:
+        print(f"Error in get_station_buses_batch: {e}")
+        return error_response(
+            '서버 내부 오류가 발생했습니다',
+            'INTERNAL_SERVER_ERROR'
+        ), 500
+
+
+@station_bp.route('/stations/search', methods=['GET'])
+def search_stations():
+    """
+    정류소명 검색 (자동완성·음성 검색용)
+    
+    Query: q(필수), city_code, lat, lng, limit
+    Response: 매칭 수준·거리순 정류소 목록
+    
+    인덱스가 없는 도시는 TAGO 정류소명 검색으로 응답하고 백그라운드에서 인덱스를 만든다.
+    """
+    try:
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return error_response('검색어(q)가 필요합니다.', 'INVALID_REQUEST'), 400
+        
+        city_code = request.args.get('city_code') or None
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        limit = request.args.get('limit', SEARCH_CONFIG['DEFAULT_LIMIT'], type=int)
+        if limit is None or limit < 1:
+            return error_response('limit은 1 이상이어야 합니다.', 'INVALID_REQUEST'), 400
+        limit = min(limit, SEARCH_CONFIG['MAX_LIMIT'])
+        
+        started_at = time.perf_counter()
+        
+        if city_code and not station_search_index.is_indexed(city_code):
+            # 인덱스가 준비될 때까지 TAGO 검색으로 대체
+            station_search_index.ensure_city(city_code)
+            stations = station_service.client.get_station_by_name(query, city_code)
+            if lat is not None and lng is not None:
+                for station in stations:
+                    station['distance'] = round(station_service.client.calculate_distance(
+                        lat, lng, station['latitude'], station['longitude']
+                    ))
+                stations.sort(key=lambda s: s['distance'])
+            # 거리순 정렬 후 자르기 (가까운 정류소가 앞쪽 limit 밖에 있어도 포함)
+            stations = stations[:limit]
+            source = 'tago'
+        else:
+            stations = station_search_index.search(query, city_code, lat, lng, limit)
+            source = 'index'
+        
+        return success_response({
+            'query': query,
+            'source': source,
+            'stations': stations,
+            'total_count': len(stations),
+            'took_ms': round((time.perf_counter() - started_at) * 1000, 3)
+        })
+        
+    except TAGOAPIError as e:
+        return error_response(
+            f'정류소 검색 실패: {str(e)}',
+            'TAGO_API_ERROR'
+        ), 503
+        
+    except Exception as e:
+        print(f"Error in search_stations: {e}")
+        return error_response(
+            '서버 내부 오류가 발생했습니다',
+            'INTERNAL_SERVER_ERROR'
+        ), 500
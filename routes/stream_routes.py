@@ -0,0 +1,74 @@
+from flask import Blueprint, Response, request
+from utils.constants import MULTI_BUS_CONFIG, SSE_CONFIG
+from utils.exceptions import TAGOAPIError
+from utils.response_formatter import error_response
+from websocket.streams import arrival_stream_hub
+
+stream_bp = Blueprint('stream', __name__)
+
+@stream_bp.route('/stream/arrivals', methods=['GET'])
+def stream_arrivals():
+    """
+    SSE 실시간 도착 정보 스트림 (Socket.IO 없이 단방향 수신)
+    
+    Query: lat, lng (현재 위치로 정류소 확인) 또는 city_code, station_id (정류소 직접 지정)
+           bus_numbers=146,341 (선택, 없으면 정류소 전체), interval (초, 최소 10)
+           last_event_id (선택, Last-Event-ID 헤더를 보낼 수 없는 클라이언트용)
+    Response: text/event-stream (event: bus_update, 데이터 형식은 Socket.IO bus_update와 같음)
+    """
+    args = request.args
+    bus_numbers = tuple(dict.fromkeys(number.strip() for number in args.get('bus_numbers', args.get('bus_number', '')).split(',')
+                                      if number.strip()))
+    if len(bus_numbers) > MULTI_BUS_CONFIG['MAX_BUS_NUMBERS']:
+        return error_response(
+            f"버스 번호는 최대 {MULTI_BUS_CONFIG['MAX_BUS_NUMBERS']}개까지 구독할 수 있습니다.",
+            'INVALID_REQUEST'
+        ), 400
+    
+    interval = args.get('interval', SSE_CONFIG['DEFAULT_INTERVAL'], type=int)
+    if not interval or interval < SSE_CONFIG['MIN_INTERVAL']:
+        interval = SSE_CONFIG['DEFAULT_INTERVAL']
+    
+    last_event_id = request.headers.get('Last-Event-ID') or args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    city_code = args.get('city_code')
+    station_id = args.get('station_id')
+    station_name = ''
+    if not (city_code and station_id):
+        lat = args.get('lat', type=float)
+        lng = args.get('lng', type=float)
+        if lat is None or lng is None:
+            return error_response(
+                'lat, lng 또는 city_code, station_id가 필요합니다.',
+                'INVALID_REQUEST'
+            ), 400
+        try:
+            station = arrival_stream_hub.resolve_station(lat, lng)
+        except TAGOAPIError as e:
+            return error_response(f'정류소 조회 실패: {str(e)}', 'TAGO_API_ERROR'), 503
+        if not station:
+            return error_response('주변에 정류소가 없습니다.', 'STATION_NOT_FOUND'), 404
+        city_code, station_id, station_name = station['city_code'], station['station_id'], station['station_name']
+    
+    # 클라이언트가 임의로 넣을 수 있는 X-Forwarded-For는 직접 읽지 않음 (프록시 뒤면 create_app의 ProxyFix가 반영)
+    client_addr = request.remote_addr or ''
+    subscription = arrival_stream_hub.open(city_code, station_id, station_name, bus_numbers, interval, client_addr)
+    if subscription is None:
+        return error_response('동시 스트림 연결 수가 한도를 넘었습니다.', 'TOO_MANY_STREAMS'), 503
+    
+    # 요청 컨텍스트를 붙잡지 않도록 필요한 값만 생성기에 전달
+    response = Response(
+        arrival_stream_hub.stream(subscription, last_event_id),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'   # nginx 응답 버퍼링 비활성화
+        }
+    )
+    # 생성기가 시작되기 전에 연결이 끊겨도 구독이 해제되도록 응답 종료 시 해제
+    response.call_on_close(lambda: arrival_stream_hub.close(subscription))
+    return response
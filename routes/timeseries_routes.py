@@ -0,0 +1,28 @@
+import json
+from flask import Blueprint, Response, request, stream_with_context
+from services.arrival_timeseries import arrival_timeseries
+from utils.middleware import require_admin
+
+timeseries_bp = Blueprint('timeseries', __name__)
+
+@timeseries_bp.route('/timeseries/arrivals', methods=['GET'])
+@require_admin
+def export_arrival_timeseries():
+    """
+    관측된 도착 정보 시계열 내보내기 (오프라인 분석용, 관리자 전용)
+    
+    Query: station_id, route_id, since(epoch 초) - 모두 선택사항
+    Response: NDJSON 스트림 (한 줄에 관측값 1건)
+    """
+    station_id = request.args.get('station_id') or None
+    route_id = request.args.get('route_id') or None
+    since = request.args.get('since', type=float)
+    
+    def generate():
+        for sample in arrival_timeseries.iter_samples(station_id, route_id, since):
+            yield json.dumps(sample, ensure_ascii=False) + '\n'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson'
+    )
@@ -0,0 +1,147 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from apis.tago_api import add_arrival_listener
+from utils.constants import ESTIMATOR_CONFIG
+
+
+class _RouteState:
+    """(노선, 정류소)별 최근 관측값과 학습된 추정 파라미터"""
+    
+    __slots__ = ('observed_at', 'arrival_time', 'remaining_stations',
+                 'rate', 'drift', 'sec_per_station', 'samples')
+    
+    def __init__(self, observed_at: float, arrival_time: int, remaining_stations: int):
+        self.observed_at = observed_at
+        self.arrival_time = arrival_time
+        self.remaining_stations = remaining_stations
+        self.rate = 1.0                       # 실제 1초당 도착 예정 시간 감소량
+        self.drift = ESTIMATOR_CONFIG['DEFAULT_DRIFT']  # 경과 1초당 예측 오차
+        self.sec_per_station = arrival_time / remaining_stations if remaining_stations > 0 else None
+        self.samples = 1
+
+
+class ArrivalEstimator:
+    """
+    TAGO 관측값 사이의 도착 예정 시간 보간기
+    
+    연속된 관측에서 도착 예정 시간 감소율, 예측 오차, 정류장당 소요 시간을
+    지수 이동 평균으로 학습하고 다음 관측 전까지 카운트다운을 추정한다.
+    새 관측이 들어오면 추정값은 항상 실제 값으로 교정된다.
+    """
+    
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or ESTIMATOR_CONFIG['MAX_ENTRIES']
+        self._states: 'OrderedDict[Tuple[str, str], _RouteState]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def observe(self, route_key: str, station_id: str, arrival_time: int,
+                remaining_stations: int, observed_at: float = None):
+        """
+        새 관측값 반영
+        
+        Args:
+            route_key (str): 노선 ID (없으면 노선 번호)
+            station_id (str): 정류소 ID
+            arrival_time (int): 도착 예정 시간 (초)
+            remaining_stations (int): 남은 정류장 수
+            observed_at (float): 관측 시각 (epoch 초)
+        """
+        if arrival_time <= 0:
+            return
+        
+        observed_at = observed_at or time.time()
+        alpha = ESTIMATOR_CONFIG['SMOOTHING']
+        key = (route_key, station_id)
+        
+        with self._lock:
+            state = self._states.get(key)
+            elapsed = observed_at - state.observed_at if state else 0
+            
+            if (state is None
+                    or arrival_time > state.arrival_time + ESTIMATOR_CONFIG['JUMP_THRESHOLD']
+                    or 0 < state.remaining_stations < remaining_stations):
+                # 처음 보는 노선이거나 이전 버스가 지나가고 다음 버스로 바뀐 경우
+                # (다음 버스가 가까우면 도착 예정 시간은 조금만 늘고 남은 정류장 수가 늘어남)
+                self._states[key] = _RouteState(observed_at, arrival_time, remaining_stations)
+            elif elapsed > 0:
+                predicted = state.arrival_time - state.rate * elapsed
+                observed_rate = (state.arrival_time - arrival_time) / elapsed
+                state.rate = min(max((1 - alpha) * state.rate + alpha * observed_rate, 0.2), 3.0)
+                state.drift = (1 - alpha) * state.drift + alpha * abs(arrival_time - predicted) / elapsed
+                if remaining_stations > 0:
+                    per_station = arrival_time / remaining_stations
+                    state.sec_per_station = (per_station if state.sec_per_station is None
+                                             else (1 - alpha) * state.sec_per_station + alpha * per_station)
+                state.observed_at = observed_at
+                state.arrival_time = arrival_time
+                state.remaining_stations = remaining_stations
+                state.samples += 1
+            else:
+                return
+            
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+    
+    def observe_arrivals(self, city_code: str, station_id: str, arrivals: List[Dict], fetched_at: float):
+        """정류소 도착 정보 리스트 반영 (노선별로 가장 빨리 오는 버스 기준)"""
+        fastest: Dict[str, Dict] = {}
+        for bus in arrivals:
+            route_key = bus.get('route_id') or str(bus.get('route_name', '')).strip()
+            if not route_key or bus.get('arrival_time', 0) <= 0:
+                continue
+            if route_key not in fastest or bus['arrival_time'] < fastest[route_key]['arrival_time']:
+                fastest[route_key] = bus
+        
+        for route_key, bus in fastest.items():
+            self.observe(route_key, station_id, bus['arrival_time'],
+                         bus.get('remaining_stations', 0), fetched_at)
+    
+    def estimate(self, route_key: str, station_id: str, now: float = None) -> Optional[Dict]:
+        """
+        현재 시각 기준 도착 예정 시간 추정
+        
+        Args:
+            route_key (str): 노선 ID (없으면 노선 번호)
+            station_id (str): 정류소 ID
+            now (float): 기준 시각 (epoch 초)
+        
+        Returns:
+            Optional[Dict]: 추정값과 신뢰 구간 (관측이 없거나 너무 오래되었으면 None)
+        """
+        state = self._states.get((route_key, station_id))
+        if state is None:
+            return None
+        
+        elapsed = max((now or time.time()) - state.observed_at, 0)
+        if elapsed > ESTIMATOR_CONFIG['MAX_EXTRAPOLATION']:
+            return None
+        
+        estimated = max(state.arrival_time - state.rate * elapsed, 0)
+        margin = state.drift * elapsed
+        
+        remaining_stations = state.remaining_stations
+        if state.sec_per_station:
+            remaining_stations = min(remaining_stations, math.ceil(estimated / state.sec_per_station))
+        
+        return {
+            'arrival_time': int(round(estimated)),
+            'arrival_time_low': int(max(estimated - margin, 0)),
+            'arrival_time_high': int(round(estimated + margin)),
+            'remaining_stations': remaining_stations,
+            'observed_at': state.observed_at,
+            'elapsed': round(elapsed, 1),
+            'samples': state.samples
+        }
+    
+    def get_stats(self) -> Dict:
+        """추정기 통계 조회"""
+        return {'tracked_routes': len(self._states)}
+
+
+# 글로벌 추정기 인스턴스 (TAGO 도착 정보 조회 경로에서 자동으로 학습)
+arrival_estimator = ArrivalEstimator()
+add_arrival_listener(arrival_estimator.observe_arrivals)
@@ -0,0 +1,181 @@
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+from apis.tago_api import add_arrival_listener
+from utils.constants import TIMESERIES_CONFIG
+
+
+class _SeriesBuffer:
+    """(정류소, 노선)별 고정 크기 컬럼형 링 버퍼"""
+    
+    __slots__ = ('city_code', 'route_name', 'timestamps', 'arrival_times',
+                 'remaining_stations', 'head', 'count')
+    
+    def __init__(self, capacity: int, city_code: str = '', route_name: str = ''):
+        self.city_code = city_code
+        self.route_name = route_name
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.arrival_times = array('i', bytes(4 * capacity))
+        self.remaining_stations = array('i', bytes(4 * capacity))
+        self.head = 0   # 다음에 쓸 위치
+        self.count = 0
+    
+    @property
+    def capacity(self) -> int:
+        return len(self.timestamps)
+    
+    def append(self, timestamp: float, arrival_time: int, remaining_stations: int):
+        self.timestamps[self.head] = timestamp
+        self.arrival_times[self.head] = arrival_time
+        self.remaining_stations[self.head] = remaining_stations
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+    
+    def newest_timestamp(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return self.timestamps[(self.head - 1) % self.capacity]
+    
+    def oldest_timestamp(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return self.timestamps[(self.head - self.count) % self.capacity]
+    
+    def rows(self, since: float = None) -> List[Tuple[float, int, int]]:
+        """저장된 관측값을 오래된 순으로 반환"""
+        start = (self.head - self.count) % self.capacity
+        result = []
+        for offset in range(self.count):
+            i = (start + offset) % self.capacity
+            if since is not None and self.timestamps[i] < since:
+                continue
+            result.append((self.timestamps[i], self.arrival_times[i], self.remaining_stations[i]))
+        return result
+    
+    def nbytes(self) -> int:
+        return (sys.getsizeof(self) + sys.getsizeof(self.timestamps) +
+                sys.getsizeof(self.arrival_times) + sys.getsizeof(self.remaining_stations))
+
+
+class ArrivalTimeSeriesStore:
+    """
+    관측된 도착 정보 시계열 저장소
+    
+    TAGO 도착 정보 조회 경로(와 노선 추적 경로)에서 받은 값을 (station_id, route_id)별
+    링 버퍼에 기록한다. 전체 메모리 상한을 넘으면 가장 오래 갱신되지 않은
+    시계열부터 제거한다.
+    """
+    
+    def __init__(self, capacity: int = None, max_bytes: int = None):
+        self.capacity = capacity or TIMESERIES_CONFIG['CAPACITY_PER_SERIES']
+        self.max_bytes = max_bytes or TIMESERIES_CONFIG['MAX_MEMORY_BYTES']
+        self.bytes_per_series = _SeriesBuffer(self.capacity).nbytes()
+        self.max_series = max(self.max_bytes // self.bytes_per_series, 1)
+        
+        self._series: 'OrderedDict[Tuple[str, str], _SeriesBuffer]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.samples_written = 0
+        self.evicted_series = 0
+    
+    def record(self, station_id: str, route_id: str, timestamp: float, arrival_time: int,
+               remaining_stations: int, city_code: str = '', route_name: str = ''):
+        """관측값 1건 기록 (이미 기록한 시각 이전·같은 시각의 관측값은 무시)"""
+        key = (station_id, route_id)
+        with self._lock:
+            buffer = self._series.get(key)
+            if buffer is not None and buffer.count and timestamp <= buffer.newest_timestamp():
+                # 같은 조회 결과를 여러 세션이 기록하는 경우 (노선 추적 경로)
+                return
+            if buffer is None:
+                while len(self._series) >= self.max_series:
+                    self._series.popitem(last=False)
+                    self.evicted_series += 1
+                buffer = _SeriesBuffer(self.capacity, city_code, route_name)
+                self._series[key] = buffer
+            else:
+                self._series.move_to_end(key)
+            buffer.append(timestamp, arrival_time, remaining_stations)
+            self.samples_written += 1
+    
+    def record_arrivals(self, city_code: str, station_id: str, arrivals: List[Dict], fetched_at: float):
+        """정류소 도착 정보 리스트 기록 (노선별로 가장 빨리 오는 버스 기준)"""
+        fastest: Dict[str, Dict] = {}
+        for bus in arrivals:
+            route_id = bus.get('route_id') or str(bus.get('route_name', '')).strip()
+            if not route_id:
+                continue
+            current = fastest.get(route_id)
+            arrival_time = bus.get('arrival_time', 0)
+            if current is None or (arrival_time > 0 and
+                                   (current['arrival_time'] <= 0 or arrival_time < current['arrival_time'])):
+                fastest[route_id] = bus
+        
+        for route_id, bus in fastest.items():
+            self.record(station_id, route_id, fetched_at, bus.get('arrival_time', 0),
+                        bus.get('remaining_stations', 0), city_code, str(bus.get('route_name', '')))
+    
+    def iter_samples(self, station_id: str = None, route_id: str = None,
+                     since: float = None) -> Iterator[Dict]:
+        """
+        저장된 관측값 순회 (시계열 단위로 복사 후 반환하므로 기록을 오래 막지 않음)
+        
+        Args:
+            station_id (str): 정류소 ID 필터 (선택사항)
+            route_id (str): 노선 ID 필터 (선택사항)
+            since (float): 이 시각(epoch 초) 이후 관측값만
+        
+        Yields:
+            Dict: 관측값 1건
+        """
+        with self._lock:
+            keys = [key for key in self._series
+                    if (station_id is None or key[0] == station_id) and
+                       (route_id is None or key[1] == route_id)]
+        
+        for key in keys:
+            with self._lock:
+                buffer = self._series.get(key)
+                if buffer is None:
+                    continue
+                rows = buffer.rows(since)
+                city_code, route_name = buffer.city_code, buffer.route_name
+            
+            for timestamp, arrival_time, remaining_stations in rows:
+                yield {
+                    'city_code': city_code,
+                    'station_id': key[0],
+                    'route_id': key[1],
+                    'route_name': route_name,
+                    'timestamp': timestamp,
+                    'arrival_time': arrival_time,
+                    'remaining_stations': remaining_stations
+                }
+    
+    def get_stats(self) -> Dict:
+        """보존 기간 및 메모리 사용량 조회"""
+        with self._lock:
+            series_count = len(self._series)
+            samples = sum(buffer.count for buffer in self._series.values())
+            oldest = min((buffer.oldest_timestamp() for buffer in self._series.values()
+                          if buffer.count), default=None)
+        
+        return {
+            'series': series_count,
+            'max_series': self.max_series,
+            'samples': samples,
+            'samples_written': self.samples_written,
+            'evicted_series': self.evicted_series,
+            'memory_bytes': series_count * self.bytes_per_series,
+            'memory_cap_bytes': self.max_bytes,
+            'capacity_per_series': self.capacity,
+            'retention_seconds': round(time.time() - oldest, 1) if oldest else 0
+        }
+
+
+# 글로벌 시계열 저장소 (TAGO 도착 정보 조회 경로에서 자동으로 기록)
+arrival_timeseries = ArrivalTimeSeriesStore()
+add_arrival_listener(arrival_timeseries.record_arrivals)
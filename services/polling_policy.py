@@ -0,0 +1,131 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+from utils.constants import POLLING_CONFIG
+from services.route_schedule import RouteScheduleStore, local_time, route_schedule
+
+
+class PollDecision:
+    """워커 틱 하나에 대한 폴링 정책 결정"""
+    
+    __slots__ = ('wait', 'suspended', 'resume_at', 'reason')
+    
+    def __init__(self, wait: float, suspended: bool = False, resume_at: Optional[float] = None,
+                 reason: str = ''):
+        self.wait = wait              # 다음 틱까지 대기 시간 (초)
+        self.suspended = suspended    # True면 이번 틱은 TAGO 조회 없이 운행 없음으로 보고
+        self.resume_at = resume_at    # 운행 재개 예정 시각 (타임스탬프)
+        self.reason = reason
+
+
+class PollingPolicy(ABC):
+    """
+    모니터링 워커 폴링 정책
+    
+    BusMonitoringWorker가 틱마다 decide()를 호출해 이번 틱에 조회할지와 다음 틱까지의
+    대기 시간을 정한다. 워커의 interval, station, bus_numbers, last_update를 참고할 수 있다.
+    """
+    
+    name = 'base'
+    
+    @abstractmethod
+    def decide(self, worker, now: float = None) -> PollDecision:
+        """이번 틱의 폴링 결정 (now는 기준 시각, 없으면 현재 시각)"""
+    
+    def get_stats(self) -> Dict:
+        return {'policy': self.name}
+
+
+class FixedIntervalPolicy(PollingPolicy):
+    """항상 요청한 간격으로 폴링"""
+    
+    name = 'fixed'
+    
+    def decide(self, worker, now: float = None) -> PollDecision:
+        return PollDecision(worker.interval)
+
+
+class ScheduleAwarePolicy(PollingPolicy):
+    """
+    노선 운행 시간·배차 간격 기반 폴링
+    
+    - 구독한 버스가 모두 운행 시간대 밖이면 TAGO 조회 없이 운행 없음으로 보고하고 재개 시각까지 쉰다.
+    - 운행 중이면 현재 시간대(첨두/비첨두) 배차간격에 비례해 폴링 간격을 늘린다(요청 간격이 하한).
+    - 직전 결과에서 버스가 가까우면 다시 요청 간격까지 촘촘하게 조회한다.
+    정류소가 확정되기 전이거나 운행 정보를 모르는 버스가 있으면 요청 간격을 그대로 쓴다.
+    """
+    
+    name = 'schedule'
+    
+    def __init__(self, schedules: RouteScheduleStore = None):
+        self.schedules = schedules or route_schedule
+        self._lock = threading.Lock()
+        self.decisions = 0
+        self.suspended_ticks = 0
+        self.slowed_ticks = 0
+    
+    def decide(self, worker, now: float = None) -> PollDecision:
+        now = now or time.time()
+        decision = self._decide(worker, now)
+        with self._lock:
+            self.decisions += 1
+            if decision.suspended:
+                self.suspended_ticks += 1
+            elif decision.wait > worker.interval:
+                self.slowed_ticks += 1
+        return decision
+    
+    def _decide(self, worker, now: float) -> PollDecision:
+        station = worker.station
+        if not station or not station.get('city_code'):
+            return PollDecision(worker.interval)
+        
+        local = local_time(now)
+        minute_of_day = local.hour * 60 + local.minute
+        peak = any(start <= local.hour < end for start, end in POLLING_CONFIG['PEAK_HOURS'])
+        
+        minutes_until = []
+        headways = []
+        for bus_number in worker.bus_numbers:
+            schedules = self.schedules.get(station['city_code'], bus_number)
+            if not schedules:
+                return PollDecision(worker.interval)
+            for schedule in schedules:
+                until = schedule.minutes_until_service(minute_of_day)
+                minutes_until.append(until)
+                if until == 0 and schedule.headway(peak):
+                    headways.append(schedule.headway(peak))
+        
+        if min(minutes_until) > 0:
+            resume_at = now + min(minutes_until) * 60 - local.second
+            wait = min(max(resume_at - now, worker.interval), POLLING_CONFIG['MAX_SUSPEND_WAIT'])
+            resume_label = local_time(resume_at).strftime('%H:%M')
+            return PollDecision(wait, suspended=True, resume_at=resume_at,
+                                reason=f'운행 시간이 아닙니다 ({resume_label}부터 운행 정보 확인)')
+        
+        wait = worker.interval
+        if headways:
+            headway_wait = min(headways) * 60 * POLLING_CONFIG['HEADWAY_FRACTION']
+            wait = max(wait, min(headway_wait, POLLING_CONFIG['MAX_POLL_INTERVAL']))
+        
+        last_update = worker.last_update
+        if last_update and last_update.get('arrival_time'):
+            # 버스가 가까우면 도착 직전 변화를 놓치지 않게 간격 축소
+            wait = min(wait, max(worker.interval, last_update['arrival_time'] * POLLING_CONFIG['APPROACH_FRACTION']))
+        return PollDecision(wait)
+    
+    def get_stats(self) -> Dict:
+        """폴링 정책 통계"""
+        with self._lock:
+            return {
+                'policy': self.name,
+                'decisions': self.decisions,
+                'suspended_ticks': self.suspended_ticks,
+                'slowed_ticks': self.slowed_ticks,
+                'schedules': self.schedules.get_stats()
+            }
+
+
+# 워커 기본 폴링 정책 (워커 생성 시 다른 정책 객체를 지정할 수 있음)
+polling_policy = ScheduleAwarePolicy() if POLLING_CONFIG['SCHEDULE_AWARE'] else FixedIntervalPolicy()
@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from apis.tago_api import get_default_client, request_flight
+from utils.cache import TTLCache
+from utils.concurrency import get_fetch_executor
+from utils.constants import ROUTE_INFO_CONFIG
+
+
+class RouteInfoStore:
+    """
+    노선 ID별 노선 정보 캐시 (get_route_info_by_route_id 결과)
+    
+    노선 유형·첫차/막차·배차간격은 하루에 거의 바뀌지 않으므로 오래 캐시한다.
+    peek()은 캐시만 확인하고, prefetch()는 캐시에 없는 노선을 공용 스레드 풀에서 백그라운드로 조회하므로
+    응답 경로는 차가운 노선 조회를 기다리지 않는다. 조회 실패한 노선은 RETRY 동안, TAGO에 정보가 없던
+    노선은 캐시하지 않고(peek이 None이라 enriched=False) EMPTY_RETRY 동안 다시 조회하지 않는다.
+    """
+    
+    def __init__(self):
+        self._cache = TTLCache(ttl=ROUTE_INFO_CONFIG['TTL'], max_entries=ROUTE_INFO_CONFIG['MAX_ROUTES'])
+        self._lock = threading.Lock()
+        self._pending = set()                               # 백그라운드 조회 중인 (도시, 노선 ID)
+        self._retry_after: Dict[Tuple[str, str], float] = {}  # 조회 실패 후 재시도 가능 시각
+        self.lookups = 0
+        self.failures = 0
+        self.empty = 0
+        self.prefetched = 0
+    
+    def peek(self, city_code: str, route_id: str) -> Optional[Dict]:
+        """캐시된 노선 정보 (없으면 None, 조회하지 않음)"""
+        return self._cache.get((city_code, route_id))
+    
+    def get(self, city_code: str, route_id: str) -> Dict:
+        """
+        노선 정보 조회 (캐시에 없으면 조회 후 캐시)
+        
+        Args:
+            city_code (str): 도시코드
+            route_id (str): 노선 ID
+        
+        Returns:
+            Dict: 노선 정보 (TAGO에 정보가 없으면 빈 딕셔너리)
+        
+        Raises:
+            TAGOAPIError: 조회 실패 시
+        """
+        key = (city_code, route_id)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        return request_flight.do(('route_info',) + key, lambda: self._load(key))
+    
+    def prefetch(self, city_code: str, route_ids: Iterable[str]) -> int:
+        """
+        캐시에 없는 노선 정보를 백그라운드에서 조회
+        
+        Returns:
+            int: 새로 조회를 시작한 노선 수
+        """
+        now = time.time()
+        missing = []
+        with self._lock:
+            for route_id in dict.fromkeys(route_ids):
+                key = (city_code, route_id)
+                if (not route_id or key in self._pending or self._retry_after.get(key, 0.0) > now
+                        or self._cache.get(key) is not None):
+                    continue
+                self._pending.add(key)
+                missing.append(key)
+            self.prefetched += len(missing)
+        
+        executor = get_fetch_executor()
+        for key in missing:
+            executor.submit(self._prefetch_one, key)
+        return len(missing)
+    
+    def _prefetch_one(self, key: Tuple[str, str]):
+        try:
+            self.get(*key)
+        except Exception as e:
+            print(f'노선 정보 조회 실패 ({key[0]}, {key[1]}): {e}')
+            with self._lock:
+                self.failures += 1
+                self._defer(key, ROUTE_INFO_CONFIG['RETRY'])
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+    
+    def _defer(self, key: Tuple[str, str], seconds: float):
+        """노선을 seconds 동안 백그라운드 조회에서 제외 (self._lock 안에서 호출)"""
+        now = time.time()
+        if len(self._retry_after) >= ROUTE_INFO_CONFIG['MAX_ROUTES']:
+            self._retry_after = {k: until for k, until in self._retry_after.items() if until > now}
+        self._retry_after[key] = now + seconds
+    
+    def _load(self, key: Tuple[str, str]) -> Dict:
+        city_code, route_id = key
+        with self._lock:
+            self.lookups += 1
+        info = get_default_client().get_route_info_by_route_id(route_id, city_code)
+        if not info:
+            # 빈 결과를 TTL 동안 캐시하면 정보 없이 enriched로 표시되므로 캐시하지 않고 재조회만 늦춤
+            with self._lock:
+                self.empty += 1
+                self._defer(key, ROUTE_INFO_CONFIG['EMPTY_RETRY'])
+            return info
+        self._cache.set(key, info)
+        return info
+    
+    def get_stats(self) -> Dict:
+        """노선 정보 캐시 통계"""
+        with self._lock:
+            return {
+                'cached_routes': len(self._cache),
+                'pending': len(self._pending),
+                'lookups': self.lookups,
+                'prefetched': self.prefetched,
+                'failures': self.failures,
+                'empty': self.empty,
+                'cache': self._cache.get_stats()
+            }
+
+
+# 글로벌 노선 정보 캐시 인스턴스
+route_info_store = RouteInfoStore()
@@ -0,0 +1,164 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from apis.tago_api import get_default_client, request_flight
+from services.route_info import route_info_store
+from utils.cache import TTLCache
+from utils.constants import POLLING_CONFIG
+
+# 노선 운행 시각 기준 시간대 (서버 시간대와 무관하게 KST로 계산)
+LOCAL_TZ = timezone(timedelta(hours=POLLING_CONFIG['UTC_OFFSET_HOURS']))
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _parse_hhmm(value) -> Optional[int]:
+    """TAGO 시각('0530', 530, '053000' 등)을 자정 기준 분으로 변환 (없거나 잘못되면 None)"""
+    digits = str(value or '').strip()
+    if not digits.isdigit():
+        return None
+    digits = digits[:4] if len(digits) > 4 else digits.zfill(4)
+    hours, minutes = int(digits[:2]), int(digits[2:])
+    if minutes >= 60 or hours >= 48:
+        return None
+    return hours * 60 + minutes
+
+
+def _parse_headway(value) -> Optional[int]:
+    """배차간격(분) 변환 (없거나 0이면 None)"""
+    try:
+        minutes = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return minutes if minutes > 0 else None
+
+
+def local_time(timestamp: float) -> datetime:
+    """타임스탬프를 노선 운행 시간대 시각으로 변환"""
+    return datetime.fromtimestamp(timestamp, LOCAL_TZ)
+
+
+class RouteSchedule:
+    """노선 운행 시간대와 배차 간격 (TAGO 노선 정보에서 추출)"""
+    
+    __slots__ = ('route_id', 'route_name', 'first_minute', 'last_minute', 'peak_headway', 'offpeak_headway')
+    
+    def __init__(self, route: Dict):
+        self.route_id = route.get('route_id', '')
+        self.route_name = str(route.get('route_name', '')).strip()
+        
+        # 상행·하행 중 가장 이른 첫차와 가장 늦은 막차
+        firsts = [minute for minute in (_parse_hhmm(route.get('up_first_time')),
+                                        _parse_hhmm(route.get('down_first_time'))) if minute is not None]
+        lasts = [minute for minute in (_parse_hhmm(route.get('up_last_time')),
+                                       _parse_hhmm(route.get('down_last_time'))) if minute is not None]
+        self.first_minute = min(firsts) if firsts else None
+        self.last_minute = max(lasts) if lasts else None
+        if self.first_minute is not None and self.last_minute is not None and self.last_minute < self.first_minute:
+            # 막차가 자정을 넘기는 노선
+            self.last_minute += MINUTES_PER_DAY
+        
+        self.peak_headway = _parse_headway(route.get('peek_alloc'))
+        self.offpeak_headway = _parse_headway(route.get('npeek_alloc'))
+    
+    def minutes_until_service(self, minute_of_day: int) -> int:
+        """
+        운행 시간대까지 남은 시간
+        
+        첫차 전 PRE_SERVICE_LEAD분부터 막차 후 POST_SERVICE_GRACE분까지를 운행 시간대로 본다.
+        운행 시각 정보가 없으면 항상 운행 중으로 간주한다.
+        
+        Args:
+            minute_of_day (int): 현재 시각 (자정 기준 분)
+        
+        Returns:
+            int: 운행 시간대 안이면 0, 밖이면 운행 시간대 시작까지 남은 분
+        """
+        if self.first_minute is None or self.last_minute is None:
+            return 0
+        
+        start = self.first_minute - POLLING_CONFIG['PRE_SERVICE_LEAD']
+        end = self.last_minute + POLLING_CONFIG['POST_SERVICE_GRACE']
+        for minute in (minute_of_day - MINUTES_PER_DAY, minute_of_day, minute_of_day + MINUTES_PER_DAY):
+            if start <= minute <= end:
+                return 0
+        return (start - minute_of_day) % MINUTES_PER_DAY
+    
+    def headway(self, peak: bool) -> Optional[int]:
+        """현재 시간대 배차간격(분), 해당 값이 없으면 다른 시간대 값"""
+        if peak:
+            return self.peak_headway or self.offpeak_headway
+        return self.offpeak_headway or self.peak_headway
+
+
+class RouteScheduleStore:
+    """
+    버스 번호별 노선 운행 정보 캐시
+    
+    노선번호 검색으로 같은 번호의 노선(방향·변형 노선 포함)을 찾고 노선 정보를 조회해 둔다.
+    운행 정보는 하루에 거의 바뀌지 않으므로 오래 캐시하고, 조회 실패는 짧게만 기억한다.
+    """
+    
+    def __init__(self):
+        self._cache = TTLCache(ttl=POLLING_CONFIG['SCHEDULE_TTL'], max_entries=POLLING_CONFIG['MAX_SCHEDULES'])
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.failures = 0
+    
+    def get(self, city_code: str, bus_number: str) -> Optional[List[RouteSchedule]]:
+        """
+        버스 번호의 노선 운행 정보 조회
+        
+        Args:
+            city_code (str): 도시코드
+            bus_number (str): 버스 번호
+        
+        Returns:
+            Optional[List[RouteSchedule]]: 노선별 운행 정보 (찾지 못했거나 조회 실패 시 None)
+        """
+        key = (city_code, str(bus_number).strip())
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached or None
+        
+        schedules = request_flight.do(('route_schedule',) + key, lambda: self._load(key))
+        return schedules or None
+    
+    def _load(self, key: Tuple[str, str]) -> List[RouteSchedule]:
+        city_code, bus_number = key
+        with self._lock:
+            self.lookups += 1
+        
+        try:
+            client = get_default_client()
+            routes = [route for route in client.get_routes_by_number(city_code, bus_number)
+                      if str(route['route_name']).strip() == bus_number and route['route_id']]
+            schedules = []
+            for route in routes:
+                info = route_info_store.get(city_code, route['route_id'])
+                if info:
+                    schedules.append(RouteSchedule(info))
+            self._cache.set(key, schedules)
+            return schedules
+        except Exception as e:
+            print(f'노선 운행 정보 조회 실패 ({city_code}, {bus_number}): {e}')
+            with self._lock:
+                self.failures += 1
+            # 저장 시각을 앞당겨 SCHEDULE_RETRY 후 만료되게 함 (매 틱 재조회 방지)
+            stored_at = time.time() - POLLING_CONFIG['SCHEDULE_TTL'] + POLLING_CONFIG['SCHEDULE_RETRY']
+            self._cache.set(key, [], stored_at=stored_at)
+            return []
+    
+    def get_stats(self) -> Dict:
+        """운행 정보 캐시 통계"""
+        with self._lock:
+            return {
+                'cached_bus_numbers': len(self._cache),
+                'lookups': self.lookups,
+                'failures': self.failures
+            }
+
+
+# 글로벌 노선 운행 정보 캐시 인스턴스
+route_schedule = RouteScheduleStore()
@@ -0,0 +1,206 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from apis.tago_api import get_default_client, request_flight
+from utils.cache import TTLCache
+from utils.shared_cache import fetch_shared
+from utils.constants import ROUTE_TRACKING_CONFIG
+
+
+class _RouteProgress:
+    """노선별 버스 진행 상태 (정류장당 소요 시간 학습용)"""
+    
+    __slots__ = ('vehicles', 'sec_per_station', 'samples')
+    
+    def __init__(self):
+        # 차량번호 -> (마지막으로 지난 정류소 순번, 해당 정류소를 지난 것으로 처음 본 시각, 순번 변화를 본 적 있는지)
+        self.vehicles: Dict[str, Tuple[int, float, bool]] = {}
+        self.sec_per_station = ROUTE_TRACKING_CONFIG['DEFAULT_SEC_PER_STATION']
+        self.samples = 0
+
+
+class RouteVehicleTracker:
+    """
+    노선 단위 버스 위치 추적기
+    
+    노선 경유 정류소 순서를 캐시해 두고, 노선별 버스 위치를 한 번 조회해서
+    그 노선 위의 모든 정류소에 대한 남은 정류장 수와 도착 예정 시간을 계산한다.
+    같은 노선을 보는 세션이 여러 정류소에 흩어져 있어도 TAGO 조회는 노선당 한 번이다.
+    """
+    
+    def __init__(self):
+        max_routes = ROUTE_TRACKING_CONFIG['MAX_ROUTES']
+        self._stops = TTLCache(ttl=ROUTE_TRACKING_CONFIG['STOPS_TTL'], max_entries=max_routes)
+        self._locations = TTLCache(ttl=ROUTE_TRACKING_CONFIG['LOCATION_TTL'], max_entries=max_routes)
+        self._progress: Dict[Tuple[str, str], _RouteProgress] = {}
+        self._lock = threading.Lock()
+        self.location_fetches = 0
+        self.lookups = 0
+    
+    def _get_stop_orders(self, city_code: str, route_id: str) -> Dict[str, List[int]]:
+        """정류소 ID -> 노선 내 순번 리스트 (순환 노선은 같은 정류소를 두 번 지날 수 있음)"""
+        key = (city_code, route_id)
+        orders = self._stops.get(key)
+        if orders is not None:
+            return orders
+        
+        def load():
+            stations, _, _ = fetch_shared(
+                f'route_stops:{city_code}:{route_id}', ROUTE_TRACKING_CONFIG['STOPS_TTL'],
+                lambda: get_default_client().get_route_stations(city_code, route_id)
+            )
+            loaded: Dict[str, List[int]] = {}
+            for station in stations:
+                loaded.setdefault(station['station_id'], []).append(station['station_order'])
+            self._stops.set(key, loaded)
+            return loaded
+        
+        return request_flight.do(('route_stops',) + key, load)
+    
+    def _get_vehicles(self, city_code: str, route_id: str) -> Tuple[List[Dict], float]:
+        """노선 버스 위치 조회 (캐시 유효 시간 안에서는 모든 정류소가 공유)"""
+        key = (city_code, route_id)
+        cached = self._locations.get(key)
+        if cached is not None:
+            return cached
+        
+        def load():
+            # 다른 서버 프로세스가 조회한 위치도 학습에 사용 (조회 횟수는 이 프로세스 조회만 집계)
+            vehicles, fetched_at, fetched_here = fetch_shared(
+                f'route_locations:{city_code}:{route_id}', ROUTE_TRACKING_CONFIG['LOCATION_TTL'],
+                lambda: get_default_client().get_route_vehicle_locations(city_code, route_id)
+            )
+            self._locations.set(key, (vehicles, fetched_at), stored_at=fetched_at)
+            if fetched_here:
+                with self._lock:
+                    self.location_fetches += 1
+            self._learn(key, vehicles, fetched_at)
+            return vehicles, fetched_at
+        
+        return request_flight.do(('route_locations',) + key, load)
+    
+    def _learn(self, key: Tuple[str, str], vehicles: List[Dict], fetched_at: float):
+        """차량별 정류소 통과 간격으로 정류장당 소요 시간 학습"""
+        alpha = ROUTE_TRACKING_CONFIG['SMOOTHING']
+        with self._lock:
+            progress = self._progress.get(key)
+            if progress is None:
+                while len(self._progress) >= ROUTE_TRACKING_CONFIG['MAX_ROUTES']:
+                    self._progress.pop(next(iter(self._progress)))
+                progress = self._progress[key] = _RouteProgress()
+            seen = {}
+            for vehicle in vehicles:
+                vehicle_no = vehicle['vehicle_no']
+                order = vehicle['station_order']
+                previous = progress.vehicles.get(vehicle_no)
+                
+                if previous is None or order < previous[0]:
+                    # 새로 나타난 차량이거나 회차한 차량은 통과 시각을 알 수 없음
+                    seen[vehicle_no] = (order, fetched_at, False)
+                elif order == previous[0]:
+                    seen[vehicle_no] = previous
+                else:
+                    if previous[2]:
+                        # 직전 정류소 통과 시각을 알고 있을 때만 간격을 표본으로 사용
+                        sample = (fetched_at - previous[1]) / (order - previous[0])
+                        sample = min(max(sample, ROUTE_TRACKING_CONFIG['MIN_SEC_PER_STATION']),
+                                     ROUTE_TRACKING_CONFIG['MAX_SEC_PER_STATION'])
+                        progress.sec_per_station = (1 - alpha) * progress.sec_per_station + alpha * sample
+                        progress.samples += 1
+                    seen[vehicle_no] = (order, fetched_at, True)
+            progress.vehicles = seen
+    
+    def seed(self, city_code: str, route_id: str, arrival_time: int, remaining_stations: int):
+        """
+        학습 표본이 없는 노선의 정류장당 소요 시간 시작값 지정
+        
+        정류소 도착 정보(TAGO arrtime / 남은 정류장 수)로 시작해 노선 추적으로 바뀐 직후에도
+        도착 예정 시간이 크게 튀지 않게 한다. 이미 학습 표본이 있으면 무시한다.
+        """
+        if arrival_time <= 0 or remaining_stations <= 0:
+            return
+        sec_per_station = min(max(arrival_time / remaining_stations, ROUTE_TRACKING_CONFIG['MIN_SEC_PER_STATION']),
+                              ROUTE_TRACKING_CONFIG['MAX_SEC_PER_STATION'])
+        key = (city_code, route_id)
+        with self._lock:
+            progress = self._progress.get(key)
+            if progress is None:
+                while len(self._progress) >= ROUTE_TRACKING_CONFIG['MAX_ROUTES']:
+                    self._progress.pop(next(iter(self._progress)))
+                progress = self._progress[key] = _RouteProgress()
+            if not progress.samples:
+                progress.sec_per_station = sec_per_station
+    
+    def get_arrivals(self, city_code: str, route_id: str, station_id: str) -> Optional[List[Dict]]:
+        """
+        노선 버스 위치 기반 정류소 도착 정보 계산
+        
+        Args:
+            city_code (str): 도시코드
+            route_id (str): 노선 ID
+            station_id (str): 정류소 ID
+        
+        Returns:
+            Optional[List[Dict]]: 도착 정보 리스트 (get_bus_arrival_info와 같은 형식, vehicle_type은 빈 값).
+                정류소가 노선 경유 목록에 없거나 노선 위치 정보가 없으면 None (정류소 조회로 대체)
+        """
+        stop_orders = self._get_stop_orders(city_code, route_id).get(station_id)
+        if not stop_orders:
+            return None
+        
+        vehicles, fetched_at = self._get_vehicles(city_code, route_id)
+        if not vehicles:
+            return None
+        now = time.time()
+        
+        with self._lock:
+            self.lookups += 1
+            progress = self._progress.get((city_code, route_id))
+            sec_per_station = progress.sec_per_station if progress else ROUTE_TRACKING_CONFIG['DEFAULT_SEC_PER_STATION']
+            passed_at = {no: state[1] for no, state in progress.vehicles.items() if state[2]} if progress else {}
+        
+        arrivals = []
+        for vehicle in vehicles:
+            # 버스 뒤쪽에 있는 가장 가까운 통과 순번 기준 (이미 지난 정류소는 제외)
+            remaining = min((order - vehicle['station_order'] for order in stop_orders
+                             if order > vehicle['station_order']), default=None)
+            if remaining is None:
+                continue
+            
+            arrival_time = remaining * sec_per_station
+            if vehicle['vehicle_no'] in passed_at:
+                # 마지막 정류소를 지난 뒤 흐른 시간만큼 차감 (정류장 1개 구간을 넘지 않게)
+                arrival_time -= min(now - passed_at[vehicle['vehicle_no']], sec_per_station * 0.9)
+            
+            arrivals.append({
+                'station_id': station_id,
+                'station_name': '',
+                'route_id': route_id,
+                'route_name': vehicle['route_name'],
+                'route_type': vehicle['route_type'],
+                'remaining_stations': remaining,
+                'vehicle_type': '',
+                'arrival_time': max(int(round(arrival_time)), 1),
+                'vehicle_no': vehicle['vehicle_no'],
+                'located_at': fetched_at
+            })
+        
+        arrivals.sort(key=lambda bus: bus['arrival_time'])
+        return arrivals
+    
+    def get_stats(self) -> Dict:
+        """노선 추적 통계 (조회 공유 비율 포함)"""
+        with self._lock:
+            learned = {f'{city}:{route}': round(progress.sec_per_station, 1)
+                       for (city, route), progress in self._progress.items() if progress.samples}
+            return {
+                'routes_with_stops': len(self._stops),
+                'location_fetches': self.location_fetches,
+                'lookups': self.lookups,
+                'lookups_per_fetch': round(self.lookups / self.location_fetches, 2) if self.location_fetches else 0.0,
+                'learned_sec_per_station': learned
+            }
+
+
+# 글로벌 노선 추적기 인스턴스
+route_tracker = RouteVehicleTracker()
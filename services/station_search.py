@@ -0,0 +1,272 @@
+import heapq
+import math
+import re
+import threading
+import time
+from typing import Dict, List, Set
+from apis.tago_api import get_default_client
+from utils.constants import SEARCH_CONFIG
+
+# 한글 초성 (유니코드 음절 순서)
+CHOSUNG = ['ㄱ', 'ㄲ', 'ㄴ', 'ㄷ', 'ㄸ', 'ㄹ', 'ㅁ', 'ㅂ', 'ㅃ', 'ㅅ',
+           'ㅆ', 'ㅇ', 'ㅈ', 'ㅉ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+_CHOSUNG_SET = set(CHOSUNG)
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+_NORMALIZE_PATTERN = re.compile(r'[\s\.\,\(\)\[\]\-_·/]')
+
+# 매칭 유형별 기본 점수 (작을수록 우선)
+_MATCH_EXACT = 0
+_MATCH_PREFIX = 1
+_MATCH_INFIX = 2
+_MATCH_FUZZY = 3
+
+
+def normalize_name(text: str) -> str:
+    """검색용 정류소명 정규화 (공백·구두점 제거, 소문자)"""
+    return _NORMALIZE_PATTERN.sub('', text or '').lower()
+
+
+def to_chosung(text: str) -> str:
+    """한글 음절을 초성으로 변환 (그 외 문자는 그대로)"""
+    result = []
+    for char in text:
+        code = ord(char)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            result.append(CHOSUNG[(code - _HANGUL_BASE) // 588])
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def is_chosung_query(text: str) -> bool:
+    """초성으로만 이루어진 검색어인지 확인"""
+    return bool(text) and all(char in _CHOSUNG_SET for char in text)
+
+
+def _bigrams(text: str) -> Set[str]:
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _padded_bigrams(text: str) -> Set[str]:
+    """
+    앞뒤 경계 표시를 붙인 바이그램 ('대전역' -> ^대, 대전, 전역, 역$)
+    
+    짧은 이름은 가운데 한 글자만 틀려도 안쪽 바이그램이 모두 달라지므로, 첫 글자·끝 글자 바이그램으로
+    '대잔역' -> '대전역' 같은 한 음절 오타도 찾는다.
+    """
+    return _bigrams(f'^{text}$') if text else set()
+
+
+class _Trie:
+    """접두사 트라이 (노드마다 해당 접두사를 가진 정류소 번호 보관)"""
+    
+    __slots__ = ('root',)
+    
+    def __init__(self):
+        self.root: Dict = {}
+    
+    def insert(self, text: str, station_index: int):
+        node = self.root
+        for char in text[:SEARCH_CONFIG['MAX_PREFIX_LENGTH']]:
+            node = node.setdefault(char, {})
+            node.setdefault('$', []).append(station_index)
+    
+    def prefix(self, text: str) -> List[int]:
+        node = self.root
+        for char in text[:SEARCH_CONFIG['MAX_PREFIX_LENGTH']]:
+            node = node.get(char)
+            if node is None:
+                return []
+        return node.get('$', [])
+
+
+class _CityIndex:
+    """도시 1곳의 정류소 검색 인덱스"""
+    
+    def __init__(self, stations: List[Dict]):
+        self.stations = stations
+        self.names = [normalize_name(s['station_name']) for s in stations]
+        self.coords = [(s['latitude'], s['longitude']) for s in stations]
+        self.chosungs = [to_chosung(name) for name in self.names]
+        
+        self.name_trie = _Trie()
+        self.chosung_trie = _Trie()
+        self.name_grams: Dict[str, List[int]] = {}
+        self.chosung_grams: Dict[str, List[int]] = {}
+        
+        for index, (name, chosung) in enumerate(zip(self.names, self.chosungs)):
+            self.name_trie.insert(name, index)
+            self.chosung_trie.insert(chosung, index)
+            for gram in _padded_bigrams(name):
+                self.name_grams.setdefault(gram, []).append(index)
+            for gram in _bigrams(chosung):
+                self.chosung_grams.setdefault(gram, []).append(index)
+    
+    def match(self, query: str) -> Dict[int, float]:
+        """검색어와 일치하는 정류소 번호 -> 매칭 점수"""
+        chosung_mode = is_chosung_query(query)
+        trie = self.chosung_trie if chosung_mode else self.name_trie
+        grams = self.chosung_grams if chosung_mode else self.name_grams
+        targets = self.chosungs if chosung_mode else self.names
+        
+        scores: Dict[int, float] = {}
+        # 트라이는 MAX_PREFIX_LENGTH까지만 저장하므로 더 긴 검색어는 전체 이름으로 다시 확인
+        truncated = len(query) > SEARCH_CONFIG['MAX_PREFIX_LENGTH']
+        for index in trie.prefix(query):
+            if truncated and not targets[index].startswith(query):
+                continue
+            scores[index] = _MATCH_EXACT if targets[index] == query else _MATCH_PREFIX
+        
+        if len(query) == 1:
+            # 한 글자 검색어는 바이그램으로 찾을 수 없으므로 전체 이름을 훑어 중간 일치 검색
+            for index, target in enumerate(targets):
+                if index not in scores and query in target:
+                    scores[index] = _MATCH_INFIX
+            return scores
+        
+        if chosung_mode:
+            # 초성은 겹치는 조합이 많아 오타 허용 없이 모든 바이그램을 포함하는 중간 일치만 검색
+            postings = sorted((grams.get(gram, ()) for gram in _bigrams(query)), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+            for index in candidates:
+                if index not in scores and query in targets[index]:
+                    scores[index] = _MATCH_INFIX
+            return scores
+        
+        # 중간 일치 및 오타 허용: 경계 표시를 붙인 바이그램 겹침 비율(Dice 계수)로 후보 선정
+        query_grams = _padded_bigrams(query)
+        overlap: Dict[int, int] = {}
+        for gram in query_grams:
+            for index in grams.get(gram, ()):
+                overlap[index] = overlap.get(index, 0) + 1
+        
+        for index, shared in overlap.items():
+            if index in scores:
+                continue
+            if query in targets[index]:
+                scores[index] = _MATCH_INFIX
+                continue
+            similarity = 2 * shared / (len(query_grams) + len(_padded_bigrams(targets[index])))
+            if similarity >= SEARCH_CONFIG['FUZZY_THRESHOLD']:
+                scores[index] = _MATCH_FUZZY + (1 - similarity)
+        
+        return scores
+
+
+class StationSearchIndex:
+    """
+    정류소명 메모리 검색 인덱스
+    
+    도시별 정류소 목록을 TAGO에서 한 번 받아 접두사 트라이와 바이그램 인덱스를
+    만들어 두고, 초성 검색과 오타 허용 검색을 지원한다. 사용자 위치가 주어지면
+    같은 매칭 수준 안에서 가까운 정류소를 먼저 반환한다.
+    """
+    
+    def __init__(self):
+        self._cities: Dict[str, _CityIndex] = {}
+        self._loading: Set[str] = set()
+        self._lock = threading.Lock()
+    
+    def is_indexed(self, city_code: str) -> bool:
+        return city_code in self._cities
+    
+    def build_city(self, city_code: str, stations: List[Dict]):
+        """도시 정류소 목록으로 인덱스 생성 (기존 인덱스 교체)"""
+        index = _CityIndex(stations)
+        with self._lock:
+            self._cities[city_code] = index
+            self._loading.discard(city_code)
+    
+    def ensure_city(self, city_code: str):
+        """도시 인덱스가 없으면 백그라운드에서 정류소 목록을 받아 생성"""
+        with self._lock:
+            if city_code in self._cities or city_code in self._loading:
+                return
+            self._loading.add(city_code)
+        
+        thread = threading.Thread(target=self._load_city, args=(city_code,), name=f'station-index-{city_code}')
+        thread.daemon = True
+        thread.start()
+    
+    def _load_city(self, city_code: str):
+        try:
+            started_at = time.time()
+            stations = get_default_client().get_city_stations(city_code)
+            self.build_city(city_code, stations)
+            print(f'정류소 검색 인덱스 생성: {city_code} ({len(stations)}개, {time.time() - started_at:.1f}초)')
+        except Exception as e:
+            with self._lock:
+                self._loading.discard(city_code)
+            print(f'정류소 검색 인덱스 생성 실패 ({city_code}): {e}')
+    
+    def search(self, query: str, city_code: str = None, lat: float = None,
+               lng: float = None, limit: int = None) -> List[Dict]:
+        """
+        정류소명 검색
+        
+        Args:
+            query (str): 검색어 (정류소명 일부 또는 초성)
+            city_code (str): 도시코드 (없으면 인덱스된 모든 도시)
+            lat (float): 사용자 위도 (선택사항)
+            lng (float): 사용자 경도 (선택사항)
+            limit (int): 최대 결과 수
+        
+        Returns:
+            List[Dict]: 매칭 수준·거리순 정류소 리스트
+        """
+        limit = limit or SEARCH_CONFIG['DEFAULT_LIMIT']
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+        
+        if city_code:
+            cities = [self._cities[city_code]] if city_code in self._cities else []
+        else:
+            cities = list(self._cities.values())
+        
+        has_location = lat is not None and lng is not None
+        if has_location:
+            # 순위 계산은 사용자 위도 기준 등장방형 근사 거리(제곱)로 처리
+            lng_scale = math.cos(math.radians(lat))
+        
+        candidates = []
+        for city in cities:
+            for index, score in city.match(normalized).items():
+                if has_location:
+                    station_lat, station_lng = city.coords[index]
+                    approx_distance = (station_lat - lat) ** 2 + ((station_lng - lng) * lng_scale) ** 2
+                else:
+                    approx_distance = 0
+                candidates.append((int(score), approx_distance, score, len(city.names[index]), index, city))
+        
+        # 상위 limit개만 부분 정렬하고 정확한 거리는 반환 대상만 계산
+        top = heapq.nsmallest(limit, candidates, key=lambda item: item[:5])
+        client = get_default_client()
+        
+        results = []
+        for _, _, score, _, index, city in top:
+            station = city.stations[index]
+            result = dict(station)
+            if has_location:
+                result['distance'] = round(client.calculate_distance(
+                    lat, lng, station['latitude'], station['longitude']
+                ))
+            result['match'] = ('exact', 'prefix', 'infix', 'fuzzy')[min(int(score), _MATCH_FUZZY)]
+            results.append(result)
+        return results
+    
+    def get_stats(self) -> Dict:
+        """인덱스 통계 조회"""
+        return {
+            'cities': {code: len(city.stations) for code, city in self._cities.items()},
+            'loading': sorted(self._loading)
+        }
+
+
+# 글로벌 정류소 검색 인덱스
+station_search_index = StationSearchIndex()
@@ -1,22 +1,35 @@
-from apis.tago_api import TAGOAPIClient
-from config import Config
+import time
+from concurrent.futures import wait
+from apis.tago_api import arrival_cache, get_default_client
 from datetime import datetime
+from services.route_info import route_info_store
+from services.route_schedule import RouteSchedule
+from utils.concurrency import get_fetch_executor
+from utils.constants import BUS_ROUTE_TYPES
+from utils.profiling import profiler
+
+
+def _format_minute(minute):
+    """자정 기준 분을 'HH:MM'으로 변환 (자정을 넘긴 막차도 24시간 안으로)"""
+    if minute is None:
+        return None
+    return f'{minute // 60 % 24:02d}:{minute % 60:02d}'
 
 class StationService:
     """정류소 관련 비즈니스 로직 (플로우 2용)"""
     
-    def __init__(self):
-        self.client = TAGOAPIClient(
-            api_key=Config.TAGO_API_KEY,
-            base_url=Config.TAGO_BASE_URL
-        )
+    @property
+    def client(self):
+        # 공용 클라이언트는 최초 요청 시 생성 (임포트·앱 생성 시점에는 연결 풀을 만들지 않음)
+        return get_default_client()
     
-    def get_all_buses_from_session(self, session_info):
+    def get_all_buses_from_session(self, session_info, enrich=False):
         """
         세션 정보를 활용한 전체 버스 정보 조회 (플로우 2 메인)
         
         Args:
             session_info (dict): WebSocket 세션 정보
+            enrich (bool): True면 노선 유형·첫차/막차·배차간격 등 캐시된 노선 정보를 함께 반환
             
         Returns:
             dict: 전체 버스 정보
@@ -29,18 +42,11 @@ class StationService:
             raise Exception('세션에 위치 정보가 없습니다')
         
         # 1. 현재 정류소 찾기 (세션 정보 재활용 가능하면 재활용)
-        if 'station_info' in session_info:
-            # 세션에 정류소 정보가 이미 있으면 재사용
-            current_station = session_info['station_info']
-        else:
-            # 없으면 새로 조회
-            stations = self.client.get_stations_by_location(lng=lng, lat=lat)
-            if not stations:
-                raise Exception('주변에 정류소가 없습니다')
-                
-            current_station, _ = self.client.find_current_station(lat, lng, stations)
-            if not current_station:
-                raise Exception('현재 정류소를 찾을 수 없습니다')
+        current_station = self._resolve_session_station(session_info)
+        
+        # 확장 모드: 도착 정보 조회와 동시에 이 정류소에 지난번 들어온 노선의 정보 조회 시작
+        if enrich:
+            self._prefetch_station_routes(current_station)
         
         # 2. 전체 버스 정보 조회 (route_id=None → 전체 버스)
         all_buses = self.client.get_bus_arrival_info(
@@ -48,16 +54,169 @@ class StationService:
             city_code=current_station['city_code']
         )
         
-        # 3. 간소화 데이터 가공 (버스 번호 + 도착시간만)
-        processed_buses = self._process_buses_simple(all_buses)
+        # 3. 데이터 가공 (기본: 버스 번호 + 도착시간만, 확장: 캐시된 노선 정보 결합)
+        if enrich:
+            processed_buses = self._process_buses_enriched(current_station['city_code'], all_buses)
+        else:
+            processed_buses = self._process_buses_simple(all_buses)
         
         # 4. 응답 데이터 구성
-        return {
+        result = {
             'timestamp': datetime.now().isoformat(),
             'station': self._format_station_info(current_station, lat, lng),
             'buses': processed_buses,
             'total_count': len(processed_buses)
         }
+        if enrich:
+            # 노선 정보가 아직 캐시에 없는 버스는 enriched=False (다음 요청부터 채워짐)
+            result['enriched_count'] = sum(1 for bus in processed_buses if bus['enriched'])
+        return result
+    
+    def get_buses_batch(self, sessions, stations, deadline):
+        """
+        여러 세션/정류소의 전체 버스 정보 일괄 조회
+        
+        같은 정류소는 한 번만 조회하고, 서로 다른 정류소는 공용 스레드 풀에서
+        동시에 조회한다. 마감 시간 안에 끝나지 않은 항목은 timeout으로 표시하고
+        나머지 결과는 그대로 반환한다.
+        
+        Args:
+            sessions (list): (session_id, session_info 또는 None) 리스트
+            stations (list): {'city_code', 'station_id'} 리스트
+            deadline (float): 요청 마감 시간 (초)
+            
+        Returns:
+            dict: 항목별 상태가 포함된 일괄 조회 결과
+        """
+        started_at = time.time()
+        executor = get_fetch_executor()
+        
+        # 정류소 키별 조회 작업 (중복 제거)
+        station_futures = {}
+        
+        def submit_station(city_code, station_id):
+            key = (city_code, station_id)
+            if key not in station_futures:
+                station_futures[key] = executor.submit(
+                    self.client.get_bus_arrival_info, station_id=station_id, city_code=city_code
+                )
+            return station_futures[key]
+        
+        # 1. 항목별 작업 등록
+        pending = []            # (항목, 도착 정보 조회 future 또는 None)
+        resolve_futures = {}    # pending 인덱스 -> 세션 정류소 확정 future
+        for session_id, session_info in sessions:
+            item = {'type': 'session', 'session_id': session_id}
+            if not session_info:
+                item.update(status='not_found', error='활성 모니터링 세션이 없습니다')
+                pending.append((item, None))
+                continue
+            
+            item['_session_info'] = session_info
+            station = session_info.get('station_info')
+            if station:
+                item['_station'] = station
+                pending.append((item, submit_station(station['city_code'], station['station_id'])))
+            else:
+                # 정류소가 아직 확정되지 않은 세션은 위치 조회부터 수행
+                resolve_futures[len(pending)] = executor.submit(self._resolve_session_station, session_info)
+                pending.append((item, None))
+        
+        for station in stations:
+            item = {
+                'type': 'station',
+                'city_code': station.get('city_code'),
+                'station_id': station.get('station_id')
+            }
+            if not item['city_code'] or not item['station_id']:
+                item.update(status='invalid', error='city_code와 station_id가 모두 필요합니다')
+                pending.append((item, None))
+            else:
+                pending.append((item, submit_station(item['city_code'], item['station_id'])))
+        
+        # 2. 정류소 확정이 필요한 세션 처리 후 도착 정보 조회 등록
+        if resolve_futures:
+            wait(list(resolve_futures.values()), timeout=max(deadline - (time.time() - started_at), 0))
+            for index, resolve_future in resolve_futures.items():
+                if not resolve_future.done():
+                    continue
+                item = pending[index][0]
+                try:
+                    station = resolve_future.result()
+                    future = submit_station(station['city_code'], station['station_id'])
+                except Exception as e:
+                    item.update(status='error', error=str(e))
+                    continue
+                item['_station'] = station
+                pending[index] = (item, future)
+        
+        # 3. 마감 시간까지 도착 정보 대기
+        wait(list(station_futures.values()), timeout=max(deadline - (time.time() - started_at), 0))
+        
+        # 4. 항목별 결과 구성
+        items = [self._build_batch_item(item, future) for item, future in pending]
+        
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'items': items,
+            'total_count': len(items),
+            'ok_count': sum(1 for item in items if item['status'] == 'ok'),
+            'unique_stations': len(station_futures),
+            'elapsed_ms': round((time.time() - started_at) * 1000)
+        }
+    
+    def _build_batch_item(self, item, future):
+        """일괄 조회 항목 1건 결과 구성"""
+        session_info = item.pop('_session_info', None)
+        station = item.pop('_station', None)
+        
+        if 'status' in item:
+            return item
+        
+        if future is None or not future.done():
+            # 정류소 확정 또는 도착 정보 조회가 마감 시간 안에 끝나지 않음
+            item.update(status='timeout', error='마감 시간 내에 조회하지 못했습니다')
+            return item
+        
+        try:
+            buses = future.result()
+        except Exception as e:
+            item.update(status='error', error=f'버스 정보 조회 실패: {str(e)}')
+            return item
+        
+        # 항목 하나의 응답 데이터가 이상해도 다른 항목 결과는 그대로 반환
+        try:
+            processed_buses = self._process_buses_simple(buses)
+            if session_info:
+                station_fields = {
+                    'station': self._format_station_info(station, session_info['lat'], session_info['lng'])
+                }
+            else:
+                station_fields = {'station_name': buses[0]['station_name'] if buses else ''}
+        except Exception as e:
+            print(f"Error in batch item {item.get('session_id') or item.get('station_id')}: {e}")
+            item.update(status='error', error=f'버스 정보 처리 실패: {str(e)}')
+            return item
+        
+        item.update(station_fields, status='ok', buses=processed_buses, total_count=len(processed_buses))
+        return item
+    
+    def _resolve_session_station(self, session_info):
+        """세션의 현재 정류소 확정 (세션에 저장된 정류소가 있으면 재사용)"""
+        # 워커 첫 틱 전에는 station_info가 None (위치로 직접 확정)
+        if session_info.get('station_info'):
+            return session_info['station_info']
+        
+        lat = session_info.get('lat')
+        lng = session_info.get('lng')
+        stations = self.client.get_stations_by_location(lng=lng, lat=lat)
+        if not stations:
+            raise Exception('주변에 정류소가 없습니다')
+            
+        current_station, _ = self.client.find_current_station(lat, lng, stations)
+        if not current_station:
+            raise Exception('현재 정류소를 찾을 수 없습니다')
+        return current_station
     
     def _process_buses_simple(self, buses):
         """버스 데이터 간소화 (번호 + 도착시간만)"""
@@ -73,6 +232,50 @@ class StationService:
         processed.sort(key=lambda x: x['arrival_time'] if x['arrival_time'] > 0 else float('inf'))
         return processed
     
+    def _prefetch_station_routes(self, station):
+        """정류소의 마지막 도착 정보(만료된 것 포함)에 있던 노선 정보를 백그라운드에서 미리 조회"""
+        entry = arrival_cache.get_entry((station['city_code'], station['station_id'], None))
+        if entry:
+            route_info_store.prefetch(station['city_code'], (bus['route_id'] for bus in entry[1]))
+    
+    def _process_buses_enriched(self, city_code, buses):
+        """
+        버스 데이터에 캐시된 노선 정보 결합
+        
+        노선 정보는 캐시에서만 읽고, 캐시에 없는 노선은 백그라운드 조회만 시작한다
+        (차가운 노선 조회를 기다리지 않음).
+        """
+        route_info_store.prefetch(city_code, (bus['route_id'] for bus in buses))
+        
+        processed = []
+        for bus in buses:
+            info = route_info_store.peek(city_code, bus['route_id']) if bus['route_id'] else None
+            route_type = (info or {}).get('route_type') or bus['route_type']
+            processed_bus = {
+                'route_name': bus['route_name'],
+                'arrival_time': bus['arrival_time'],
+                'route_id': bus['route_id'],
+                'route_type': BUS_ROUTE_TYPES.get(str(route_type), route_type),
+                'remaining_stations': bus['remaining_stations'],
+                'vehicle_type': bus['vehicle_type'],
+                'enriched': bool(info)
+            }
+            if info:
+                schedule = RouteSchedule(info)
+                processed_bus.update({
+                    'first_bus': _format_minute(schedule.first_minute),
+                    'last_bus': _format_minute(schedule.last_minute),
+                    'headway_peak': schedule.peak_headway,        # 분
+                    'headway_offpeak': schedule.offpeak_headway,  # 분
+                    'start_station': info.get('start_station', ''),
+                    'end_station': info.get('end_station', '')
+                })
+            processed.append(processed_bus)
+        
+        # 도착 시간순 정렬
+        processed.sort(key=lambda x: x['arrival_time'] if x['arrival_time'] > 0 else float('inf'))
+        return processed
+    
     def _format_station_info(self, station, user_lat, user_lng):
         """정류소 정보 포맷팅"""
         return {
@@ -82,4 +285,8 @@ class StationService:
             'distance_from_user': round(self.client.calculate_distance(
                 user_lat, user_lng, station['latitude'], station['longitude']
             ))
-        }
\ No newline at end of file
+        }
+
+# 플로우 2 처리를 온디맨드 프로파일링 대상으로 등록 (프로파일링 중에만 래핑됨)
+profiler.register_target('flow2', StationService, 'get_all_buses_from_session')
+profiler.register_target('flow2_batch', StationService, 'get_buses_batch')
@@ -0,0 +1,159 @@
+# test_key_pool.py
+import sys
+import os
+from datetime import datetime
+
+# 프로젝트 루트 경로를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from apis.key_pool import ServiceKeyPool, _QUOTA_TZ
+from utils.constants import KEY_POOL_CONFIG
+from utils.exceptions import TAGOAPIError
+
+KEY_A = 'AAAAservice-key-AAAA'
+KEY_B = 'BBBBservice-key-BBBB'
+SERVICE = 'ArvlInfoInqireService'
+OTHER_SERVICE = 'BusSttnInfoInqireService'
+
+# 2026-10-19 15:00 KST, 다음 한도 초기화는 2026-10-20 00:00 KST
+START = datetime(2026, 10, 19, 15, 0, tzinfo=_QUOTA_TZ).timestamp()
+MIDNIGHT = datetime(2026, 10, 20, 0, 0, tzinfo=_QUOTA_TZ).timestamp()
+
+
+class _Clock:
+    """테스트에서 직접 움직이는 시계"""
+    
+    def __init__(self, now: float = START):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+def _pool(keys=(KEY_A, KEY_B), daily_quota=100):
+    clock = _Clock()
+    return ServiceKeyPool(list(keys), daily_quota=daily_quota, clock=clock), clock
+
+
+def _acquire_all(pool, service=SERVICE, times=4):
+    return {pool.acquire(service) for _ in range(times)}
+
+
+def _usable(pool, key, service=SERVICE):
+    """다른 키를 모두 빼고 골랐을 때 key를 쓸 수 있는지"""
+    others = [other for other in pool.keys if other != key]
+    try:
+        return pool.acquire(service, exclude=others) == key
+    except TAGOAPIError:
+        return False
+
+
+def test_quota_bench_until_kst_midnight():
+    """한도 초과 키는 그 서비스에서만 KST 자정까지 제외"""
+    pool, clock = _pool()
+    assert pool.report_error(KEY_A, SERVICE, result_code=KEY_POOL_CONFIG['QUOTA_RESULT_CODES'][0])
+    
+    assert _acquire_all(pool) == {KEY_B}
+    assert _usable(pool, KEY_A, OTHER_SERVICE)
+    
+    clock.now = MIDNIGHT - 1
+    assert not _usable(pool, KEY_A)
+    
+    clock.now = MIDNIGHT
+    assert _usable(pool, KEY_A)
+    assert pool.get_stats()['keys'][0]['benched_services'] == {}
+
+
+def test_auth_bench_excludes_key_for_all_services():
+    """인증 오류 키는 모든 서비스에서 AUTH_BENCH_SECONDS 동안 제외"""
+    pool, clock = _pool()
+    assert pool.report_error(KEY_A, SERVICE, result_code='30')
+    
+    assert _acquire_all(pool) == {KEY_B}
+    assert not _usable(pool, KEY_A, OTHER_SERVICE)
+    assert not pool.get_stats()['keys'][0]['available']
+    
+    clock.now = START + KEY_POOL_CONFIG['AUTH_BENCH_SECONDS'] - 1
+    assert not _usable(pool, KEY_A)
+    
+    clock.now = START + KEY_POOL_CONFIG['AUTH_BENCH_SECONDS']
+    assert _usable(pool, KEY_A)
+
+
+def test_throttle_bench_follows_retry_after():
+    """HTTP 429는 Retry-After 동안 그 서비스에서만 제외하고 최대 제외 시간을 넘지 않음"""
+    pool, clock = _pool()
+    assert pool.report_error(KEY_A, SERVICE, retry_after=30)
+    
+    assert _acquire_all(pool) == {KEY_B}
+    assert _usable(pool, KEY_A, OTHER_SERVICE)
+    assert pool.get_stats()['keys'][0]['bench_reason'] == f'throttle:{SERVICE}'
+    assert pool.get_stats()['keys'][0]['error_rate'] > 0
+    
+    clock.now = START + 29
+    assert not _usable(pool, KEY_A)
+    clock.now = START + 30
+    assert _usable(pool, KEY_A)
+    
+    # 지나치게 긴 Retry-After는 MAX_THROTTLE_SECONDS에서 자름
+    assert pool.report_error(KEY_A, SERVICE, retry_after=100000)
+    clock.now = START + 30 + KEY_POOL_CONFIG['MAX_THROTTLE_SECONDS'] - 1
+    assert not _usable(pool, KEY_A)
+    clock.now = START + 30 + KEY_POOL_CONFIG['MAX_THROTTLE_SECONDS']
+    assert _usable(pool, KEY_A)
+
+
+def test_selection_prefers_remaining_quota_and_low_error_rate():
+    """남은 한도와 오류율로 점수를 매겨 키를 고르고, 오류율은 시간이 지나면 줄어듦"""
+    pool, clock = _pool()
+    
+    # 점수가 같으면 번갈아 사용
+    assert [pool.acquire(SERVICE) for _ in range(2)] == [KEY_A, KEY_B]
+    
+    # 일반 오류는 키를 제외하지 않고 오류율만 올림
+    assert not pool.report_error(KEY_A, SERVICE)
+    assert [pool.acquire(SERVICE) for _ in range(3)] == [KEY_B, KEY_B, KEY_B]
+    
+    # 오류율이 반감기를 여러 번 지나 줄어들면 사용량이 적은 키가 다시 선택됨
+    clock.now = START + KEY_POOL_CONFIG['ERROR_RATE_HALF_LIFE'] * 10
+    assert pool.acquire(SERVICE) == KEY_A
+    
+    # 한도를 다 쓴 키는 점수가 0이라 다른 키가 남아 있으면 선택하지 않음
+    pool, clock = _pool(daily_quota=3)
+    for _ in range(3):
+        assert pool.acquire(SERVICE, exclude=[KEY_B]) == KEY_A
+    assert pool.get_stats()['keys'][0]['used_today'] == {SERVICE: 3}
+    assert _acquire_all(pool, times=3) == {KEY_B}
+
+
+def test_all_keys_benched_raises():
+    """모든 키가 제외되면 TAGOAPIError를 올리고 exhausted를 센다"""
+    pool, clock = _pool()
+    pool.report_error(KEY_A, SERVICE, result_code=KEY_POOL_CONFIG['QUOTA_RESULT_CODES'][0])
+    
+    try:
+        pool.acquire(SERVICE, exclude=[KEY_B])
+        assert False, 'TAGOAPIError가 발생해야 합니다'
+    except TAGOAPIError:
+        pass
+    assert pool.get_stats()['exhausted'] == 1
+    
+    pool.report_error(KEY_B, SERVICE, retry_after=10)
+    try:
+        pool.acquire(SERVICE)
+        assert False, 'TAGOAPIError가 발생해야 합니다'
+    except TAGOAPIError:
+        pass
+    assert pool.get_stats()['exhausted'] == 2
+    
+    clock.now = START + 10
+    assert pool.acquire(SERVICE) == KEY_B
+
+
+if __name__ == "__main__":
+    test_quota_bench_until_kst_midnight()
+    test_auth_bench_excludes_key_for_all_services()
+    test_throttle_bench_follows_retry_after()
+    test_selection_prefers_remaining_quota_and_low_error_rate()
+    test_all_keys_benched_raises()
+    print("OK")
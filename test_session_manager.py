@@ -0,0 +1,208 @@
+# test_session_manager.py
+import sys
+import os
+import threading
+import time
+
+# 프로젝트 루트 경로를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from apis.tago_api import TAGOAPIClient, configure_default_client
+from services.polling_policy import FixedIntervalPolicy
+from websocket.manager import SessionManager
+from websocket.prefetcher import arrival_prefetcher
+from websocket.workers import BusMonitoringWorker
+
+configure_default_client('test-service-key')
+
+OLD_STATION = {
+    'station_id': 'DJB8001793',
+    'station_name': '정부청사',
+    'city_code': '25',
+    'latitude': 36.3504,
+    'longitude': 127.3845
+}
+
+
+class _RecordingSocketIO:
+    """emit 호출만 기록하는 SocketIO"""
+    
+    def __init__(self):
+        self.emits = []
+    
+    def emit(self, event, data=None, room=None):
+        self.emits.append((event, room))
+
+
+class _GatedClient(TAGOAPIClient):
+    """정류소 조회가 gate가 열릴 때까지 멈추는 클라이언트 (틱 도중 세션 교체 재현용)"""
+    
+    def __init__(self, gate: threading.Event, entered: threading.Event):
+        super().__init__('test-service-key')
+        self.gate = gate
+        self.entered = entered
+    
+    def get_stations_by_location(self, lng, lat):
+        self.entered.set()
+        self.gate.wait(5)
+        return [OLD_STATION]
+    
+    def find_current_station(self, user_lat, user_lng, stations):
+        return stations[0], ''
+    
+    def get_multiple_bus_arrival(self, station_id, city_code, bus_numbers):
+        return [{'route_id': 'DJB30300102', 'route_name': '102', 'route_type': '간선버스',
+                 'remaining_stations': 2, 'vehicle_type': '', 'arrival_time': 120, 'station_name': '정부청사'}]
+
+
+class _GatedWorker(BusMonitoringWorker):
+    """워커마다 따로 gate를 두고 첫 정류소 조회에서 멈추는 워커"""
+    
+    instances = []
+    
+    def __init__(self, **kwargs):
+        super().__init__(polling_policy=FixedIntervalPolicy(), **kwargs)
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+        self.client = _GatedClient(self.gate, self.entered)
+        _GatedWorker.instances.append(self)
+
+
+class _CountingWorker:
+    """스레드 없이 시작·중단만 기록하는 워커"""
+    
+    def __init__(self, **kwargs):
+        self.session_id = kwargs['session_id']
+        self.running = False
+        self.stopped = False
+    
+    def start(self):
+        self.running = True
+    
+    def stop(self):
+        self.running = False
+        self.stopped = True
+    
+    def set_bus_numbers(self, bus_numbers):
+        pass
+
+
+def test_replaced_worker_cannot_touch_new_session():
+    """틱 도중 세션이 교체된 이전 워커는 새 레코드·새 워커 예약·세션 방에 손대지 못함"""
+    manager = SessionManager(worker_class=_GatedWorker)
+    socketio = _RecordingSocketIO()
+    _GatedWorker.instances = []
+    
+    manager.create_session('sid1', 36.3504, 127.3845, '102', interval=30)
+    manager.start_monitoring('sid1', socketio)
+    old_worker = _GatedWorker.instances[0]
+    assert old_worker.entered.wait(5)
+    
+    # 이전 워커가 정류소 조회 중일 때 다른 위치로 세션 교체
+    manager.create_session('sid1', 36.3700, 127.4000, '102', interval=30)
+    manager.start_monitoring('sid1', socketio)
+    new_worker = _GatedWorker.instances[1]
+    arrival_prefetcher.schedule('sid1', [OLD_STATION], time.time() + 3600, owner=new_worker)
+    
+    try:
+        old_worker.gate.set()
+        old_worker.thread.join(5)
+        assert not old_worker.thread.is_alive()
+        
+        assert manager.get_session_info('sid1')['station_info'] is None
+        assert socketio.emits == []
+        assert arrival_prefetcher._due['sid1'][2] is new_worker
+    finally:
+        manager.stop_session('sid1')
+        new_worker.gate.set()
+        new_worker.thread.join(5)
+    
+    assert 'sid1' not in arrival_prefetcher._due
+
+
+def test_concurrent_replacement_leaves_one_live_worker():
+    """같은 세션 ID를 여러 스레드가 동시에 교체해도 등록된 워커 하나만 실행 중"""
+    manager = SessionManager(worker_class=_CountingWorker)
+    workers = []
+    original_class = manager._worker_class
+    
+    def create_worker(**kwargs):
+        worker = original_class(**kwargs)
+        workers.append(worker)
+        return worker
+    
+    manager._worker_class = create_worker
+    barrier = threading.Barrier(8)
+    
+    def replace(i):
+        barrier.wait()
+        for _ in range(50):
+            manager.create_session('sid1', 36.35 + i * 0.001, 127.38, '102')
+            manager.start_monitoring('sid1', None)
+    
+    threads = [threading.Thread(target=replace, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    registered = manager._shard('sid1').workers['sid1']
+    live = [worker for worker in workers if worker.running]
+    assert live == [registered]
+    assert all(worker.stopped for worker in workers if worker is not registered)
+    manager.stop_session('sid1')
+    assert registered.stopped
+
+
+def test_stop_session_with_stale_expected_keeps_new_session():
+    """만료 검사가 본 이전 레코드로는 그 사이 교체된 새 세션을 중단하지 않음"""
+    manager = SessionManager(worker_class=_CountingWorker)
+    manager.create_session('sid1', 36.35, 127.38, '102')
+    stale = manager._shard('sid1').sessions['sid1']
+    manager.create_session('sid1', 36.36, 127.38, '102')
+    manager.start_monitoring('sid1', None)
+    worker = manager._shard('sid1').workers['sid1']
+    
+    assert not manager.stop_session('sid1', expected=stale)
+    assert manager.get_session_info('sid1') is not None
+    assert worker.running
+    
+    assert manager.stop_session('sid1', expected=manager._shard('sid1').sessions['sid1'])
+    assert manager.get_session_info('sid1') is None
+    assert worker.stopped
+
+
+def test_wheel_sweeps_expired_sessions():
+    """하트비트가 끊긴 세션은 만료 슬롯에서 정리하고, 갱신·연결 유지 세션은 다시 배치"""
+    manager = SessionManager(idle_timeout=60, worker_class=_CountingWorker)
+    manager.set_liveness_check(lambda session_id: session_id == 'alive')
+    for session_id in ('ghost', 'touched', 'alive'):
+        manager.create_session(session_id, 36.35, 127.38, '102')
+        manager.start_monitoring(session_id, None)
+    ghost_worker = manager._shard('ghost').workers['ghost']
+    
+    for session_id in ('ghost', 'alive'):
+        manager._shard(session_id).sessions[session_id].last_seen -= 1000
+    later = time.time() + 60 + 2 * manager._wheel.slot_seconds
+    manager._shard('touched').sessions['touched'].last_seen = later - 1
+    
+    assert manager.sweep(now=later) == 1
+    assert manager.get_session_info('ghost') is None
+    assert ghost_worker.stopped
+    assert manager.get_session_info('touched') is not None
+    assert manager.get_session_info('alive') is not None
+    assert manager.renewed_sessions == 1
+    assert manager.expired_sessions == 1
+    
+    # 연장한 세션도 다음 만료 시각이 지나면 다시 검사
+    manager.set_liveness_check(lambda session_id: False)
+    assert manager.sweep(now=later + 60 + 2 * manager._wheel.slot_seconds) == 2
+    assert manager.get_active_sessions_count() == 0
+
+
+if __name__ == "__main__":
+    test_replaced_worker_cannot_touch_new_session()
+    test_concurrent_replacement_leaves_one_live_worker()
+    test_stop_session_with_stale_expected_keeps_new_session()
+    test_wheel_sweeps_expired_sessions()
+    print("OK")
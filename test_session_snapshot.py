@@ -0,0 +1,206 @@
+# test_session_snapshot.py
+import sys
+import os
+import json
+import shutil
+import tempfile
+import time
+
+# 프로젝트 루트 경로를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from flask_socketio import SocketIO
+from utils.constants import SESSION_CONFIG
+from websocket import init_websocket_handlers
+from websocket.manager import SessionManager, session_manager
+
+STATION = {
+    'station_id': 'DJB8001793',
+    'station_name': '정부청사',
+    'city_code': '25',
+    'latitude': 36.3504,
+    'longitude': 127.3845
+}
+LAT, LNG = 36.3504, 127.3845
+# 위도 0.0001도 ≈ 11m, 0.001도 ≈ 111m
+NEAR_LAT = LAT + 0.0001
+FAR_LAT = LAT + 0.001
+
+
+class _RecordingWorker:
+    """스레드 없이 생성 인자만 기록하는 워커"""
+    
+    instances = []
+    
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        _RecordingWorker.instances.append(self)
+    
+    def start(self):
+        pass
+    
+    def stop(self):
+        pass
+    
+    def set_bus_numbers(self, bus_numbers):
+        pass
+
+
+def _manager(directory):
+    """임시 디렉터리에 스냅샷을 저장하는 세션 관리자"""
+    manager = SessionManager(worker_class=_RecordingWorker)
+    manager.snapshot_file = os.path.join(directory, 'sessions_snapshot.json')
+    return manager
+
+
+def _write_snapshot(path, saved_at, sessions):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'saved_at': saved_at, 'sessions': sessions}, f)
+
+
+def _saved_session(session_id, lat=LAT, bus_numbers=('102',), last_seen=None):
+    """다른 프로세스가 저장한 형식의 세션 항목"""
+    return {
+        'session_id': session_id,
+        'lat': lat,
+        'lng': LNG,
+        'bus_numbers': list(bus_numbers),
+        'interval': 30,
+        'station_info': STATION,
+        'last_seen': last_seen or time.time()
+    }
+
+
+def test_snapshot_round_trip_across_process_files():
+    """프로세스별 파일에 저장하고, 재시작 시 모든 프로세스 파일을 읽고 오래된 파일은 삭제"""
+    directory = tempfile.mkdtemp(prefix='tago_snapshot_test_')
+    try:
+        manager = _manager(directory)
+        manager.create_session('sid1', LAT, LNG, '102', station_info=STATION)
+        assert manager.save_snapshot() == 1
+        
+        own_file = os.path.join(directory, f'sessions_snapshot.{os.getpid()}.json')
+        assert os.path.exists(own_file)
+        assert not os.path.exists(manager.snapshot_file)
+        
+        # 다른 워커 프로세스 파일, 이전 형식 파일, 복원 기간이 지난 파일
+        now = time.time()
+        other_file = os.path.join(directory, 'sessions_snapshot.4242.json')
+        stale_file = os.path.join(directory, 'sessions_snapshot.4343.json')
+        _write_snapshot(other_file, now, [_saved_session('sid2', bus_numbers=('604',))])
+        _write_snapshot(manager.snapshot_file, now, [_saved_session('sid3', bus_numbers=('911',))])
+        _write_snapshot(stale_file, now - SESSION_CONFIG['RESUME_WINDOW'] - 1, [_saved_session('sid4')])
+        
+        restarted = _manager(directory)
+        assert restarted.restore_snapshot() == 3
+        assert set(restarted._restored) == {'sid1', 'sid2', 'sid3'}
+        assert restarted._restored['sid1'].station_info == STATION
+        assert not os.path.exists(stale_file)
+        
+        # 재접속하지 않은 복원 세션도 다음 스냅샷에 이어서 저장
+        restarted.create_session('sid5', LAT, LNG, '102')
+        assert restarted.save_snapshot() == 4
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_claim_restored_within_radius():
+    """이전 세션 ID나 버스 번호로 찾되 RESUME_MATCH_RADIUS 안일 때만 넘겨받고, 한 번만 넘겨받음"""
+    directory = tempfile.mkdtemp(prefix='tago_snapshot_test_')
+    try:
+        manager = _manager(directory)
+        _write_snapshot(manager.snapshot_file, time.time(),
+                        [_saved_session('old1'), _saved_session('old2', bus_numbers=('604',))])
+        assert manager.restore_snapshot() == 2
+        
+        record = manager.claim_restored('new1', NEAR_LAT, LNG, ['102'], resume_session_id='old1')
+        assert record is not None and record.station_info == STATION
+        assert manager.claim_restored('new1', NEAR_LAT, LNG, ['102'], resume_session_id='old1') is None
+        
+        # 이전 세션 ID 없이 버스 번호·위치로 찾기
+        assert manager.claim_restored('new2', LAT, LNG, ['604']).session_id == 'old2'
+        assert manager.resumed_sessions == 2
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_claim_restored_rejected_beyond_radius():
+    """ID가 맞아도 위치가 RESUME_MATCH_RADIUS 밖이거나 버스 번호가 다르면 넘겨받지 않음"""
+    directory = tempfile.mkdtemp(prefix='tago_snapshot_test_')
+    try:
+        manager = _manager(directory)
+        _write_snapshot(manager.snapshot_file, time.time(), [_saved_session('old1')])
+        manager.restore_snapshot()
+        
+        assert manager.claim_restored('new1', FAR_LAT, LNG, ['102'], resume_session_id='old1') is None
+        assert manager.claim_restored('new1', FAR_LAT, LNG, ['102']) is None
+        assert manager.claim_restored('new1', LAT, LNG, ['604'], resume_session_id='old1') is None
+        assert 'old1' in manager._restored
+        
+        # 복원 가능 기간이 지난 세션은 가까워도 넘겨받지 않음
+        manager._restored['old1'].last_seen -= SESSION_CONFIG['RESUME_WINDOW']
+        assert manager.claim_restored('new1', LAT, LNG, ['102'], resume_session_id='old1') is None
+        assert manager.resumed_sessions == 0
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_resumed_session_starts_with_jittered_first_poll():
+    """재접속한 복원 세션은 저장된 정류소로 시작하고 첫 조회를 RESUME_JITTER 안에서 분산"""
+    directory = tempfile.mkdtemp(prefix='tago_snapshot_test_')
+    app = Flask(__name__)
+    socketio = SocketIO(app)
+    init_websocket_handlers(socketio)
+    
+    original = session_manager._worker_class, session_manager.snapshot_file, SESSION_CONFIG['RESUME_JITTER']
+    session_manager._worker_class = _RecordingWorker
+    session_manager.snapshot_file = os.path.join(directory, 'sessions_snapshot.json')
+    _RecordingWorker.instances = []
+    try:
+        _write_snapshot(session_manager.snapshot_file, time.time(), [_saved_session('old1')])
+        session_manager.restore_snapshot()
+        
+        client = socketio.test_client(app)
+        client.emit('start_bus_monitoring', {'lat': NEAR_LAT, 'lng': LNG, 'bus_number': '102',
+                                             'interval': 30, 'resume_session_id': 'old1'})
+        started = [event for event in client.get_received() if event['name'] == 'monitoring_started']
+        assert started and started[0]['args'][0]['resumed']
+        
+        # 복원할 세션이 없는 클라이언트는 바로 조회
+        other = socketio.test_client(app)
+        other.emit('start_bus_monitoring', {'lat': LAT, 'lng': LNG, 'bus_number': '604', 'interval': 30})
+        
+        resumed_worker, fresh_worker = _RecordingWorker.instances
+        assert resumed_worker.kwargs['station_info'] == STATION
+        assert 0 <= resumed_worker.kwargs['initial_delay'] <= min(SESSION_CONFIG['RESUME_JITTER'], 30)
+        assert fresh_worker.kwargs['station_info'] is None
+        assert fresh_worker.kwargs['initial_delay'] == 0
+        
+        # 분산 범위는 조회 간격을 넘지 않음
+        SESSION_CONFIG['RESUME_JITTER'] = 60
+        delays = set()
+        for i in range(20):
+            _write_snapshot(session_manager.snapshot_file, time.time(), [_saved_session(f'old{i + 2}')])
+            session_manager.restore_snapshot()
+            client.emit('start_bus_monitoring', {'lat': LAT, 'lng': LNG, 'bus_number': '102',
+                                                 'interval': 10, 'resume_session_id': f'old{i + 2}'})
+            delays.add(_RecordingWorker.instances[-1].kwargs['initial_delay'])
+        assert all(0 <= delay <= 10 for delay in delays)
+        assert len(delays) > 1
+        
+        client.disconnect()
+        other.disconnect()
+    finally:
+        session_manager._worker_class, session_manager.snapshot_file, SESSION_CONFIG['RESUME_JITTER'] = original
+        session_manager._restored.clear()
+        session_manager._restored_by_buses.clear()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    test_snapshot_round_trip_across_process_files()
+    test_claim_restored_within_radius()
+    test_claim_restored_rejected_beyond_radius()
+    test_resumed_session_starts_with_jittered_first_poll()
+    print("OK")
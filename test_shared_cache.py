@@ -0,0 +1,188 @@
+# test_shared_cache.py
+import sys
+import os
+import tempfile
+import time
+
+# 프로젝트 루트 경로를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import utils.shared_cache as shared_cache
+from utils.constants import SHARED_CACHE_CONFIG
+from utils.shared_cache import SharedMemoryCache, _SEQ, _key_hash, fetch_shared
+
+
+def _cache(slots=8, slot_size=256, ways=2):
+    """임시 파일 위의 공유 캐시 (파일은 테스트 끝에 삭제)"""
+    fd, path = tempfile.mkstemp(prefix='tago_shm_test_')
+    os.close(fd)
+    os.remove(path)
+    return SharedMemoryCache(path, slots=slots, slot_size=slot_size, ways=ways)
+
+
+def _dispose(cache):
+    cache.close()
+    os.remove(cache.path)
+
+
+def _fork(child):
+    """자식 프로세스에서 child() 실행 (준비되면 파이프로 알림), 자식 PID 반환"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            child(lambda: os.write(write_fd, b'1'))
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    os.read(read_fd, 1)
+    os.close(read_fd)
+    return pid
+
+
+def _slot_of(cache, key):
+    """키가 저장된 슬롯 번호"""
+    key_hash = _key_hash(key)
+    for slot in cache._ways(key_hash):
+        if shared_cache._SLOT_HEADER.unpack_from(cache._mm, cache._offset(slot))[1] == key_hash:
+            return slot
+    return None
+
+
+def test_no_torn_read_during_forked_write():
+    """다른 프로세스가 계속 기록하는 동안 읽어도 두 값이 섞인 페이로드를 돌려주지 않음"""
+    # 복사 중인 구간을 읽을 가능성이 크도록 큰 페이로드 사용
+    cache = _cache(slot_size=1 << 20)
+    values = [{'v': 'a' * 1000000}, {'v': 'b' * 1000000}]
+    cache.set('k', values[0])
+    
+    def writer(ready):
+        ready()
+        until = time.time() + 0.5
+        i = 0
+        while time.time() < until:
+            cache.set('k', values[i % 2])
+            i += 1
+    
+    pid = _fork(writer)
+    try:
+        reads = 0
+        until = time.time() + 0.4
+        while time.time() < until:
+            entry = cache.get('k', 60)
+            if entry is not None:
+                assert entry[1] in values
+                reads += 1
+        assert reads > 0
+    finally:
+        os.waitpid(pid, 0)
+        _dispose(cache)
+
+
+def test_slot_left_odd_by_crashed_writer():
+    """기록 중 종료된 프로세스가 남긴 홀수 번호는 읽기를 막고, 다음 기록 뒤에는 짝수로 돌아옴"""
+    cache = _cache()
+    try:
+        cache.set('k', {'v': 1})
+        offset = cache._offset(_slot_of(cache, 'k'))
+        seq = _SEQ.unpack_from(cache._mm, offset)[0]
+        _SEQ.pack_into(cache._mm, offset, seq | 1)
+        
+        assert cache.get('k', 60) is None
+        
+        assert cache.set('k', {'v': 2})
+        assert _SEQ.unpack_from(cache._mm, offset)[0] % 2 == 0
+        assert cache.get('k', 60)[1] == {'v': 2}
+    finally:
+        _dispose(cache)
+
+
+def test_waiter_uses_value_stored_by_lease_holder():
+    """다른 프로세스가 리스를 가진 동안 대기한 프로세스는 직접 조회하지 않고 저장된 값을 사용"""
+    cache = _cache()
+    
+    def holder(ready):
+        assert cache.try_acquire('k', 5)
+        ready()
+        time.sleep(0.2)
+        cache.set('k', {'from': 'holder'})
+        cache.release('k')
+    
+    pid = _fork(holder)
+    original = shared_cache._shared_cache
+    shared_cache._shared_cache = cache
+    calls = []
+    try:
+        assert not cache.try_acquire('k', 5)
+        value, _, fetched_here = fetch_shared('k', 60, lambda: calls.append(1) or {'from': 'waiter'})
+    finally:
+        shared_cache._shared_cache = original
+        os.waitpid(pid, 0)
+        _dispose(cache)
+    
+    assert value == {'from': 'holder'}
+    assert not fetched_here
+    assert calls == []
+
+
+def test_expired_lease_lets_waiter_fetch():
+    """리스를 가진 프로세스가 값 없이 종료되면 리스 만료 후 대기 프로세스가 직접 조회"""
+    cache = _cache()
+    pid = _fork(lambda ready: (cache.try_acquire('k', 0.3), ready()))
+    os.waitpid(pid, 0)
+    
+    original = shared_cache._shared_cache, SHARED_CACHE_CONFIG['LEASE_SECONDS']
+    shared_cache._shared_cache = cache
+    SHARED_CACHE_CONFIG['LEASE_SECONDS'] = 0.3
+    try:
+        assert not cache.try_acquire('k', 5)
+        started = time.time()
+        value, _, fetched_here = fetch_shared('k', 60, lambda: {'from': 'waiter'})
+        waited = time.time() - started
+    finally:
+        shared_cache._shared_cache, SHARED_CACHE_CONFIG['LEASE_SECONDS'] = original
+        _dispose(cache)
+    
+    assert value == {'from': 'waiter'}
+    assert fetched_here
+    assert waited < 2
+
+
+def test_oversize_payload_rejected():
+    """슬롯보다 큰 값은 저장하지 않고 통계에만 기록"""
+    cache = _cache(slot_size=128)
+    try:
+        assert not cache.set('k', {'v': 'x' * 200})
+        assert cache.get('k', 60) is None
+        assert cache.get_stats()['oversize'] == 1
+    finally:
+        _dispose(cache)
+
+
+def test_way_eviction_prefers_oldest_unleased_slot():
+    """집합이 가득 차면 리스가 없는 가장 오래된 슬롯을 교체"""
+    cache = _cache(slots=2, ways=2)
+    try:
+        now = time.time()
+        cache.set('old', 1, stored_at=now - 20)
+        cache.set('leased', 2, stored_at=now - 30)
+        assert cache.try_acquire('leased', 5)
+        cache.set('new', 3, stored_at=now)
+        
+        assert cache.get('old', 60) is None
+        assert cache.get('leased', 60)[1] == 2
+        assert cache.get('new', 60)[1] == 3
+        assert cache.get_stats()['evictions'] == 1
+    finally:
+        _dispose(cache)
+
+
+if __name__ == "__main__":
+    test_no_torn_read_during_forked_write()
+    test_slot_left_odd_by_crashed_writer()
+    test_waiter_uses_value_stored_by_lease_holder()
+    test_expired_lease_lets_waiter_fetch()
+    test_oversize_payload_rejected()
+    test_way_eviction_prefers_oldest_unleased_slot()
+    print("OK")
@@ -0,0 +1,89 @@
+# test_station_search.py
+import sys
+import os
+
+# 프로젝트 루트 경로를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from apis.tago_api import configure_default_client
+from services.station_search import StationSearchIndex
+
+configure_default_client('test-service-key')
+
+NAMES = ['대전역', '대전시청', '서대전역', '정부청사', '대동역', '역전시장', '시청역', '유성온천역']
+
+
+def _index():
+    """대전(25) 정류소 몇 곳으로 만든 검색 인덱스"""
+    stations = [{'station_id': f'DJB{i:03d}', 'station_name': name, 'city_code': '25',
+                 'latitude': 36.35 + i * 0.001, 'longitude': 127.38} for i, name in enumerate(NAMES)]
+    index = StationSearchIndex()
+    index.build_city('25', stations)
+    return index
+
+
+def _matches(index, query, **kwargs):
+    """정류소명 -> 매칭 유형"""
+    return {result['station_name']: result['match'] for result in index.search(query, '25', limit=50, **kwargs)}
+
+
+def test_chosung_prefix_and_infix():
+    """초성 검색은 접두사와 중간 일치를 모두 찾음"""
+    index = _index()
+    assert _matches(index, 'ㄷㅈㅇ') == {'대전역': 'exact', '서대전역': 'infix'}
+    assert _matches(index, 'ㅅㅊ') == {'시청역': 'prefix', '대전시청': 'infix'}
+
+
+def test_prefix_ranked_before_infix():
+    """접두사 일치가 중간 일치보다 먼저 나옴"""
+    index = _index()
+    results = index.search('대전', '25')
+    assert [result['station_name'] for result in results[:2]] == ['대전역', '대전시청']
+    assert [result['match'] for result in results[:3]] == ['prefix', 'prefix', 'infix']
+    assert results[2]['station_name'] == '서대전역'
+
+
+def test_infix_match():
+    """이름 중간의 글자도 찾음"""
+    index = _index()
+    matches = _matches(index, '시청')
+    assert matches['대전시청'] == 'infix'
+    assert matches['시청역'] == 'prefix'
+
+
+def test_single_character_query_scans_names():
+    """한 글자 검색어는 이름 어디에 있어도 찾음"""
+    index = _index()
+    matches = _matches(index, '역')
+    assert set(matches) == {'대전역', '서대전역', '대동역', '역전시장', '시청역', '유성온천역'}
+    assert matches['역전시장'] == 'prefix'
+    assert matches['대동역'] == 'infix'
+    assert set(_matches(index, 'ㅊ')) == {'대전시청', '정부청사', '시청역', '유성온천역'}
+
+
+def test_one_syllable_typo():
+    """짧은 이름의 한 음절 오타는 경계 바이그램으로 찾음"""
+    index = _index()
+    results = index.search('대잔역', '25')
+    assert results[0]['station_name'] == '대전역'
+    assert results[0]['match'] == 'fuzzy'
+    assert _matches(index, '정부청서')['정부청사'] == 'fuzzy'
+
+
+def test_location_orders_same_match_level():
+    """위치가 주어지면 같은 매칭 수준 안에서 가까운 정류소 먼저"""
+    index = _index()
+    results = index.search('역', '25', lat=36.357, lng=127.38)
+    infix = [result['station_name'] for result in results if result['match'] == 'infix']
+    assert infix[0] == '유성온천역'
+    assert all('distance' in result for result in results)
+
+
+if __name__ == "__main__":
+    test_chosung_prefix_and_infix()
+    test_prefix_ranked_before_infix()
+    test_infix_match()
+    test_single_character_query_scans_names()
+    test_one_syllable_typo()
+    test_location_orders_same_match_level()
+    print("OK")
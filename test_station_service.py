@@ -0,0 +1,116 @@
+# test_station_service.py
+import sys
+import os
+
+# 프로젝트 루트 경로를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.station_services as station_services
+from websocket.manager import SessionManager
+
+STATION = {
+    'station_id': 'DJB8001793',
+    'station_name': '정부청사',
+    'city_code': '25',
+    'latitude': 36.3504,
+    'longitude': 127.3845
+}
+
+
+class _FakeClient:
+    """TAGO를 호출하지 않는 테스트용 클라이언트"""
+    
+    def get_stations_by_location(self, lng, lat):
+        return [STATION]
+    
+    def find_current_station(self, lat, lng, stations):
+        return stations[0], ''
+    
+    def get_bus_arrival_info(self, station_id, city_code):
+        return [{'route_id': 'DJB30300102', 'route_name': '102', 'route_type': '간선버스',
+                 'remaining_stations': 2, 'vehicle_type': '', 'arrival_time': 120, 'station_name': '정부청사'}]
+    
+    def calculate_distance(self, lat1, lng1, lat2, lng2):
+        return 10.0
+
+
+class _IdleWorker:
+    def __init__(self, **kwargs):
+        pass
+    
+    def start(self):
+        pass
+    
+    def stop(self):
+        pass
+
+
+def _service_with_fake_client():
+    """가짜 클라이언트를 쓰는 서비스 (원래 클라이언트 조회 함수는 호출 측에서 복원)"""
+    original = station_services.get_default_client
+    station_services.get_default_client = lambda: _FakeClient()
+    return station_services.StationService(), original
+
+
+def _session_before_first_tick():
+    """워커 첫 틱 전(station_info가 아직 None)인 세션 정보"""
+    manager = SessionManager(worker_class=_IdleWorker)
+    manager.create_session('sid1', 36.3504, 127.3845, '102')
+    session_info = manager.get_session_info('sid1')
+    assert session_info['station_info'] is None
+    return session_info
+
+
+def test_flow2_before_first_tick():
+    """정류소 확정 전 세션도 플로우 2 조회가 위치로 정류소를 찾아 응답"""
+    service, original = _service_with_fake_client()
+    try:
+        result = service.get_all_buses_from_session(_session_before_first_tick())
+    finally:
+        station_services.get_default_client = original
+    
+    assert result['station']['station_name'] == '정부청사'
+    assert result['total_count'] == 1
+
+
+def test_batch_before_first_tick():
+    """일괄 조회에 정류소 확정 전 세션이 있어도 항목별로 정상 처리"""
+    service, original = _service_with_fake_client()
+    try:
+        result = service.get_buses_batch([('sid1', _session_before_first_tick())], [], 3.0)
+    finally:
+        station_services.get_default_client = original
+    
+    assert result['ok_count'] == 1
+    assert result['items'][0]['status'] == 'ok'
+
+
+class _BrokenStationClient(_FakeClient):
+    """특정 정류소에서만 형식이 어긋난 도착 정보를 돌려주는 클라이언트"""
+    
+    def get_bus_arrival_info(self, station_id, city_code):
+        if station_id == 'BROKEN':
+            return [{'route_name': '102', 'station_name': '고장'}]
+        return super().get_bus_arrival_info(station_id, city_code)
+
+
+def test_batch_isolates_item_errors():
+    """일괄 조회 항목 하나의 처리 오류가 다른 항목 결과를 막지 않음"""
+    original = station_services.get_default_client
+    station_services.get_default_client = lambda: _BrokenStationClient()
+    try:
+        service = station_services.StationService()
+        result = service.get_buses_batch([], [{'city_code': '25', 'station_id': 'BROKEN'},
+                                              {'city_code': '25', 'station_id': 'DJB8001793'}], 3.0)
+    finally:
+        station_services.get_default_client = original
+    
+    assert [item['status'] for item in result['items']] == ['error', 'ok']
+    assert result['ok_count'] == 1
+
+
+if __name__ == "__main__":
+    test_flow2_before_first_tick()
+    test_batch_before_first_tick()
+    test_batch_isolates_item_errors()
+    print("OK")
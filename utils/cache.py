@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """스레드 안전 TTL 캐시 (최대 개수 초과 시 가장 오래 안 쓴 항목 제거)"""
+    
+    def __init__(self, ttl: float, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable, max_age: float = None) -> Optional[Any]:
+        """
+        유효한 캐시 값 조회
+        
+        Args:
+            key (Hashable): 캐시 키
+            max_age (float): 허용 최대 경과 시간(초), 없으면 TTL 사용
+        
+        Returns:
+            Optional[Any]: 캐시 값 (없거나 만료되었으면 None)
+        """
+        limit = self.ttl if max_age is None else max_age
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.time() - entry[0] > limit:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def get_entry(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        """만료 여부와 관계없이 (저장 시각, 값) 조회"""
+        with self._lock:
+            return self._data.get(key)
+    
+    def set(self, key: Hashable, value: Any, stored_at: float = None):
+        """캐시 값 저장"""
+        with self._lock:
+            self._data[key] = (stored_at or time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+    
+    def age(self, key: Hashable) -> Optional[float]:
+        """저장 후 경과 시간(초), 항목이 없으면 None"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        return time.time() - entry[0]
+    
+    def delete(self, key: Hashable):
+        """캐시 항목 삭제"""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get_stats(self) -> Dict:
+        """캐시 통계 조회"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0
+        }
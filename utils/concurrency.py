@@ -0,0 +1,20 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from utils.constants import CONCURRENCY_CONFIG
+
+_fetch_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_fetch_executor() -> ThreadPoolExecutor:
+    """업스트림 동시 조회용 프로세스 전역 스레드 풀 (최초 사용 시 생성)"""
+    global _fetch_executor
+    if _fetch_executor is None:
+        with _executor_lock:
+            if _fetch_executor is None:
+                _fetch_executor = ThreadPoolExecutor(
+                    max_workers=CONCURRENCY_CONFIG['FETCH_WORKERS'],
+                    thread_name_prefix='tago-fetch'
+                )
+    return _fetch_executor
@@ -5,6 +5,224 @@ TAGO_API_CONFIG = {
     'CACHE_TTL': 60,  # 캐시 유지 시간 (초)
 }
 
+# TAGO 서비스 키 풀 설정 (API_KEY에 쉼표로 여러 키 지정)
+KEY_POOL_CONFIG = {
+    'DAILY_QUOTA': 10000,               # 키·서비스별 일일 호출 한도 (개발계정 기준)
+    'SERVICE_QUOTAS': {},               # 서비스별 한도 재정의 (예: {'ArvlInfoInqireService': 100000})
+    'UTC_OFFSET_HOURS': 9,              # 한도 초기화 기준 시간대 (KST 자정)
+    'ERROR_RATE_ALPHA': 0.1,            # 키별 오류율 지수 이동 평균 가중치
+    'ERROR_RATE_HALF_LIFE': 60,         # 요청이 없어도 오류율이 절반으로 줄어드는 시간 (초)
+    'AUTH_BENCH_SECONDS': 3600,         # 인증 오류 키 제외 시간 (초)
+    'THROTTLE_BENCH_SECONDS': 10,       # HTTP 429에 Retry-After가 없을 때 키·서비스 제외 시간 (초)
+    'MAX_THROTTLE_SECONDS': 300,        # Retry-After를 따르는 최대 제외 시간 (초)
+    'QUOTA_RESULT_CODES': ('22',),      # LIMITED_NUMBER_OF_SERVICE_REQUESTS_EXCEEDS_ERROR
+    'AUTH_RESULT_CODES': ('20', '21', '30', '31', '32'),  # 접근 거부·일시 정지·미등록·기한 만료·미등록 IP
+}
+
+# TAGO 요청 헤징 설정 (느린 요청을 한 번 더 보내 먼저 온 응답 사용)
+HEDGE_CONFIG = {
+    'ENABLED': False,           # 켜면 업스트림 호출이 최대 BUDGET_RATIO만큼 늘어남
+    'PERCENTILE': 0.95,         # 이 백분위수 응답 시간을 넘기면 헤지 요청 전송
+    'WINDOW': 200,              # 엔드포인트별 응답 시간 표본 수
+    'MIN_SAMPLES': 20,          # 표본이 이보다 적으면 헤지하지 않음
+    'RECOMPUTE_EVERY': 20,      # 헤지 지연 재계산 주기 (표본 수)
+    'MIN_DELAY': 0.05,          # 헤지 지연 하한 (초)
+    'MAX_DELAY': 3.0,           # 헤지 지연 상한 (초)
+    'BUDGET_RATIO': 0.05,       # 헤지 요청 예산 (전체 요청 대비 비율)
+    'BUDGET_BURST': 5,          # 한 번에 쓸 수 있는 헤지 예산 (요청 수)
+    'MAX_WORKERS': 64,          # 헤징용 스레드 수 (모자라면 헤징 없이 호출 스레드에서 실행)
+}
+
+# 프로세스 간 공유 캐시 설정 (여러 서버 프로세스가 TAGO 조회 결과를 공유)
+SHARED_CACHE_CONFIG = {
+    'ENABLED': False,           # True 또는 TAGO_SHARED_CACHE_PATH 환경 변수 지정 시 사용
+    'PATH': None,               # 공유 파일 경로 (없으면 /dev/shm/tago_shared_cache)
+    'SLOTS': 2048,              # 전체 슬롯 수
+    'WAYS': 4,                  # 키 하나가 들어갈 수 있는 슬롯 수 (집합 연관)
+    'SLOT_SIZE': 16384,         # 슬롯 크기 (바이트, 헤더 포함) - 이보다 큰 값은 공유하지 않음
+    'LEASE_SECONDS': 12,        # 조회 리스 유지 시간 (초, TAGO 타임아웃보다 길게)
+    'WAIT_POLL': 0.05,          # 다른 프로세스 조회 결과 대기 간격 (초)
+    'FRESH_AGE': 3,             # 강제 갱신(프리페치) 시 다른 프로세스가 방금 갱신한 값으로 인정하는 시간 (초)
+}
+
+# 공용 HTTP 전송 계층 설정
+TRANSPORT_CONFIG = {
+    'POOL_CONNECTIONS': 4,      # 호스트별 연결 풀 수
+    'POOL_MAXSIZE': 64,         # 풀당 최대 유지 연결 수 (동시 요청 스레드 수 이상 권장)
+    'POOL_BLOCK': False,        # 풀이 가득 차면 대기하지 않고 임시 연결 사용
+}
+
+# 캐시 설정
+CACHE_CONFIG = {
+    'ARRIVAL_TTL': 10,            # 도착 정보 캐시 유지 시간 (초)
+    'ARRIVAL_MAX_ENTRIES': 5000,  # 도착 정보 캐시 최대 항목 수
+}
+
+# 도착 정보 선행 갱신(프리페치) 설정
+PREFETCH_CONFIG = {
+    'LEAD_TIME': 3,                               # 세션 틱 몇 초 전에 갱신할지
+    'WORKERS': 8,                                 # 동시 갱신 스레드 수
+    'WARMUP_TOP_N': 20,                           # 부팅 시 미리 데우는 정류소 수
+    'STATS_FILE': 'data/prefetch_stats.json',     # 정류소 조회 통계 저장 파일
+    'STATS_SAVE_INTERVAL': 300,                   # 통계 저장 주기 (초)
+}
+
+# 업스트림 동시 조회 설정
+CONCURRENCY_CONFIG = {
+    'FETCH_WORKERS': 16,            # 동시 조회 스레드 풀 크기
+}
+
+# 플로우 2 일괄 조회 설정
+BATCH_CONFIG = {
+    'MAX_ITEMS': 50,                # 요청당 최대 항목 수 (세션 + 정류소)
+    'DEFAULT_DEADLINE': 3.0,        # 기본 요청 마감 시간 (초)
+    'MAX_DEADLINE': 10.0,           # 허용 최대 마감 시간 (초)
+}
+
+# 모니터링 세션 만료 설정
+SESSION_CONFIG = {
+    'IDLE_TIMEOUT': 180,        # 마지막 클라이언트 이벤트 후 세션 만료 검사까지의 시간 (초)
+    'WHEEL_SLOT_SECONDS': 5,    # 만료 휠 슬롯 간격 (초, 만료 검사 정밀도)
+    'SHARDS': 32,               # 세션 레지스트리 샤드(락) 수
+    'SNAPSHOT_FILE': 'data/sessions_snapshot.json',  # 세션 스냅샷 파일 (프로세스별로 이름에 pid를 붙임, None이면 사용 안 함)
+    'SNAPSHOT_INTERVAL': 60,    # 세션 스냅샷 저장 주기 (초)
+    'RESUME_WINDOW': 600,       # 마지막 클라이언트 이벤트 후 이 시간 안에 재접속하면 세션 복원 (초)
+    'RESUME_MATCH_RADIUS': 30,  # 이전 세션 ID 없이 재접속할 때 같은 세션으로 볼 위치 차이 (미터)
+    'RESUME_JITTER': 10,        # 복원한 세션의 첫 조회를 분산할 최대 지연 (초, 조회 간격 이하)
+}
+
+# SSE 도착 정보 스트림 설정 (/api/stream/arrivals)
+SSE_CONFIG = {
+    'DEFAULT_INTERVAL': 30,         # 기본 조회 간격 (초)
+    'MIN_INTERVAL': 10,             # 최소 조회 간격 (초)
+    'MAX_SUBSCRIBERS': 5000,        # 프로세스당 최대 동시 연결 수
+    'MAX_PER_CLIENT': 20,           # 원격 주소별 최대 동시 연결 수
+    'HEARTBEAT': 15,                # 이벤트가 없을 때 keepalive 주석 전송 간격 (초)
+    'IDLE_TIMEOUT': 600,            # 이 시간 동안 새 이벤트가 없으면 연결 종료 (초)
+    'MAX_STREAM_SECONDS': 1800,     # 연결 최대 유지 시간, 지나면 reconnect 이벤트 후 종료 (초)
+    'RETRY_MS': 3000,               # 클라이언트 재연결 대기 시간 (밀리초)
+    'RESUME_BUFFER': 20,            # Last-Event-ID 이어 받기용 정류소별 최근 이벤트 수
+    'RESUME_GRACE': 60,             # 구독자가 모두 떠난 채널 유지 시간 (초)
+    'POLL_TICK': 1.0,               # 채널 조회 예약 확인 주기 (초)
+    'STATION_TTL': 3600,            # 좌표 -> 정류소 확인 결과 캐시 시간 (초)
+    'MAX_STATION_LOOKUPS': 10000,   # 좌표 -> 정류소 캐시 최대 항목 수
+}
+
+# 운행 시간·배차 간격 기반 폴링 정책 설정
+POLLING_CONFIG = {
+    'SCHEDULE_AWARE': True,         # False면 항상 요청한 간격으로 폴링
+    'UTC_OFFSET_HOURS': 9,          # 노선 운행 시각 기준 시간대 (KST)
+    'PEAK_HOURS': [(7, 9), (17, 20)],   # 출퇴근 시간대 [시작 시, 끝 시) - 첨두(peek_alloc) 배차간격 적용
+    'PRE_SERVICE_LEAD': 10,         # 첫차 시각 이 시간(분) 전부터 폴링 재개
+    'POST_SERVICE_GRACE': 90,       # 막차 출발 후 정류소 도착까지 고려해 폴링을 유지하는 시간 (분)
+    'HEADWAY_FRACTION': 0.1,        # 폴링 간격 = 배차간격 x 비율 (요청 간격보다 짧아지지 않음)
+    'MAX_POLL_INTERVAL': 180,       # 배차간격 기반 최대 폴링 간격 (초)
+    'APPROACH_FRACTION': 0.5,       # 버스가 가까우면 남은 도착 시간 x 비율까지 간격 축소
+    'MAX_SUSPEND_WAIT': 600,        # 운행 시간 외 재확인 최대 간격 (초)
+    'SCHEDULE_TTL': 12 * 60 * 60,   # 노선 운행 정보 캐시 유지 시간 (초)
+    'SCHEDULE_RETRY': 300,          # 노선 운행 정보 조회 실패 후 재시도까지 시간 (초)
+    'MAX_SCHEDULES': 5000,          # 캐시하는 최대 (도시, 버스번호) 수
+}
+
+# 도착 임계값 알림 설정
+ALERT_CONFIG = {
+    'DEFAULT_STATION_THRESHOLDS': [3, 1],   # 임계값 미지정 시 남은 정류장 수 알림 기준
+    'DEFAULT_ARRIVING_TIME': 60,    # 도착 예정 시간이 이 값(초) 이하면 bus_arriving
+    'DEFAULT_UPDATE_INTERVAL': 300, # 알림 구독 시 전체 bus_update 하트비트 간격 (초, 0이면 전송 안 함)
+    'MAX_THRESHOLDS': 5,            # 지표별 최대 임계값 수
+    'STATION_HYSTERESIS': 1,        # 남은 정류장 수가 임계값 + 이 값보다 커져야 재알림
+    'TIME_HYSTERESIS': 30,          # 도착 시간이 임계값 + 이 값(초)보다 커져야 재알림
+    'TIME_HYSTERESIS_RATIO': 0.2,   # 도착 시간 히스테리시스 비율 (임계값 x 비율과 위 값 중 큰 값)
+}
+
+# 다중 정류소 모니터링 설정
+MULTI_STOP_CONFIG = {
+    'DEFAULT_K': 3,             # 기본 동시 모니터링 정류소 수
+    'MAX_K': 5,                 # 최대 동시 모니터링 정류소 수
+    'DEFAULT_RADIUS': 150,      # 기본 검색 반경 (미터)
+    'MAX_RADIUS': 500,          # 최대 검색 반경 (미터)
+    'WALKING_SPEED': 0.8,       # 보행 속도 (m/s, 시각장애인 보행 기준으로 보수적으로 설정)
+    'WALK_WEIGHT': 0.5,         # 순위 계산 시 보행 시간 가중치
+}
+
+# 다중 버스 구독 설정
+MULTI_BUS_CONFIG = {
+    'MAX_BUS_NUMBERS': 5,       # 세션 하나에서 동시에 모니터링할 수 있는 최대 버스 번호 수
+}
+
+# Socket.IO 페이로드 인코딩 설정
+CODEC_CONFIG = {
+    'COMPRESSION_THRESHOLD': 512,   # 이 크기(바이트) 이상인 페이로드만 압축
+    'COMPRESSION_LEVEL': 6,         # zlib 압축 레벨
+    'TEXT_SIZE_SAMPLE_EVERY': 16,   # 협상하지 않은 JSON 이벤트는 N번에 1번만 크기 측정 (통계용)
+}
+
+# 정류소명 검색 인덱스 설정
+SEARCH_CONFIG = {
+    'DEFAULT_LIMIT': 10,        # 기본 검색 결과 수
+    'MAX_LIMIT': 50,            # 최대 검색 결과 수
+    'MAX_PREFIX_LENGTH': 12,    # 트라이에 저장하는 최대 접두사 길이
+    'FUZZY_THRESHOLD': 0.5,     # 오타 허용 검색 최소 바이그램 유사도
+    'PRELOAD_CITIES': [],       # 부팅 시 미리 인덱스를 만들 도시코드
+}
+
+# 노선 단위 버스 위치 추적 설정
+ROUTE_TRACKING_CONFIG = {
+    'ENABLED': False,               # 노선이 확인된 세션은 정류소별 조회 대신 노선 위치 조회 사용 (학습값 검증 전까지 끔)
+    'LOCATION_TTL': 10,             # 노선 버스 위치 캐시 유지 시간 (초)
+    'STOPS_TTL': 6 * 60 * 60,       # 노선 경유 정류소 목록 캐시 유지 시간 (초)
+    'MAX_ROUTES': 2000,             # 캐시하는 최대 노선 수
+    'DEFAULT_SEC_PER_STATION': 90,  # 학습 전 정류장당 소요 시간 (초, 정류소 도착 정보로 시작값을 정하기 전)
+    'MIN_SEC_PER_STATION': 20,      # 학습값 하한 (초)
+    'MAX_SEC_PER_STATION': 600,     # 학습값 상한 (초)
+    'SMOOTHING': 0.3,               # 정류장당 소요 시간 지수 이동 평균 가중치
+}
+
+# 노선 정보 캐시 설정 (플로우 2 확장 응답의 노선 유형·첫차/막차·배차간격)
+ROUTE_INFO_CONFIG = {
+    'TTL': 12 * 60 * 60,            # 노선 정보 캐시 유지 시간 (초)
+    'RETRY': 300,                   # 조회 실패 후 재시도까지 시간 (초)
+    'EMPTY_RETRY': 1800,            # TAGO에 정보가 없던 노선을 다시 조회하기까지 시간 (초, 캐시하지 않음)
+    'MAX_ROUTES': 5000,             # 캐시하는 최대 (도시, 노선 ID) 수
+}
+
+# 도착 시간 추정(보간) 설정
+ESTIMATOR_CONFIG = {
+    'SMOOTHING': 0.3,           # 감소율/오차 지수 이동 평균 가중치
+    'JUMP_THRESHOLD': 120,      # 이 값(초) 이상 늘어나면 다음 버스로 바뀐 것으로 보고 재시작
+    'MAX_EXTRAPOLATION': 300,   # 마지막 관측 후 추정을 허용하는 최대 시간 (초)
+    'DEFAULT_DRIFT': 0.1,       # 오차 학습 전 경과 1초당 불확실성 (초)
+    'MIN_EMIT_INTERVAL': 2,     # 추정 업데이트 최소 전송 간격 (초)
+    'MAX_ENTRIES': 20000,       # 추적하는 (노선, 정류소) 최대 수
+}
+
+# 도착 정보 시계열 저장 설정
+TIMESERIES_CONFIG = {
+    'CAPACITY_PER_SERIES': 720,               # (정류소, 노선)별 최대 관측 수 (30초 간격 6시간)
+    'MAX_MEMORY_BYTES': 32 * 1024 * 1024,     # 전체 시계열 메모리 상한
+}
+
+# 요청 구간 추적 설정
+TRACING_CONFIG = {
+    'SAMPLE_RATE': 0.01,            # 루트 구간(이벤트·워커 틱·플로우 2 요청) 샘플링 비율
+    'MEMORY_TRACES': 200,           # 메모리에 보관할 최근 트레이스 수
+    'MAX_SPANS_PER_TRACE': 256,     # 트레이스당 최대 구간 수 (넘으면 버림)
+    'EXPORT_PATH': None,            # OTLP/JSON 파일 경로 (TAGO_TRACE_FILE 환경 변수로도 지정)
+    'EXPORT_QUEUE_SIZE': 1000,      # 파일 기록 대기 트레이스 수 (넘으면 버림)
+    'SERVICE_NAME': 'tago-bus-server',
+}
+
+# 온디맨드 프로파일링 설정 (관리자 전용)
+PROFILING_CONFIG = {
+    'DEFAULT_DURATION': 30,     # 시간·횟수 미지정 시 프로파일링 시간 (초)
+    'MAX_DURATION': 300,        # 최대 프로파일링 시간 (초)
+    'MAX_COUNT': 10000,         # 최대 대상 호출 횟수
+    'SAMPLE_INTERVAL': 0.005,   # 스택 샘플링 간격 (초)
+    'MAX_STACK_DEPTH': 64,      # 수집하는 최대 스택 깊이
+    'TOP_N': 30,                # 결과에 포함하는 상위 항목 수
+    'TRACEMALLOC_FRAMES': 10,   # tracemalloc 할당 위치별 저장 프레임 수
+}
+
 # 버스 노선 유형 코드
 BUS_ROUTE_TYPES = {
     '1': '일반버스',
@@ -34,7 +252,7 @@ API_FLOWS = {
     'flow2': {
         'name': 'REST API 전체 버스 정보',
         'protocol': 'HTTP/JSON',
-        'endpoints': ['/api/station/buses']
+        'endpoints': ['/api/station/buses', '/api/station/buses/batch']
     }
 }
 
@@ -42,6 +260,10 @@ API_FLOWS = {
 AVAILABLE_ENDPOINTS = {
     'websocket_test': '/test',
     'station_buses': '/api/station/buses (POST)',
+    'station_buses_batch': '/api/station/buses/batch (POST)',
+    'station_search': '/api/stations/search (GET)',
+    'timeseries_export': '/api/timeseries/arrivals (GET, NDJSON)',
+    'admin_profile': '/api/admin/profile (관리자 전용)',
     'api_info': '/api'
 }
 
@@ -53,7 +275,11 @@ WEBSOCKET_EVENTS = {
             'lat': 'float - 위도',
             'lng': 'float - 경도', 
             'bus_number': 'string - 버스 번호',
-            'interval': 'int - 업데이트 간격(초)'
+            'interval': 'int - 업데이트 간격(초)',
+            'estimate_interval': 'int - 폴링 사이 추정 업데이트 간격(초, 선택)',
+            'multi_stop': 'bool - 가까운 정류소 여러 곳 동시 모니터링 (선택)',
+            'k': 'int - 다중 정류소 모드 정류소 수 (선택, 기본 3)',
+            'radius': 'int - 다중 정류소 모드 검색 반경(미터, 선택, 기본 150)'
         }
     }
 }
\ No newline at end of file
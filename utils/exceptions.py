@@ -1,3 +1,12 @@
 class TAGOAPIError(Exception):
-    """TAGO API 관련 예외"""
-    pass
\ No newline at end of file
+    """
+    TAGO API 관련 예외
+    
+    result_code: TAGO resultCode (알 수 없으면 None)
+    retry_after: 게이트웨이가 요청 속도를 제한(HTTP 429)했을 때 다시 보낼 수 있을 때까지의 초 (그 외 None)
+    """
+    
+    def __init__(self, message: str = '', result_code: str = None, retry_after: float = None):
+        super().__init__(message)
+        self.result_code = result_code
+        self.retry_after = retry_after
@@ -1,3 +1,6 @@
+import hmac
+import os
+from functools import wraps
 from flask import request, jsonify
 from werkzeug.exceptions import BadRequest
 
@@ -12,6 +15,40 @@ def handle_before_request():
     return None
 
 
+def require_admin(view):
+    """
+    관리자 전용 라우트 데코레이터
+    
+    ADMIN_TOKEN 환경변수와 X-Admin-Token 헤더(또는 Authorization: Bearer)가 일치해야 한다.
+    ADMIN_TOKEN이 설정되지 않았으면 관리자 라우트는 모두 비활성화된다.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        admin_token = os.getenv('ADMIN_TOKEN')
+        if not admin_token:
+            return jsonify({
+                'success': False,
+                'error': '관리자 API가 비활성화되어 있습니다',
+                'error_code': 'ADMIN_DISABLED'
+            }), 403
+        
+        provided = request.headers.get('X-Admin-Token', '')
+        authorization = request.headers.get('Authorization', '')
+        if not provided and authorization.startswith('Bearer '):
+            provided = authorization[len('Bearer '):]
+        
+        if not hmac.compare_digest(provided.encode(), admin_token.encode()):
+            return jsonify({
+                'success': False,
+                'error': '관리자 인증에 실패했습니다',
+                'error_code': 'UNAUTHORIZED'
+            }), 401
+        
+        return view(*args, **kwargs)
+    
+    return wrapper
+
+
 def handle_after_request(response):
     """모든 응답에 헤더 추가"""
     if response.content_type and response.content_type.startswith('application/json'):
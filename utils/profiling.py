@@ -0,0 +1,390 @@
+import functools
+import io
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+from utils.constants import PROFILING_CONFIG
+
+MODE_SAMPLE = 'sample'
+MODE_CPROFILE = 'cprofile'
+
+
+class _Target:
+    """프로파일링 대상 호출 지점 (클래스 속성 또는 핸들러 테이블 항목)"""
+    
+    __slots__ = ('name', 'owner', 'key', 'original')
+    
+    def __init__(self, name: str, owner, key: str):
+        self.name = name
+        self.owner = owner
+        self.key = key
+        self.original: Optional[Callable] = None
+    
+    def get(self) -> Callable:
+        if isinstance(self.owner, dict):
+            return self.owner[self.key]
+        return self.owner.__dict__[self.key]
+    
+    def set(self, value: Callable):
+        if isinstance(self.owner, dict):
+            self.owner[self.key] = value
+        else:
+            setattr(self.owner, self.key, value)
+
+
+class OnDemandProfiler:
+    """
+    요청 처리·워커 틱 대상 온디맨드 CPU 프로파일러
+    
+    등록된 호출 지점은 프로파일링 중에만 래퍼로 교체되고, 종료하면 원래 함수로
+    되돌린다. 꺼져 있을 때는 래퍼도 샘플링 스레드도 없으므로 오버헤드가 없다.
+    sample 모드는 대상 호출 중인 스레드의 스택을 주기적으로 수집해 collapsed stack
+    형식으로, cprofile 모드는 대상 호출마다 cProfile을 걸어 pstats 요약으로 반환한다.
+    """
+    
+    def __init__(self):
+        self._targets: Dict[str, List[_Target]] = {}
+        self._lock = threading.Lock()
+        self._session: Optional[Dict] = None
+        self._active_threads: Dict[int, str] = {}  # 대상 호출 중인 스레드 -> 대상 이름
+        self._stacks: Counter = Counter()
+        self._stats: Optional['pstats.Stats'] = None  # cProfile 관련 모듈은 cprofile 모드에서만 로드
+        self._cprofile_lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self.last_result: Optional[Dict] = None
+    
+    def register_target(self, name: str, owner, key: str):
+        """클래스 메서드(owner=클래스) 또는 핸들러 테이블 항목(owner=dict)을 대상으로 등록"""
+        with self._lock:
+            targets = self._targets.setdefault(name, [])
+            # 앱을 다시 만들어도 같은 호출 지점이 두 번 래핑되지 않도록 중복 등록 무시
+            if not any(target.owner is owner and target.key == key for target in targets):
+                targets.append(_Target(name, owner, key))
+    
+    def register_table(self, name: str, table: Dict):
+        """핸들러 테이블의 모든 항목을 같은 이름의 대상으로 등록 (Socket.IO 이벤트 핸들러 등, 기존 테이블 대체)"""
+        with self._lock:
+            self._targets[name] = [_Target(name, table, key) for key in list(table.keys())]
+    
+    def is_active(self) -> bool:
+        return self._session is not None
+    
+    def start(self, mode: str = MODE_SAMPLE, duration: float = None, count: int = None,
+              targets: List[str] = None, interval: float = None) -> Dict:
+        """
+        프로파일링 시작
+        
+        Args:
+            mode (str): 'sample'(통계적 샘플링) 또는 'cprofile'
+            duration (float): 프로파일링 시간 (초)
+            count (int): 이 횟수만큼 대상 호출이 끝나면 종료
+            targets (List[str]): 대상 이름 (없으면 등록된 전체)
+            interval (float): 샘플링 간격 (초, sample 모드)
+        
+        Returns:
+            Dict: 시작된 세션 정보
+        """
+        if mode not in (MODE_SAMPLE, MODE_CPROFILE):
+            raise ValueError(f'지원하지 않는 모드입니다: {mode}')
+        
+        with self._lock:
+            if self._session is not None:
+                raise RuntimeError('이미 프로파일링 중입니다')
+            
+            names = targets or list(self._targets.keys())
+            unknown = [name for name in names if name not in self._targets]
+            if unknown:
+                raise ValueError(f'등록되지 않은 대상입니다: {", ".join(unknown)}')
+            
+            if not duration and not count:
+                duration = PROFILING_CONFIG['DEFAULT_DURATION']
+            duration = min(duration or PROFILING_CONFIG['MAX_DURATION'], PROFILING_CONFIG['MAX_DURATION'])
+            
+            self._session = {
+                'mode': mode,
+                'targets': names,
+                'started_at': time.time(),
+                'deadline': time.time() + duration,
+                'count': min(count, PROFILING_CONFIG['MAX_COUNT']) if count else None,
+                'interval': max(interval or PROFILING_CONFIG['SAMPLE_INTERVAL'], 0.001),
+                'calls': 0,
+                'skipped': 0,
+                'samples': 0,
+                'stop_event': threading.Event()   # 세션마다 따로 (이전 세션 샘플러가 새 세션에서 깨어나지 않도록)
+            }
+            self._stacks = Counter()
+            self._stats = None
+            self._active_threads = {}
+            
+            for name in names:
+                for target in self._targets[name]:
+                    target.original = target.get()
+                    target.set(self._wrap(target))
+            
+            self._sampler = threading.Thread(target=self._run, args=(self._session,), name='profiler', daemon=True)
+            self._sampler.start()
+            
+            return self._describe(self._session)
+    
+    def stop(self, expected: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        프로파일링 종료 후 결과 반환 (진행 중이 아니면 마지막 결과)
+        
+        Args:
+            expected (Dict): 지정하면 진행 중인 세션이 이 세션일 때만 종료
+                (시간·횟수 만료 처리가 그 사이 새로 시작한 세션을 끝내지 않도록)
+        """
+        with self._lock:
+            session = self._session
+            if session is None or (expected is not None and session is not expected):
+                return self.last_result
+            self._session = None
+            
+            for name in session['targets']:
+                for target in self._targets[name]:
+                    if target.original is not None:
+                        target.set(target.original)
+                        target.original = None
+            
+            session['stop_event'].set()
+            self.last_result = self._build_result(session)
+            return self.last_result
+    
+    def status(self) -> Dict:
+        """현재 프로파일링 상태"""
+        session = self._session
+        return {
+            'active': session is not None,
+            'session': self._describe(session) if session else None,
+            'registered_targets': {name: len(targets) for name, targets in self._targets.items()},
+            'has_result': self.last_result is not None
+        }
+    
+    def _describe(self, session: Dict) -> Dict:
+        return {
+            'mode': session['mode'],
+            'targets': session['targets'],
+            'count': session['count'],
+            'calls': session['calls'],
+            'samples': session['samples'],
+            'remaining_seconds': round(max(session['deadline'] - time.time(), 0), 1)
+        }
+    
+    def _wrap(self, target: _Target) -> Callable:
+        original = target.original
+        profiler = self
+        
+        @functools.wraps(original)
+        def profiled(*args, **kwargs):
+            session = profiler._session
+            if session is None:
+                return original(*args, **kwargs)
+            
+            thread_id = threading.get_ident()
+            nested = thread_id in profiler._active_threads
+            if not nested:
+                profiler._active_threads[thread_id] = target.name
+            try:
+                if session['mode'] == MODE_CPROFILE and not nested:
+                    return profiler._call_with_cprofile(session, original, args, kwargs)
+                return original(*args, **kwargs)
+            finally:
+                if not nested:
+                    profiler._active_threads.pop(thread_id, None)
+                    profiler._count_call(session)
+        
+        return profiled
+    
+    def _call_with_cprofile(self, session: Dict, func: Callable, args, kwargs):
+        # 파이썬 버전에 따라 프로파일러는 동시에 하나만 켤 수 있으므로 겹치는 호출은 건너뜀
+        if not self._cprofile_lock.acquire(blocking=False):
+            session['skipped'] += 1
+            return func(*args, **kwargs)
+        
+        import cProfile
+        import pstats
+        
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+        finally:
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+            self._cprofile_lock.release()
+    
+    def _count_call(self, session: Dict):
+        with self._lock:
+            session['calls'] += 1
+            reached = session['count'] and session['calls'] >= session['count']
+        if reached and self._session is session:
+            threading.Thread(target=self.stop, args=(session,), daemon=True).start()
+    
+    def _run(self, session: Dict):
+        """샘플링 스레드: 대상 호출 중인 스레드의 스택 수집 및 시간 만료 처리"""
+        own_id = threading.get_ident()
+        while not session['stop_event'].wait(session['interval']):
+            if time.time() >= session['deadline']:
+                self.stop(expected=session)
+                return
+            
+            if session['mode'] != MODE_SAMPLE or not self._active_threads:
+                continue
+            
+            frames = sys._current_frames()
+            for thread_id, target_name in list(self._active_threads.items()):
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                self._stacks[self._collapse(target_name, frame)] += 1
+                session['samples'] += 1
+    
+    def _collapse(self, target_name: str, frame) -> str:
+        """스택을 대상 래퍼 아래부터 'target;함수;함수' 형태로 변환"""
+        labels = []
+        wrapper_code = OnDemandProfiler._wrap.__code__
+        while frame is not None and len(labels) < PROFILING_CONFIG['MAX_STACK_DEPTH']:
+            code = frame.f_code
+            if code.co_name == 'profiled' and code.co_filename == wrapper_code.co_filename:
+                break
+            labels.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        labels.append(target_name)
+        return ';'.join(reversed(labels))
+    
+    def _build_result(self, session: Dict) -> Dict:
+        result = {
+            'mode': session['mode'],
+            'targets': session['targets'],
+            'calls': session['calls'],
+            'skipped': session['skipped'],
+            'samples': session['samples'],
+            'interval': session['interval'],
+            'duration': round(time.time() - session['started_at'], 2)
+        }
+        
+        if session['mode'] == MODE_SAMPLE:
+            result['collapsed'] = '\n'.join(f'{stack} {count}' for stack, count in self._stacks.most_common())
+            return result
+        
+        if self._stats is None:
+            result['functions'] = []
+            result['pstats'] = ''
+            return result
+        
+        stream = io.StringIO()
+        self._stats.stream = stream
+        self._stats.sort_stats('cumulative').print_stats(PROFILING_CONFIG['TOP_N'])
+        result['pstats'] = stream.getvalue()
+        result['collapsed'] = self._collapse_cprofile(self._stats)
+        result['functions'] = [
+            {
+                'function': f'{func} ({os.path.basename(filename)}:{line})',
+                'calls': ncalls,
+                'total_time': round(tottime, 6),
+                'cumulative_time': round(cumtime, 6)
+            }
+            for (filename, line, func), (_, ncalls, tottime, cumtime, _) in sorted(
+                self._stats.stats.items(), key=lambda item: item[1][3], reverse=True
+            )[:PROFILING_CONFIG['TOP_N']]
+        ]
+        return result
+    
+    def _collapse_cprofile(self, stats: 'pstats.Stats') -> str:
+        """cProfile 호출 관계를 caller;callee 자체 시간(마이크로초) 형식으로 변환"""
+        lines = []
+        for (filename, line, func), (_, _, _, _, callers) in stats.stats.items():
+            callee = f'{func} ({os.path.basename(filename)}:{line})'
+            for (caller_file, caller_line, caller_func), caller_stats in callers.items():
+                caller = f'{caller_func} ({os.path.basename(caller_file)}:{caller_line})'
+                micros = int(caller_stats[2] * 1_000_000)
+                if micros:
+                    lines.append(f'{caller};{callee} {micros}')
+        return '\n'.join(lines)
+
+
+class MemoryTracker:
+    """
+    tracemalloc 스냅샷 비교 (메모리 누수 추적용)
+    
+    기준 스냅샷을 찍을 때만 tracemalloc을 켜고, 종료하면 끈다.
+    (tracemalloc 모듈도 처음 스냅샷을 찍을 때 로드)
+    """
+    
+    def __init__(self):
+        self._baseline: Optional['tracemalloc.Snapshot'] = None
+        self._baseline_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def snapshot(self) -> Dict:
+        """기준 스냅샷 저장 (tracemalloc이 꺼져 있으면 시작)"""
+        import tracemalloc
+        
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(PROFILING_CONFIG['TRACEMALLOC_FRAMES'])
+            self._baseline = tracemalloc.take_snapshot()
+            self._baseline_at = time.time()
+            current, peak = tracemalloc.get_traced_memory()
+            return {'tracing': True, 'traced_bytes': current, 'peak_bytes': peak}
+    
+    def diff(self, top: int = None, group_by: str = 'lineno') -> Dict:
+        """기준 스냅샷 이후 증가한 할당 위치 상위 목록"""
+        import tracemalloc
+        
+        with self._lock:
+            if self._baseline is None or not tracemalloc.is_tracing():
+                raise RuntimeError('기준 스냅샷이 없습니다')
+            current = tracemalloc.take_snapshot()
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+            stats = current.filter_traces(filters).compare_to(self._baseline.filter_traces(filters), group_by)
+            
+            return {
+                'since': round(time.time() - self._baseline_at, 1),
+                'size_diff_total': sum(stat.size_diff for stat in stats),
+                'allocations': [
+                    {
+                        'location': str(stat.traceback[0]) if stat.traceback else '',
+                        'size_diff': stat.size_diff,
+                        'size': stat.size,
+                        'count_diff': stat.count_diff,
+                        'count': stat.count
+                    }
+                    for stat in stats[:top or PROFILING_CONFIG['TOP_N']]
+                ]
+            }
+    
+    def stop(self) -> Dict:
+        """tracemalloc 종료 및 기준 스냅샷 삭제"""
+        with self._lock:
+            self._baseline = None
+            self._baseline_at = None
+            tracemalloc = sys.modules.get('tracemalloc')
+            if tracemalloc is not None and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            return {'tracing': False}
+    
+    def status(self) -> Dict:
+        tracemalloc = sys.modules.get('tracemalloc')
+        tracing = tracemalloc is not None and tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            'tracing': tracing,
+            'has_baseline': self._baseline is not None,
+            'traced_bytes': current,
+            'peak_bytes': peak
+        }
+
+
+# 글로벌 프로파일러 인스턴스
+profiler = OnDemandProfiler()
+memory_tracker = MemoryTracker()
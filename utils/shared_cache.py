@@ -0,0 +1,364 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+from utils.constants import SHARED_CACHE_CONFIG
+
+try:
+    import fcntl
+except ImportError:  # Windows 등 fcntl이 없으면 프로세스 간 공유 캐시 사용 안 함
+    fcntl = None
+
+# 파일 헤더: 매직, 레이아웃 버전, 슬롯 수, 슬롯 크기
+_FILE_HEADER = struct.Struct('<8sIII')
+_MAGIC = b'TAGOSHM1'
+_VERSION = 1
+
+# 슬롯 헤더: seqlock 번호, 키 해시, 저장 시각, 리스 보유 PID, 리스 만료 시각, 페이로드 길이
+_SLOT_HEADER = struct.Struct('<IQdIdI')
+_SEQ = struct.Struct('<I')
+
+_READ_RETRIES = 100
+
+
+def _key_hash(key: str) -> int:
+    # 0은 빈 슬롯 표시이므로 사용하지 않음
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+
+class SharedMemoryCache:
+    """
+    프로세스 간 공유 캐시 (mmap 파일 위의 고정 슬롯 레이아웃)
+    
+    슬롯은 WAYS개씩 묶인 집합(set-associative)으로 나뉘고, 키 해시로 집합을 정한다.
+    쓰기는 집합 단위로 스레드 락 + fcntl 바이트 범위 락을 잡고 seqlock 번호를 홀수로 올린 뒤 기록하며,
+    읽기는 락 없이 매핑된 메모리를 직접 읽고 seqlock 번호가 그대로인지 확인한다(시스템 콜 없음).
+    슬롯마다 리스(PID, 만료 시각)를 두어 한 키를 한 프로세스만 조회하도록 선출한다.
+    """
+    
+    def __init__(self, path: str, slots: int, slot_size: int, ways: int):
+        self.path = path
+        self.ways = ways
+        self.sets = max(slots // ways, 1)
+        self.slots = self.sets * ways
+        self.slot_size = slot_size
+        self.capacity = slot_size - _SLOT_HEADER.size
+        self._size = _FILE_HEADER.size + self.slots * slot_size
+        
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # 파일 전체 락을 잡고 최초 생성 프로세스만 초기화
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                file_size = os.fstat(self._fd).st_size
+                if file_size == 0:
+                    os.ftruncate(self._fd, self._size)
+                    os.pwrite(self._fd, _FILE_HEADER.pack(_MAGIC, _VERSION, self.slots, slot_size), 0)
+                elif file_size != self._size:
+                    raise ValueError(f'공유 캐시 크기 불일치 ({path}): {file_size} != {self._size} (파일을 지우고 다시 시작하세요)')
+                self._mm = mmap.mmap(self._fd, self._size)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            
+            header = _FILE_HEADER.unpack_from(self._mm, 0)
+            if header != (_MAGIC, _VERSION, self.slots, slot_size):
+                self._mm.close()
+                raise ValueError(f'공유 캐시 레이아웃 불일치 ({path}): {header[1:]} (파일을 지우고 다시 시작하세요)')
+        except Exception:
+            os.close(self._fd)
+            raise
+        
+        # fcntl 락은 프로세스 단위이므로 같은 프로세스 안의 스레드끼리는 스레드 락으로 배제
+        self._set_locks = [threading.Lock() for _ in range(min(self.sets, 256))]
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.oversize = 0
+        self.evictions = 0
+        self.leases_won = 0
+        self.leases_lost = 0
+    
+    def _offset(self, slot: int) -> int:
+        return _FILE_HEADER.size + slot * self.slot_size
+    
+    def _ways(self, key_hash: int) -> range:
+        first = (key_hash % self.sets) * self.ways
+        return range(first, first + self.ways)
+    
+    @contextmanager
+    def _locked_set(self, key_hash: int):
+        set_index = key_hash % self.sets
+        start = self._offset(set_index * self.ways)
+        length = self.ways * self.slot_size
+        with self._set_locks[set_index % len(self._set_locks)]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, start)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, start)
+    
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+    
+    def get(self, key: str, max_age: float) -> Optional[Tuple[float, Any]]:
+        """
+        공유 캐시 조회 (락 없음)
+        
+        Args:
+            key (str): 캐시 키
+            max_age (float): 허용 최대 경과 시간 (초)
+        
+        Returns:
+            Optional[Tuple[float, Any]]: (저장 시각, 값), 없거나 오래되었으면 None
+        """
+        key_hash = _key_hash(key)
+        for slot in self._ways(key_hash):
+            offset = self._offset(slot)
+            for _ in range(_READ_RETRIES):
+                seq, slot_hash, stored_at, _, _, length = _SLOT_HEADER.unpack_from(self._mm, offset)
+                if seq & 1:
+                    # 다른 프로세스가 기록 중
+                    time.sleep(0)
+                    continue
+                if slot_hash != key_hash:
+                    break
+                if not length or time.time() - stored_at > max_age:
+                    self._count('misses')
+                    return None
+                start = offset + _SLOT_HEADER.size
+                payload = self._mm[start:start + min(length, self.capacity)]
+                if _SEQ.unpack_from(self._mm, offset)[0] != seq:
+                    continue
+                self._count('hits')
+                return stored_at, json.loads(payload)
+        self._count('misses')
+        return None
+    
+    def _claim_slot(self, key_hash: int, now: float) -> int:
+        """키의 슬롯 선택 (같은 키 > 빈 슬롯 > 리스가 없는 가장 오래된 슬롯), 집합 락 안에서 호출"""
+        empty = None
+        victim = None
+        victim_key = None
+        for slot in self._ways(key_hash):
+            _, slot_hash, stored_at, _, lease_until, _ = _SLOT_HEADER.unpack_from(self._mm, self._offset(slot))
+            if slot_hash == key_hash:
+                return slot
+            if slot_hash == 0:
+                if empty is None:
+                    empty = slot
+                continue
+            rank = (lease_until > now, stored_at)
+            if victim is None or rank < victim_key:
+                victim, victim_key = slot, rank
+        if empty is not None:
+            return empty
+        self._count('evictions')
+        return victim
+    
+    def _write(self, slot: int, key_hash: int, stored_at: float, lease_pid: int, lease_until: float,
+               payload: Optional[bytes]):
+        """seqlock 기록 (payload가 None이면 기존 페이로드 유지)"""
+        offset = self._offset(slot)
+        # 기록 중 종료된 프로세스가 번호를 홀수로 남겼어도 기록 중에는 항상 홀수가 되도록 (seq + 1이 아닌 seq | 1)
+        writing = _SEQ.unpack_from(self._mm, offset)[0] | 1
+        _SEQ.pack_into(self._mm, offset, writing)
+        if payload is None:
+            length = _SLOT_HEADER.unpack_from(self._mm, offset)[5]
+        else:
+            length = len(payload)
+            start = offset + _SLOT_HEADER.size
+            self._mm[start:start + length] = payload
+        _SLOT_HEADER.pack_into(self._mm, offset, writing, key_hash,
+                               stored_at, lease_pid, lease_until, length)
+        _SEQ.pack_into(self._mm, offset, (writing + 1) & 0xFFFFFFFF)
+    
+    def set(self, key: str, value: Any, stored_at: float = None) -> bool:
+        """
+        공유 캐시 저장 (직렬화 결과가 슬롯보다 크면 저장하지 않음)
+        
+        Returns:
+            bool: 저장 여부
+        """
+        payload = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(payload) > self.capacity:
+            self._count('oversize')
+            return False
+        
+        key_hash = _key_hash(key)
+        stored_at = stored_at or time.time()
+        with self._locked_set(key_hash):
+            slot = self._claim_slot(key_hash, stored_at)
+            _, slot_hash, _, lease_pid, lease_until, _ = _SLOT_HEADER.unpack_from(self._mm, self._offset(slot))
+            if slot_hash != key_hash:
+                lease_pid, lease_until = 0, 0.0
+            self._write(slot, key_hash, stored_at, lease_pid, lease_until, payload)
+        self._count('writes')
+        return True
+    
+    def try_acquire(self, key: str, lease_seconds: float) -> bool:
+        """
+        키 조회 리스 획득 시도 (프로세스 간 선출)
+        
+        다른 프로세스가 만료되지 않은 리스를 갖고 있으면 False. 리스를 가진 프로세스가 죽어도
+        lease_seconds 후에는 다른 프로세스가 가져갈 수 있다.
+        """
+        key_hash = _key_hash(key)
+        now = time.time()
+        with self._locked_set(key_hash):
+            slot = self._claim_slot(key_hash, now)
+            _, slot_hash, stored_at, lease_pid, lease_until, _ = _SLOT_HEADER.unpack_from(self._mm, self._offset(slot))
+            # 포크된 워커 프로세스도 구분되도록 PID는 매번 조회
+            pid = os.getpid()
+            if slot_hash == key_hash and lease_pid not in (0, pid) and lease_until > now:
+                self._count('leases_lost')
+                return False
+            if slot_hash == key_hash:
+                self._write(slot, key_hash, stored_at, pid, now + lease_seconds, None)
+            else:
+                self._write(slot, key_hash, 0.0, pid, now + lease_seconds, b'')
+        self._count('leases_won')
+        return True
+    
+    def release(self, key: str):
+        """이 프로세스가 가진 리스 반납"""
+        key_hash = _key_hash(key)
+        with self._locked_set(key_hash):
+            for slot in self._ways(key_hash):
+                _, slot_hash, stored_at, lease_pid, _, _ = _SLOT_HEADER.unpack_from(self._mm, self._offset(slot))
+                if slot_hash == key_hash:
+                    if lease_pid == os.getpid():
+                        self._write(slot, key_hash, stored_at, 0, 0.0, None)
+                    return
+    
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+    
+    def get_stats(self) -> Dict:
+        """이 프로세스 기준 공유 캐시 통계"""
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': True,
+                'path': self.path,
+                'slots': self.slots,
+                'slot_size': self.slot_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'writes': self.writes,
+                'oversize': self.oversize,
+                'evictions': self.evictions,
+                'leases_won': self.leases_won,
+                'leases_lost': self.leases_lost
+            }
+
+
+_shared_cache: Optional[SharedMemoryCache] = None
+_shared_cache_lock = threading.Lock()
+_shared_cache_failed = False
+
+
+def _default_path() -> str:
+    # 가능하면 메모리 파일 시스템(/dev/shm) 사용
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'tago_shared_cache')
+
+
+def get_shared_cache() -> Optional[SharedMemoryCache]:
+    """
+    프로세스 간 공유 캐시 조회 (최초 사용 시 매핑)
+    
+    SHARED_CACHE_CONFIG['ENABLED']가 True이거나 TAGO_SHARED_CACHE_PATH 환경 변수가 있을 때만 사용한다.
+    매핑에 실패하면 경고 후 프로세스 로컬 캐시만 사용한다.
+    """
+    global _shared_cache, _shared_cache_failed
+    if _shared_cache is not None or _shared_cache_failed:
+        return _shared_cache
+    
+    path = os.getenv('TAGO_SHARED_CACHE_PATH') or SHARED_CACHE_CONFIG['PATH']
+    if not (SHARED_CACHE_CONFIG['ENABLED'] or os.getenv('TAGO_SHARED_CACHE_PATH')):
+        _shared_cache_failed = True
+        return None
+    
+    with _shared_cache_lock:
+        if _shared_cache is None and not _shared_cache_failed:
+            try:
+                if fcntl is None:
+                    raise RuntimeError('fcntl을 사용할 수 없는 플랫폼')
+                _shared_cache = SharedMemoryCache(
+                    path or _default_path(),
+                    slots=SHARED_CACHE_CONFIG['SLOTS'],
+                    slot_size=SHARED_CACHE_CONFIG['SLOT_SIZE'],
+                    ways=SHARED_CACHE_CONFIG['WAYS']
+                )
+                print(f"프로세스 간 공유 캐시 사용: {_shared_cache.path}")
+            except Exception as e:
+                print(f"공유 캐시 사용 불가, 프로세스 로컬 캐시만 사용: {e}")
+                _shared_cache_failed = True
+    return _shared_cache
+
+
+def close_shared_cache():
+    """공유 캐시 매핑 해제 (프로세스 종료 시, 파일과 다른 프로세스의 데이터는 유지)"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is not None:
+            _shared_cache.close()
+            _shared_cache = None
+
+
+def fetch_shared(key: str, max_age: float, fetch: Callable[[], Any]) -> Tuple[Any, float, bool]:
+    """
+    공유 캐시를 거친 조회 (키별로 한 프로세스만 TAGO 조회)
+    
+    공유 캐시에 max_age 이내 값이 있으면 그대로 쓰고, 없으면 리스를 얻은 프로세스만 fetch를 호출한다.
+    리스를 얻지 못한 프로세스는 리스 보유 프로세스의 결과가 저장되기를 기다리며, LEASE_SECONDS 안에
+    결과가 없으면 직접 조회한다. 공유 캐시를 사용하지 않으면 fetch를 바로 호출한다.
+    
+    Args:
+        key (str): 공유 캐시 키
+        max_age (float): 공유 캐시 값 허용 최대 경과 시간 (초)
+        fetch (Callable): 실제 조회 함수 (결과는 JSON 직렬화 가능해야 함)
+    
+    Returns:
+        Tuple[Any, float, bool]: (값, 조회 시각, 이 프로세스가 조회했는지)
+    """
+    cache = get_shared_cache()
+    if cache is None:
+        value = fetch()
+        return value, time.time(), True
+    
+    deadline = time.time() + SHARED_CACHE_CONFIG['LEASE_SECONDS']
+    while True:
+        entry = cache.get(key, max_age)
+        if entry is not None:
+            return entry[1], entry[0], False
+        
+        if cache.try_acquire(key, SHARED_CACHE_CONFIG['LEASE_SECONDS']):
+            try:
+                value = fetch()
+                fetched_at = time.time()
+                cache.set(key, value, stored_at=fetched_at)
+                return value, fetched_at, True
+            finally:
+                cache.release(key)
+        
+        if time.time() >= deadline:
+            # 리스 보유 프로세스가 응답하지 않으면 직접 조회
+            value = fetch()
+            return value, time.time(), True
+        time.sleep(SHARED_CACHE_CONFIG['WAIT_POLL'])
+
+
+def get_shared_cache_stats() -> Dict:
+    cache = get_shared_cache()
+    return cache.get_stats() if cache is not None else {'enabled': False}
@@ -0,0 +1,355 @@
+import functools
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+from utils.constants import TRACING_CONFIG
+
+# OTLP span status code
+_STATUS_ERROR = 2
+
+
+class Span:
+    """트레이스의 구간 하나 (OTLP span과 같은 필드)"""
+    
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'start_ns', 'end_ns', 'attributes', 'error', '_token')
+    
+    def __init__(self, trace: '_Trace', name: str, parent_id: Optional[str], attributes: Dict):
+        self.trace = trace
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self._token = None
+    
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+    
+    def __enter__(self) -> 'Span':
+        self._token = _current_span.set(self)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.error = f'{exc_type.__name__}: {exc}'
+        _current_span.reset(self._token)
+        self.trace.finish(self)
+        return False
+    
+    def to_dict(self) -> Dict:
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start_ns / 1e9,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': dict(self.attributes),
+            'error': self.error
+        }
+    
+    def to_otlp(self) -> Dict:
+        span = {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_otlp_attribute(key, value) for key, value in self.attributes.items()]
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        if self.error:
+            span['status'] = {'code': _STATUS_ERROR, 'message': self.error}
+        return span
+
+
+class _NoopSpan:
+    """샘플링되지 않은 구간 (속성 기록·컨텍스트 전환 없음)"""
+    
+    __slots__ = ()
+    
+    def set_attribute(self, key: str, value: Any):
+        pass
+    
+    def __enter__(self) -> '_NoopSpan':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('tago_current_span', default=None)
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict:
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+class _Trace:
+    """루트 구간 하나에 속한 구간 모음 (루트가 끝나면 내보냄)"""
+    
+    __slots__ = ('tracer', 'trace_id', 'spans', 'dropped', 'closed', '_lock')
+    
+    def __init__(self, tracer: 'Tracer'):
+        self.tracer = tracer
+        self.trace_id = '%032x' % random.getrandbits(128)
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.closed = False
+        self._lock = threading.Lock()
+    
+    def finish(self, span: Span):
+        with self._lock:
+            if len(self.spans) < TRACING_CONFIG['MAX_SPANS_PER_TRACE']:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+        if span.parent_id is None:
+            self.closed = True
+            self.tracer.export(self)
+    
+    def to_dict(self) -> Dict:
+        root = next((span for span in self.spans if span.parent_id is None), self.spans[-1])
+        return {
+            'trace_id': self.trace_id,
+            'name': root.name,
+            'start': root.start_ns / 1e9,
+            'duration_ms': round((root.end_ns - root.start_ns) / 1e6, 3),
+            'attributes': dict(root.attributes),
+            'error': any(span.error for span in self.spans),
+            'dropped_spans': self.dropped,
+            'spans': [span.to_dict() for span in sorted(self.spans, key=lambda span: span.start_ns)]
+        }
+
+
+class InMemoryExporter:
+    """최근 트레이스를 메모리에 보관 (관리자 API 조회용)"""
+    
+    def __init__(self, max_traces: int = None):
+        self._traces = deque(maxlen=max_traces or TRACING_CONFIG['MEMORY_TRACES'])
+    
+    def export(self, trace: _Trace):
+        self._traces.append(trace)
+    
+    def recent(self, limit: int = 50, min_duration_ms: float = 0, name: str = None) -> List[Dict]:
+        """최근 트레이스 (최신순, 최소 소요 시간·루트 이름으로 필터)"""
+        result = []
+        for trace in reversed(list(self._traces)):
+            summary = trace.to_dict()
+            if summary['duration_ms'] < min_duration_ms or (name and summary['name'] != name):
+                continue
+            result.append(summary)
+            if len(result) >= limit:
+                break
+        return result
+    
+    def __len__(self) -> int:
+        return len(self._traces)
+
+
+class OTLPFileExporter:
+    """
+    트레이스를 OTLP/JSON(ExportTraceServiceRequest) 한 줄씩 파일에 기록
+    
+    OpenTelemetry Collector의 otlpjsonfile 리시버로 읽을 수 있다. 파일 쓰기는 백그라운드 스레드가 하므로
+    요청 경로에서는 큐에 넣기만 하고, 큐가 가득 차면 버린다.
+    """
+    
+    def __init__(self, path: str, service_name: str = None):
+        self.path = path
+        self.service_name = service_name or TRACING_CONFIG['SERVICE_NAME']
+        self._queue = queue.Queue(maxsize=TRACING_CONFIG['EXPORT_QUEUE_SIZE'])
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+    
+    def export(self, trace: _Trace):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='trace-export', daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+    
+    def _request(self, trace: _Trace) -> Dict:
+        return {'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute('service.name', self.service_name)]},
+            'scopeSpans': [{
+                'scope': {'name': 'tago-bus'},
+                'spans': [span.to_otlp() for span in trace.spans]
+            }]
+        }]}
+    
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                with open(self.path, 'a', encoding='utf-8') as file:
+                    file.write(json.dumps(self._request(trace), ensure_ascii=False) + '\n')
+                    # 쌓인 트레이스는 파일을 다시 열지 않고 함께 기록
+                    while not self._queue.empty():
+                        file.write(json.dumps(self._request(self._queue.get_nowait()), ensure_ascii=False) + '\n')
+                        self.written += 1
+                self.written += 1
+            except Exception as e:
+                self.dropped += 1
+                print(f'트레이스 기록 실패 ({self.path}): {e}')
+
+
+class _TimedLock:
+    """락 획득 대기 시간을 구간으로 기록하는 컨텍스트 매니저"""
+    
+    __slots__ = ('lock', 'name')
+    
+    def __init__(self, lock, name: str):
+        self.lock = lock
+        self.name = name
+    
+    def __enter__(self):
+        with tracer.span(self.name):
+            self.lock.acquire()
+        return self.lock
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.lock.release()
+        return False
+
+
+class Tracer:
+    """
+    요청·워커 틱 단위 경량 구간 추적
+    
+    루트 구간(Socket.IO 이벤트, 워커 틱, 플로우 2 요청)에서 SAMPLE_RATE 확률로 트레이스를 시작하고,
+    그 안에서 열리는 하위 구간(TAGO 요청, 락 대기, 포맷팅, emit)만 기록한다. 샘플링되지 않은 경로의 비용은
+    ContextVar 조회 한 번과 공용 no-op 객체 반환뿐이다. 루트가 끝나면 메모리·파일 내보내기로 넘긴다.
+    다른 스레드로 넘어간 작업(헤지 요청 등)은 그 스레드를 시작한 호출 지점의 구간으로 측정된다.
+    """
+    
+    def __init__(self, sample_rate: float = None):
+        self.sample_rate = TRACING_CONFIG['SAMPLE_RATE'] if sample_rate is None else sample_rate
+        self.memory = InMemoryExporter()
+        path = os.getenv('TAGO_TRACE_FILE') or TRACING_CONFIG['EXPORT_PATH']
+        self.file_exporter = OTLPFileExporter(path) if path else None
+        self._lock = threading.Lock()
+        self.started = 0
+        self.exported = 0
+    
+    def root(self, name: str, **attributes) -> Any:
+        """
+        루트 구간 시작 (이미 트레이스 안이면 하위 구간)
+        
+        Args:
+            name (str): 구간 이름
+            **attributes: session_id, station_id 등 구간 속성
+        
+        Returns:
+            Span 또는 NOOP_SPAN (with 문으로 사용)
+        """
+        parent = _current_span.get()
+        if parent is not None and not parent.trace.closed:
+            return Span(parent.trace, name, parent.span_id, attributes)
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return NOOP_SPAN
+        with self._lock:
+            self.started += 1
+        return Span(_Trace(self), name, None, attributes)
+    
+    def span(self, name: str, **attributes) -> Any:
+        """하위 구간 시작 (샘플링된 트레이스 안에서만 기록)"""
+        parent = _current_span.get()
+        # 끝난 트레이스의 컨텍스트를 물려받은 스레드(워커 등)는 기록하지 않음
+        if parent is None or parent.trace.closed:
+            return NOOP_SPAN
+        return Span(parent.trace, name, parent.span_id, attributes)
+    
+    def traced(self, name: str, root: bool = False, attributes: Callable[..., Dict] = None) -> Callable:
+        """
+        함수 호출을 구간으로 감싸는 데코레이터
+        
+        Args:
+            name (str): 구간 이름
+            root (bool): True면 루트 구간(샘플링 시작점), False면 트레이스 안에서만 기록
+            attributes (Callable): 함수 인자를 받아 구간 속성을 돌려주는 함수 (샘플링된 경우에만 호출)
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                span = self.root(name) if root else self.span(name)
+                if span is NOOP_SPAN:
+                    return func(*args, **kwargs)
+                if attributes is not None:
+                    try:
+                        span.attributes.update(attributes(*args, **kwargs))
+                    except Exception:
+                        pass
+                with span:
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def current(self) -> Any:
+        """현재 구간 (없으면 NOOP_SPAN, 속성 추가용)"""
+        return _current_span.get() or NOOP_SPAN
+    
+    def lock(self, lock, name: str):
+        """샘플링 중이면 락 대기 시간을 구간으로 기록하는 컨텍스트 매니저, 아니면 락 그대로"""
+        parent = _current_span.get()
+        if parent is None or parent.trace.closed:
+            return lock
+        return _TimedLock(lock, name)
+    
+    def export(self, trace: _Trace):
+        with self._lock:
+            self.exported += 1
+        self.memory.export(trace)
+        if self.file_exporter:
+            self.file_exporter.export(trace)
+    
+    def set_sample_rate(self, sample_rate: float):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError('sample_rate는 0~1 사이여야 합니다')
+        self.sample_rate = sample_rate
+    
+    def get_stats(self) -> Dict:
+        """추적 통계"""
+        stats = {
+            'sample_rate': self.sample_rate,
+            'traces_started': self.started,
+            'traces_exported': self.exported,
+            'traces_in_memory': len(self.memory)
+        }
+        if self.file_exporter:
+            stats['file'] = {
+                'path': self.file_exporter.path,
+                'written': self.file_exporter.written,
+                'dropped': self.file_exporter.dropped
+            }
+        return stats
+
+
+# 글로벌 트레이서 인스턴스
+tracer = Tracer()
@@ -0,0 +1,216 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from utils.constants import ALERT_CONFIG
+
+
+def _parse_thresholds(value) -> List[int]:
+    """양의 정수 임계값 목록 (큰 값부터, 중복 제거, 최대 개수 제한)"""
+    if not isinstance(value, (list, tuple)):
+        value = [value] if value is not None else []
+    thresholds = {int(item) for item in value
+                  if isinstance(item, (int, float)) and not isinstance(item, bool) and item > 0}
+    return sorted(thresholds, reverse=True)[:ALERT_CONFIG['MAX_THRESHOLDS']]
+
+
+def parse_alert_options(options, interval: int) -> Optional[dict]:
+    """
+    start_bus_monitoring의 alerts 옵션 검증
+    
+    Args:
+        options: {"remaining_stations": [3, 1], "arrival_time": [180], "arriving_time": 60,
+                  "update_interval": 300} (true면 기본값 사용)
+        interval (int): 세션 폴링 간격 (초)
+    
+    Returns:
+        Optional[dict]: 검증된 알림 설정 (옵션이 없으면 None)
+    """
+    if not options:
+        return None
+    options = options if isinstance(options, dict) else {}
+    
+    if 'remaining_stations' in options or 'arrival_time' in options:
+        stations = _parse_thresholds(options.get('remaining_stations'))
+        times = _parse_thresholds(options.get('arrival_time'))
+    else:
+        stations = list(ALERT_CONFIG['DEFAULT_STATION_THRESHOLDS'])
+        times = []
+    
+    arriving_time = options.get('arriving_time', ALERT_CONFIG['DEFAULT_ARRIVING_TIME'])
+    if not isinstance(arriving_time, int) or arriving_time <= 0:
+        arriving_time = ALERT_CONFIG['DEFAULT_ARRIVING_TIME']
+    
+    # 주기 업데이트는 저빈도 하트비트 (0이면 전송하지 않음, 폴링 간격보다 짧을 수 없음)
+    update_interval = options.get('update_interval', ALERT_CONFIG['DEFAULT_UPDATE_INTERVAL'])
+    if not isinstance(update_interval, int) or update_interval < 0:
+        update_interval = ALERT_CONFIG['DEFAULT_UPDATE_INTERVAL']
+    if update_interval:
+        update_interval = max(update_interval, interval)
+    
+    return {
+        'remaining_stations': stations,
+        'arrival_time': times,
+        'arriving_time': arriving_time,
+        'update_interval': update_interval
+    }
+
+
+class _Threshold:
+    """임계값 하나의 발화 상태 (값이 임계값 이하로 내려가면 발화, 히스테리시스 이상 올라가면 재무장)"""
+    
+    __slots__ = ('metric', 'value', 'rearm_above', 'armed')
+    
+    def __init__(self, metric: str, value: int, hysteresis: float):
+        self.metric = metric
+        self.value = value
+        self.rearm_above = value + hysteresis
+        self.armed = True
+
+
+class _AlertCounters:
+    """전체 세션의 알림 전송 통계"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.evaluations = 0
+        self.events: Dict[str, int] = {}
+        self.full_updates = 0
+        self.suppressed_updates = 0
+    
+    def record(self, events: List[str], full_update: bool):
+        with self._lock:
+            self.evaluations += 1
+            for event in events:
+                self.events[event] = self.events.get(event, 0) + 1
+            if full_update:
+                self.full_updates += 1
+            else:
+                self.suppressed_updates += 1
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            sent = sum(self.events.values()) + self.full_updates
+            return {
+                'evaluations': self.evaluations,
+                'events': dict(self.events),
+                'full_updates': self.full_updates,
+                'suppressed_updates': self.suppressed_updates,
+                # 알림 구독 세션이 보낸 이벤트 수 / 매 틱 전송했을 때의 이벤트 수
+                'emit_ratio': round(sent / self.evaluations, 3) if self.evaluations else 0.0
+            }
+
+
+class ThresholdAlerts:
+    """
+    세션별 도착 임계값 알림
+    
+    관측(폴링 또는 추정 업데이트)마다 구독 버스 번호별로 남은 정류장 수·도착 시간을 임계값과 비교해
+    임계값을 새로 넘은 순간에만 bus_approaching, 도착 직전에는 bus_arriving 이벤트를 만든다.
+    한 번 발화한 임계값은 값이 히스테리시스 이상 다시 커질 때(다음 버스로 바뀌는 등)까지 재발화하지 않는다.
+    전체 bus_update는 첫 업데이트와 update_interval마다 보내는 저빈도 하트비트로만 전송한다.
+    """
+    
+    def __init__(self, options: dict):
+        self.options = options
+        self._states: Dict[str, List[_Threshold]] = {}
+        self.last_full_update = 0.0
+        self.last_status: Optional[Tuple] = None  # 마지막 전체 업데이트의 (버스 발견, 운행 없음) 상태
+    
+    def _new_state(self) -> List[_Threshold]:
+        thresholds = [_Threshold('remaining_stations', value, ALERT_CONFIG['STATION_HYSTERESIS'])
+                      for value in self.options['remaining_stations']]
+        thresholds += [_Threshold('arrival_time', value,
+                                  max(ALERT_CONFIG['TIME_HYSTERESIS'], value * ALERT_CONFIG['TIME_HYSTERESIS_RATIO']))
+                       for value in self.options['arrival_time']]
+        arriving_time = self.options['arriving_time']
+        thresholds.append(_Threshold('arriving', arriving_time,
+                                     max(ALERT_CONFIG['TIME_HYSTERESIS'], arriving_time * ALERT_CONFIG['TIME_HYSTERESIS_RATIO'])))
+        return thresholds
+    
+    def _observations(self, update: dict) -> Iterator[Tuple[str, int, int]]:
+        """업데이트에서 (버스 번호, 남은 정류장 수, 도착 시간) 추출"""
+        if update.get('buses'):
+            for bus in update['buses']:
+                yield bus['bus_number'], bus['remaining_stations'], bus['arrival_time']
+        elif update.get('bus_found'):
+            yield update['bus_number'], update['remaining_stations'], update['arrival_time']
+    
+    def evaluate(self, update: dict, now: float = None) -> List[Tuple[str, dict]]:
+        """
+        관측 결과로 임계값 평가
+        
+        Args:
+            update (dict): bus_update 데이터 (폴링 또는 추정)
+            now (float): 평가 시각
+        
+        Returns:
+            List[Tuple[str, dict]]: 전송할 (이벤트명, 페이로드) 목록. 전체 업데이트를 보낼 차례면
+                ('bus_update', update)가 포함된다
+        """
+        now = now or time.time()
+        events = []
+        estimated = bool(update.get('estimated'))
+        # 추정 업데이트의 buses 항목은 직전 폴링 값이므로 최상위(가장 빠른 버스)만 평가
+        observations = ([(update['bus_number'], update['remaining_stations'], update['arrival_time'])]
+                        if estimated else self._observations(update))
+        
+        for bus_number, remaining_stations, arrival_time in observations:
+            thresholds = self._states.get(bus_number)
+            if thresholds is None:
+                thresholds = self._states[bus_number] = self._new_state()
+            
+            crossed = {}
+            for threshold in thresholds:
+                current = remaining_stations if threshold.metric == 'remaining_stations' else arrival_time
+                if current is None or current < 0:
+                    continue
+                if threshold.armed and current <= threshold.value:
+                    threshold.armed = False
+                    # 한 관측에서 여러 임계값을 넘으면 지표별로 가장 좁은 임계값만 알림
+                    if threshold.metric not in crossed or threshold.value < crossed[threshold.metric].value:
+                        crossed[threshold.metric] = threshold
+                elif not threshold.armed and current > threshold.rearm_above:
+                    threshold.armed = True
+            
+            payload = {
+                'timestamp': datetime.now().isoformat(),
+                'bus_number': bus_number,
+                'station_id': update.get('station_id'),
+                'remaining_stations': remaining_stations,
+                'arrival_time': arrival_time,
+                'estimated': estimated
+            }
+            if 'arriving' in crossed:
+                events.append(('bus_arriving', payload))
+                continue
+            for metric, threshold in crossed.items():
+                events.append(('bus_approaching', {**payload, 'metric': metric, 'threshold': threshold.value}))
+        
+        full_update = not estimated and self._full_update_due(update, now)
+        if full_update:
+            self.last_full_update = now
+            self.last_status = (bool(update.get('bus_found')), bool(update.get('no_service')))
+            events.append(('bus_update', update))
+        
+        alert_counters.record([event for event, _ in events if event != 'bus_update'], full_update)
+        return events
+    
+    def _full_update_due(self, update: dict, now: float) -> bool:
+        """첫 업데이트, 오류, 버스 발견·운행 상태 변화, 하트비트 주기일 때 전체 업데이트 전송"""
+        if not self.last_full_update or 'error' in update:
+            return True
+        if (bool(update.get('bus_found')), bool(update.get('no_service'))) != self.last_status:
+            return True
+        interval = self.options['update_interval']
+        return bool(interval) and now - self.last_full_update >= interval
+    
+    def forget(self, bus_numbers: Tuple[str, ...]):
+        """구독에서 빠진 버스 번호의 발화 상태 삭제"""
+        for bus_number in list(self._states):
+            if bus_number not in bus_numbers:
+                del self._states[bus_number]
+
+
+# 글로벌 알림 통계 인스턴스
+alert_counters = _AlertCounters()
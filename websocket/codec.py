@@ -0,0 +1,146 @@
+import importlib.util
+import itertools
+import json
+import threading
+import zlib
+from typing import Any, Dict, Optional, Tuple
+from utils.constants import CODEC_CONFIG
+from utils.tracing import tracer
+
+# msgpack은 처음 협상한 클라이언트가 있을 때 로드 (미설치 시 JSON만 지원)
+_msgpack = None
+MSGPACK_AVAILABLE = importlib.util.find_spec('msgpack') is not None
+
+
+def _get_msgpack():
+    global _msgpack
+    if _msgpack is None:
+        import msgpack
+        _msgpack = msgpack
+    return _msgpack
+
+ENCODING_JSON = 'json'
+ENCODING_MSGPACK = 'msgpack'
+COMPRESSION_ZLIB = 'zlib'
+
+# 바이너리 프레임 첫 바이트 플래그
+FLAG_MSGPACK = 0x01   # 본문이 MessagePack (없으면 UTF-8 JSON)
+FLAG_ZLIB = 0x02      # 본문이 zlib 압축됨
+
+
+class PayloadCodec:
+    """
+    세션별 Socket.IO 페이로드 인코딩
+    
+    클라이언트가 연결 시 encoding(json/msgpack)과 compression(zlib)을 요청하면
+    해당 세션으로 가는 데이터 이벤트를 1바이트 플래그 + 본문 형태의 바이너리
+    프레임으로 보낸다. 협상하지 않은 세션은 기존과 같이 JSON 객체로 전송된다.
+    """
+    
+    def __init__(self):
+        self._preferences: Dict[str, Tuple[str, bool]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._text_emits = itertools.count()
+    
+    def negotiate(self, session_id: str, encoding: str = None, compression: str = None) -> Dict:
+        """
+        세션 인코딩 협상
+        
+        Args:
+            session_id (str): 세션 ID
+            encoding (str): 요청 인코딩 ('json' 또는 'msgpack')
+            compression (str): 요청 압축 방식 ('zlib' 또는 None)
+        
+        Returns:
+            Dict: 서버가 수락한 인코딩과 압축 방식
+        """
+        accepted_encoding = ENCODING_MSGPACK if encoding == ENCODING_MSGPACK and MSGPACK_AVAILABLE else ENCODING_JSON
+        compress = compression == COMPRESSION_ZLIB
+        
+        if accepted_encoding == ENCODING_JSON and not compress:
+            self._preferences.pop(session_id, None)
+        else:
+            self._preferences[session_id] = (accepted_encoding, compress)
+        
+        return {
+            'encoding': accepted_encoding,
+            'compression': COMPRESSION_ZLIB if compress else None,
+            'compression_threshold': CODEC_CONFIG['COMPRESSION_THRESHOLD'] if compress else None
+        }
+    
+    def forget(self, session_id: str):
+        """세션 협상 정보 삭제"""
+        self._preferences.pop(session_id, None)
+    
+    def encode(self, session_id: str, data: Dict) -> Tuple[Any, str, Optional[int]]:
+        """
+        세션 설정에 맞게 페이로드 인코딩
+        
+        Returns:
+            Tuple[Any, str, Optional[int]]: (전송할 페이로드, 통계 라벨, 바이트 수)
+                협상하지 않은 JSON 이벤트는 Socket.IO가 직렬화하므로 표본으로 고른 이벤트만
+                같은 방식(ASCII 이스케이프, 공백 없는 구분자)으로 크기를 재고 나머지는 None
+        """
+        preference = self._preferences.get(session_id)
+        if preference is None:
+            # 압축하지 않는 JSON은 기존 클라이언트와 같은 텍스트 이벤트로 전송
+            return data, ENCODING_JSON, self._sample_text_size(data)
+        
+        encoding, compress = preference
+        if encoding == ENCODING_MSGPACK:
+            body = _get_msgpack().packb(data, use_bin_type=True)
+            flags = FLAG_MSGPACK
+        else:
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            flags = 0
+        
+        if compress and len(body) >= CODEC_CONFIG['COMPRESSION_THRESHOLD']:
+            compressed = zlib.compress(body, CODEC_CONFIG['COMPRESSION_LEVEL'])
+            if len(compressed) < len(body):
+                return bytes([flags | FLAG_ZLIB]) + compressed, f'{encoding}+zlib', len(compressed) + 1
+        
+        if flags == 0:
+            return data, encoding, self._sample_text_size(data)
+        return bytes([flags]) + body, encoding, len(body) + 1
+    
+    def _sample_text_size(self, data: Dict) -> Optional[int]:
+        """텍스트 이벤트 크기 (Flask-SocketIO 직렬화와 같은 설정, 표본이 아닌 emit은 None)"""
+        if next(self._text_emits) % CODEC_CONFIG['TEXT_SIZE_SAMPLE_EVERY']:
+            return None
+        return len(json.dumps(data, separators=(',', ':')))
+    
+    def emit(self, socketio, event: str, data: Dict, session_id: str):
+        """세션 인코딩에 맞춰 이벤트 전송 및 바이트 통계 기록"""
+        with tracer.span('codec.encode', event=event) as span:
+            payload, label, size = self.encode(session_id, data)
+            span.set_attribute('encoding', label)
+            if size is not None:
+                span.set_attribute('bytes', size)
+        with tracer.span('socketio.emit', event=event, session_id=session_id):
+            socketio.emit(event, payload, room=session_id)
+        
+        with self._lock:
+            stats = self._stats.setdefault(label, {'emits': 0, 'measured_emits': 0, 'bytes': 0})
+            stats['emits'] += 1
+            if size is not None:
+                stats['measured_emits'] += 1
+                stats['bytes'] += size
+    
+    def get_stats(self) -> Dict:
+        """인코딩별 전송 통계 (emit당 평균 바이트는 크기를 잰 emit 기준)"""
+        with self._lock:
+            by_encoding = {
+                label: {**stats, 'bytes_per_emit': round(stats['bytes'] / stats['measured_emits'], 1)
+                        if stats['measured_emits'] else None}
+                for label, stats in self._stats.items()
+            }
+        return {
+            'msgpack_available': MSGPACK_AVAILABLE,
+            'negotiated_sessions': len(self._preferences),
+            'by_encoding': by_encoding
+        }
+
+
+# 글로벌 페이로드 코덱 인스턴스
+payload_codec = PayloadCodec()
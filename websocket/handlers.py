@@ -1,24 +1,73 @@
+import random
+from datetime import datetime
 from flask import request
 from flask_socketio import emit
+from apis.hedging import request_hedger
+from apis.tago_api import get_default_client, request_flight
+from apis.transport import get_shared_transport
+from services.arrival_estimator import arrival_estimator
+from services.arrival_timeseries import arrival_timeseries
+from services.polling_policy import polling_policy
+from services.route_info import route_info_store
+from services.route_tracker import route_tracker
+from utils.constants import ESTIMATOR_CONFIG, MULTI_BUS_CONFIG, MULTI_STOP_CONFIG, SESSION_CONFIG
+from utils.profiling import profiler
+from utils.shared_cache import get_shared_cache_stats
+from utils.tracing import tracer
+from .alerts import alert_counters, parse_alert_options
+from .codec import payload_codec
 from .manager import session_manager
+from .prefetcher import arrival_prefetcher
+from .streams import arrival_stream_hub
+
+def _parse_bus_numbers(data: dict) -> list:
+    """bus_numbers(목록) 또는 bus_number(단일)에서 버스 번호 목록 추출 (공백 제거, 중복 제거)"""
+    value = data.get('bus_numbers') or data.get('bus_number')
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    numbers = [str(number).strip() for number in value if number is not None]
+    return list(dict.fromkeys(number for number in numbers if number))
 
 def init_websocket_handlers(socketio):
     """WebSocket 이벤트 핸들러 등록"""
     
     @socketio.on('connect')
-    def handle_connect():
+    def handle_connect(auth=None):
+        """
+        클라이언트 연결 (선택: 페이로드 인코딩 협상)
+        
+        auth 또는 쿼리 문자열로 encoding('json'/'msgpack'), compression('zlib') 지정 가능
+        """
         print(f'클라이언트 연결됨: {request.sid}')
+        auth = auth if isinstance(auth, dict) else {}
+        codec = payload_codec.negotiate(
+            request.sid,
+            encoding=auth.get('encoding') or request.args.get('encoding'),
+            compression=auth.get('compression') or request.args.get('compression')
+        )
         emit('connected', {
             'message': '서버에 연결되었습니다',
-            'session_id': request.sid
+            'session_id': request.sid,
+            'codec': codec
         })
 
     @socketio.on('disconnect')
     def handle_disconnect():
         print(f'클라이언트 연결 해제됨: {request.sid}')
         session_manager.stop_session(request.sid)
+        payload_codec.forget(request.sid)
+
+    @socketio.on('heartbeat')
+    def handle_heartbeat():
+        """클라이언트 하트비트 (유휴 세션 만료 방지)"""
+        emit('heartbeat_ack', {
+            'session_active': session_manager.touch(request.sid),
+            'timestamp': str(datetime.now())
+        })
 
     @socketio.on('start_bus_monitoring')
+    @tracer.traced('socket.start_monitoring', root=True, attributes=lambda data: {
+        'session_id': request.sid, 'bus_numbers': ','.join(_parse_bus_numbers(data))})
     def handle_start_monitoring(data):
         """
         버스 실시간 모니터링 시작
@@ -27,33 +76,88 @@ def init_websocket_handlers(socketio):
             "lat": 37.497928,
             "lng": 127.027583,
             "bus_number": "9201",
-            "interval": 30
+            "bus_numbers": ["146", "341", "360"],  # 선택: 여러 버스 동시 구독 (bus_number 대신)
+            "interval": 30,
+            "estimate_interval": 5,   # 선택: 폴링 사이 추정 업데이트 간격(초)
+            "multi_stop": true,       # 선택: 가까운 정류소 여러 곳 동시 모니터링
+            "k": 3,                   # 선택: 다중 정류소 수
+            "radius": 150,            # 선택: 다중 정류소 검색 반경(미터)
+            "alerts": {               # 선택: 임계값을 넘을 때만 bus_approaching/bus_arriving 전송
+                "remaining_stations": [3, 1],
+                "arrival_time": [180],
+                "arriving_time": 60,
+                "update_interval": 300    # 전체 bus_update 하트비트 간격(초), 0이면 전송 안 함
+            },
+            "resume_session_id": "..."    # 선택: 서버 재시작 전 세션 ID (없으면 버스 번호·위치로 찾음)
         }
         """
         try:
             session_id = request.sid
             lat = data.get('lat')
             lng = data.get('lng')
-            bus_number = data.get('bus_number')
+            bus_numbers = _parse_bus_numbers(data)
             interval = data.get('interval', 30)
+            estimate_interval = data.get('estimate_interval', 0)
             
             # 입력값 검증
-            if not all([lat, lng, bus_number]):
+            if not all([lat, lng, bus_numbers]):
                 emit('error', {'message': '위도, 경도, 버스번호가 모두 필요합니다'})
                 return
             
+            if len(bus_numbers) > MULTI_BUS_CONFIG['MAX_BUS_NUMBERS']:
+                emit('error', {'message': f"버스 번호는 최대 {MULTI_BUS_CONFIG['MAX_BUS_NUMBERS']}개까지 구독할 수 있습니다"})
+                return
+            bus_number = bus_numbers[0]
+            
             if not isinstance(interval, int) or interval < 10:
                 interval = 30  # 최소 10초, 기본 30초
             
+            # 추정 업데이트는 폴링 간격보다 짧을 때만 의미가 있음
+            if (not isinstance(estimate_interval, int) or
+                    estimate_interval < ESTIMATOR_CONFIG['MIN_EMIT_INTERVAL'] or
+                    estimate_interval >= interval):
+                estimate_interval = 0
+            
+            # 다중 정류소 모드 옵션 (범위를 벗어나면 기본값)
+            multi_stop = None
+            if data.get('multi_stop'):
+                k = data.get('k', MULTI_STOP_CONFIG['DEFAULT_K'])
+                radius = data.get('radius', MULTI_STOP_CONFIG['DEFAULT_RADIUS'])
+                if not isinstance(k, int) or not 1 <= k <= MULTI_STOP_CONFIG['MAX_K']:
+                    k = MULTI_STOP_CONFIG['DEFAULT_K']
+                if not isinstance(radius, (int, float)) or not 0 < radius <= MULTI_STOP_CONFIG['MAX_RADIUS']:
+                    radius = MULTI_STOP_CONFIG['DEFAULT_RADIUS']
+                multi_stop = {'k': k, 'radius': radius}
+            
+            # 도착 임계값 알림 옵션 (지정하면 매 틱 전체 업데이트 대신 알림 위주로 전송)
+            alerts = parse_alert_options(data.get('alerts'), interval)
+            
+            # 서버 재시작 전 세션이면 저장된 정류소로 바로 이어서 모니터링 (첫 조회는 분산)
+            resume_session_id = data.get('resume_session_id')
+            restored = session_manager.claim_restored(
+                session_id, lat, lng, bus_numbers,
+                resume_session_id if isinstance(resume_session_id, str) else None
+            )
+            station_info = restored.station_info if restored else None
+            initial_delay = random.uniform(0, min(SESSION_CONFIG['RESUME_JITTER'], interval)) if restored else 0
+            
             # 세션 생성
-            if session_manager.create_session(session_id, lat, lng, bus_number, interval):
+            if session_manager.create_session(session_id, lat, lng, bus_number, interval,
+                                              estimate_interval, multi_stop, bus_numbers, alerts,
+                                              station_info):
                 # 모니터링 시작
-                if session_manager.start_monitoring(session_id, socketio):
+                if session_manager.start_monitoring(session_id, socketio, initial_delay):
                     emit('monitoring_started', {
-                        'message': f'{bus_number}번 버스 실시간 모니터링을 시작합니다',
+                        'message': f"{', '.join(bus_numbers)}번 버스 실시간 모니터링을 시작합니다",
                         'bus_number': bus_number,
+                        'bus_numbers': bus_numbers,
                         'interval': interval,
-                        'session_id': session_id
+                        'estimate_interval': estimate_interval,
+                        'multi_stop': multi_stop,
+                        'alerts': alerts,
+                        'session_id': session_id,
+                        'resumed': restored is not None,
+                        'station': station_info
                     })
                 else:
                     emit('error', {'message': '모니터링 시작에 실패했습니다'})
@@ -63,10 +167,51 @@ def init_websocket_handlers(socketio):
         except Exception as e:
             emit('error', {'message': f'모니터링 시작 실패: {str(e)}'})
 
+    def _update_buses(data, action: str):
+        session_id = request.sid
+        session_manager.touch(session_id)
+        bus_numbers = _parse_bus_numbers(data if isinstance(data, dict) else {})
+        if not bus_numbers:
+            emit('error', {'message': '버스번호가 필요합니다'})
+            return
+        
+        try:
+            if action == 'add':
+                updated = session_manager.update_session_buses(session_id, add=bus_numbers)
+            else:
+                updated = session_manager.update_session_buses(session_id, remove=bus_numbers)
+        except ValueError as e:
+            emit('error', {'message': str(e)})
+            return
+        
+        if updated is None:
+            emit('error', {'message': '활성 모니터링이 없습니다'})
+            return
+        
+        emit('buses_updated', {
+            'bus_numbers': list(updated),
+            'session_id': session_id
+        })
+
+    @socketio.on('add_bus')
+    def handle_add_bus(data):
+        """
+        실행 중인 모니터링에 버스 추가 (워커 재시작 없이 다음 업데이트부터 반영)
+        
+        data = {"bus_number": "341"} 또는 {"bus_numbers": ["341", "360"]}
+        """
+        _update_buses(data, 'add')
+
+    @socketio.on('remove_bus')
+    def handle_remove_bus(data):
+        """실행 중인 모니터링에서 버스 제거 (마지막 버스는 제거할 수 없음)"""
+        _update_buses(data, 'remove')
+
     @socketio.on('stop_bus_monitoring')
     def handle_stop_monitoring():
         """버스 모니터링 중단"""
         session_id = request.sid
+        session_manager.touch(session_id)
         
         if session_manager.stop_session(session_id):
             emit('monitoring_stopped', {
@@ -80,27 +225,53 @@ def init_websocket_handlers(socketio):
     def handle_get_status():
         """현재 세션 상태 조회"""
         session_id = request.sid
+        session_manager.touch(session_id)
         session_info = session_manager.get_session_info(session_id)
         
         if session_info:
-            emit('session_status', {
+            payload_codec.emit(socketio, 'session_status', {
                 'active': True,
                 'bus_number': session_info['bus_number'],
+                'bus_numbers': session_info['bus_numbers'],
                 'interval': session_info['interval'],
                 'session_id': session_id
-            })
+            }, session_id)
         else:
-            emit('session_status', {
+            payload_codec.emit(socketio, 'session_status', {
                 'active': False,
                 'session_id': session_id
-            })
+            }, session_id)
 
     @socketio.on('get_server_stats')
     def handle_get_stats():
         """서버 통계 조회 (관리자용)"""
         emit('server_stats', {
             'active_sessions': session_manager.get_active_sessions_count(),
+            'sessions': session_manager.get_stats(),
+            'tago_request_flight': request_flight.get_stats(),
+            'tago_transport': get_shared_transport().get_stats(),
+            'service_keys': get_default_client().key_pool.get_stats(),
+            'tago_hedging': request_hedger.get_stats(),
+            'shared_cache': get_shared_cache_stats(),
+            'prefetch': arrival_prefetcher.get_stats(),
+            'estimator': arrival_estimator.get_stats(),
+            'timeseries': arrival_timeseries.get_stats(),
+            'codec': payload_codec.get_stats(),
+            'route_tracking': route_tracker.get_stats(),
+            'polling': polling_policy.get_stats(),
+            'route_info': route_info_store.get_stats(),
+            'alerts': alert_counters.get_stats(),
+            'tracing': tracer.get_stats(),
+            'sse': arrival_stream_hub.get_stats(),
             'timestamp': str(datetime.now())
         })
 
+    # Socket.IO 이벤트 핸들러를 온디맨드 프로파일링 대상으로 등록
+    if socketio.server is not None:
+        profiler.register_table('socketio', socketio.server.handlers.get('/', {}))
+        
+        # 하트비트가 끊긴 세션은 소켓 연결이 살아 있을 때만 연장
+        server = socketio.server
+        session_manager.set_liveness_check(lambda sid: server.manager.is_connected(sid, '/'))
+
     print("WebSocket 핸들러 등록 완료")
\ No newline at end of file
@@ -1,107 +1,639 @@
+import glob
+import json
+import math
+import os
+import sys
 import threading
-from typing import Dict, Optional
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from utils.constants import MULTI_BUS_CONFIG, SESSION_CONFIG
+from utils.tracing import tracer
+from .codec import payload_codec
 from .workers import BusMonitoringWorker
 
-class SessionManager:
-    """WebSocket 세션 및 모니터링 워커 관리"""
+
+class SessionRecord:
+    """모니터링 세션 정보 (세션당 메모리를 줄이기 위해 __slots__ 사용)"""
+    
+    __slots__ = ('session_id', 'lat', 'lng', 'bus_number', 'bus_numbers', 'interval', 'estimate_interval',
+                 'multi_stop', 'alerts', 'station_info', 'active', 'created_at', 'last_seen')
+    
+    def __init__(self, session_id: str, lat: float, lng: float, bus_number: str, interval: int,
+                 estimate_interval: int = 0, multi_stop: Optional[dict] = None,
+                 bus_numbers: Optional[Tuple[str, ...]] = None, alerts: Optional[dict] = None):
+        self.session_id = session_id
+        self.lat = lat
+        self.lng = lng
+        self.bus_numbers = tuple(bus_numbers or (bus_number,))  # 구독 중인 버스 번호 (첫 번호가 대표)
+        self.bus_number = self.bus_numbers[0]
+        self.interval = interval
+        self.estimate_interval = estimate_interval
+        self.multi_stop = multi_stop
+        self.alerts = alerts  # 도착 임계값 알림 설정 (None이면 매 틱 전체 업데이트)
+        self.station_info: Optional[dict] = None
+        self.active = True
+        self.created_at = time.time()
+        self.last_seen = self.created_at  # 마지막 클라이언트 이벤트 시각 (하트비트)
+    
+    def to_dict(self) -> dict:
+        """기존 세션 정보 딕셔너리 형식으로 변환"""
+        return {
+            'lat': self.lat,
+            'lng': self.lng,
+            'bus_number': self.bus_number,
+            'bus_numbers': list(self.bus_numbers),
+            'interval': self.interval,
+            'estimate_interval': self.estimate_interval,
+            'multi_stop': self.multi_stop,
+            'alerts': self.alerts,
+            'station_info': self.station_info,
+            'active': self.active,
+            'last_seen': self.last_seen
+        }
+    
+    def to_snapshot(self) -> dict:
+        """스냅샷 파일에 저장할 형식 (재시작 후 from_snapshot으로 복원)"""
+        return {
+            'session_id': self.session_id,
+            'lat': self.lat,
+            'lng': self.lng,
+            'bus_numbers': list(self.bus_numbers),
+            'interval': self.interval,
+            'estimate_interval': self.estimate_interval,
+            'multi_stop': self.multi_stop,
+            'alerts': self.alerts,
+            'station_info': self.station_info,
+            'created_at': self.created_at,
+            'last_seen': self.last_seen
+        }
+    
+    @classmethod
+    def from_snapshot(cls, data: dict) -> 'SessionRecord':
+        bus_numbers = tuple(str(number) for number in data['bus_numbers'])
+        record = cls(data['session_id'], float(data['lat']), float(data['lng']), bus_numbers[0],
+                     int(data['interval']), int(data.get('estimate_interval') or 0), data.get('multi_stop'),
+                     bus_numbers, data.get('alerts'))
+        record.station_info = data.get('station_info')
+        record.created_at = float(data.get('created_at') or record.created_at)
+        record.last_seen = float(data.get('last_seen') or record.last_seen)
+        return record
+    
+    def with_station_info(self, station_info: dict) -> 'SessionRecord':
+        """정류소 정보만 바꾼 새 레코드 (조회 중인 스레드가 보는 기존 레코드는 그대로)"""
+        return self._copy(station_info=station_info)
+    
+    def with_bus_numbers(self, bus_numbers: Tuple[str, ...]) -> 'SessionRecord':
+        """구독 버스 번호만 바꾼 새 레코드"""
+        return self._copy(bus_numbers=bus_numbers)
+    
+    def _copy(self, station_info: Optional[dict] = None,
+              bus_numbers: Optional[Tuple[str, ...]] = None) -> 'SessionRecord':
+        record = SessionRecord(self.session_id, self.lat, self.lng, self.bus_number, self.interval,
+                               self.estimate_interval, self.multi_stop, bus_numbers or self.bus_numbers,
+                               self.alerts)
+        record.station_info = station_info or self.station_info
+        record.created_at = self.created_at
+        record.last_seen = self.last_seen
+        return record
+    
+    def nbytes(self) -> int:
+        """세션 레코드가 차지하는 대략적인 메모리 (바이트)"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.session_id) + sys.getsizeof(self.bus_number)
+        size += sys.getsizeof(self.bus_numbers)
+        if self.multi_stop:
+            size += sys.getsizeof(self.multi_stop)
+        if self.alerts:
+            size += sys.getsizeof(self.alerts)
+        if self.station_info:
+            size += sys.getsizeof(self.station_info)
+        return size
+
+
+class _ExpiryWheel:
+    """
+    세션 만료 타이밍 휠
+    
+    세션 ID를 만료 예정 슬롯에 넣어 두고, 슬롯 시각이 지나면 해당 슬롯만 검사한다.
+    하트비트는 레코드의 last_seen만 갱신하고(O(1)), 슬롯 검사 때 아직 만료 전인 세션은
+    새 만료 시각의 슬롯으로 다시 넣으므로 세션당 비용은 만료 주기마다 O(1)이다.
+    """
+    
+    def __init__(self, timeout: float, slot_seconds: float):
+        self.slot_seconds = slot_seconds
+        self.slots: List[Set[str]] = [set() for _ in range(int(math.ceil(timeout / slot_seconds)) + 2)]
+        self.cursor_tick = int(time.time() // slot_seconds)  # 다음에 검사할 슬롯의 절대 틱
+    
+    def schedule(self, session_id: str, expires_at: float):
+        # 휠 범위를 넘는 만료 시각은 마지막 슬롯에 넣고 검사 때 다시 배치
+        tick = max(int(expires_at // self.slot_seconds) + 1, self.cursor_tick)
+        tick = min(tick, self.cursor_tick + len(self.slots) - 1)
+        self.slots[tick % len(self.slots)].add(session_id)
+    
+    def advance(self, now: float) -> List[str]:
+        """now까지 도래한 슬롯의 세션 ID를 꺼내서 반환"""
+        due = []
+        current_tick = int(now // self.slot_seconds)
+        while self.cursor_tick <= current_tick:
+            slot = self.slots[self.cursor_tick % len(self.slots)]
+            if slot:
+                due.extend(slot)
+                slot.clear()
+            self.cursor_tick += 1
+        return due
+
+
+class _SessionShard:
+    """세션 레지스트리 샤드 (세션 ID 해시로 나눈 일부 세션과 전용 락)"""
+    
+    __slots__ = ('lock', 'sessions', 'workers')
     
     def __init__(self):
-        self.active_sessions: Dict[str, dict] = {}
-        self.monitoring_workers: Dict[str, BusMonitoringWorker] = {}
-        self._lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, SessionRecord] = {}
+        self.workers: Dict[str, BusMonitoringWorker] = {}
+
+
+class SessionManager:
+    """
+    WebSocket 세션 및 모니터링 워커 관리
+    
+    세션은 세션 ID 해시로 나눈 샤드에 저장하고 샤드별 락으로 변경을 직렬화한다(락 스트라이핑).
+    생성·교체·삭제는 같은 샤드 락 안에서 한 번에 처리하고, 조회는 락 없이 레코드 참조만 읽는다.
+    레코드의 설정 필드는 생성 후 바뀌지 않으며 정류소 정보 갱신도 새 레코드로 교체한다
+    (하트비트 시각 last_seen만 제자리에서 갱신).
+    """
+    
+    def __init__(self, idle_timeout: float = None, shards: int = None, worker_class=BusMonitoringWorker):
+        self.idle_timeout = idle_timeout or SESSION_CONFIG['IDLE_TIMEOUT']
+        self._shards = [_SessionShard() for _ in range(shards or SESSION_CONFIG['SHARDS'])]
+        self._worker_class = worker_class
+        
+        self._wheel = _ExpiryWheel(self.idle_timeout, SESSION_CONFIG['WHEEL_SLOT_SECONDS'])
+        self._wheel_lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        # 세션 ID의 소켓이 아직 연결되어 있는지 확인하는 함수 (핸들러 등록 시 지정)
+        self._liveness_check: Optional[Callable[[str], bool]] = None
+        
+        self.expired_sessions = 0   # 하트비트 없이 소켓도 끊긴 채 남아 있던(유령) 세션 정리 수
+        self.renewed_sessions = 0   # 하트비트는 없지만 소켓 연결이 살아 있어 연장한 수
+        self.sweeps = 0
+    
+        # 재시작 전 스냅샷에서 복원해 재접속을 기다리는 세션 (이전 세션 ID -> 레코드)
+        self.snapshot_file = os.getenv('TAGO_SESSION_SNAPSHOT') or SESSION_CONFIG['SNAPSHOT_FILE']
+        self._restored: Dict[str, SessionRecord] = {}
+        self._restored_by_buses: Dict[Tuple[str, ...], Set[str]] = {}  # 버스 번호 -> 이전 세션 ID
+        self._restored_lock = threading.Lock()
+        self._snapshot_at = time.time()
+        self.snapshot_saved = 0
+        self.restored_sessions = 0
+        self.resumed_sessions = 0
+    
+    def _shard(self, session_id: str) -> _SessionShard:
+        return self._shards[hash(session_id) % len(self._shards)]
+    
+    def set_liveness_check(self, check: Callable[[str], bool]):
+        """만료 검사 시 사용할 소켓 연결 확인 함수 지정"""
+        self._liveness_check = check
     
     def create_session(self, session_id: str, lat: float, lng: float, 
-                      bus_number: str, interval: int = 30) -> bool:
-        """새 모니터링 세션 생성"""
-        with self._lock:
-            # 기존 세션이 있다면 중단
-            if session_id in self.active_sessions:
-                self.stop_session(session_id)
-            
-            # 세션 정보 저장
-            self.active_sessions[session_id] = {
-                'lat': lat,
-                'lng': lng,
-                'bus_number': bus_number,
-                'interval': interval,
-                'active': True
-            }
-            
-            return True
+                      bus_number: str, interval: int = 30, estimate_interval: int = 0,
+                      multi_stop: Optional[dict] = None, bus_numbers: Optional[List[str]] = None,
+                      alerts: Optional[dict] = None, station_info: Optional[dict] = None) -> bool:
+        """
+        새 모니터링 세션 생성 (같은 세션 ID가 있으면 기존 세션과 워커를 원자적으로 교체)
+        
+        station_info를 주면(복원한 세션) 워커가 정류소를 다시 조회하지 않고 바로 사용한다.
+        """
+        record = SessionRecord(session_id, lat, lng, bus_number, interval,
+                               estimate_interval, multi_stop, bus_numbers, alerts)
+        record.station_info = station_info
+        shard = self._shard(session_id)
+        with tracer.lock(shard.lock, 'session.lock_wait'):
+            shard.sessions[session_id] = record
+            old_worker = shard.workers.pop(session_id, None)
+        
+        # 기존 워커 중단은 락 밖에서 (다른 세션 작업을 막지 않도록)
+        if old_worker is not None:
+            old_worker.stop()
+        
+        self._schedule_expiry(record)
+        return True
     
-    def start_monitoring(self, session_id: str, socketio) -> bool:
-        """모니터링 워커 시작"""
-        if session_id not in self.active_sessions:
-            return False
+    def start_monitoring(self, session_id: str, socketio, initial_delay: float = 0) -> bool:
+        """
+        모니터링 워커 시작
         
-        session_data = self.active_sessions[session_id]
+        Args:
+            session_id (str): 세션 ID
+            socketio: SocketIO 인스턴스
+            initial_delay (float): 첫 조회 전 대기 시간 (초, 복원한 세션의 첫 조회 분산용)
+        """
+        shard = self._shard(session_id)
+        with tracer.lock(shard.lock, 'session.lock_wait'):
+            session_data = shard.sessions.get(session_id)
+            if session_data is None:
+                return False
+            
+            # 워커 생성 및 시작
+            worker = self._worker_class(
+                session_id=session_id,
+                lat=session_data.lat,
+                lng=session_data.lng,
+                bus_number=session_data.bus_number,
+                bus_numbers=session_data.bus_numbers,
+                interval=session_data.interval,
+                socketio=socketio,
+                session_manager=self,
+                estimate_interval=session_data.estimate_interval,
+                multi_stop=session_data.multi_stop,
+                alerts=session_data.alerts,
+                station_info=session_data.station_info,
+                initial_delay=initial_delay
+            )
+            old_worker = shard.workers.get(session_id)
+            shard.workers[session_id] = worker
+            worker.start()
         
-        # 워커 생성 및 시작
-        worker = BusMonitoringWorker(
-            session_id=session_id,
-            lat=session_data['lat'],
-            lng=session_data['lng'],
-            bus_number=session_data['bus_number'],
-            interval=session_data['interval'],
-            socketio=socketio,
-            session_manager=self
-        )
+        if old_worker is not None:
+            old_worker.stop()
+        
+        return True
+    
+    def stop_session(self, session_id: str, expected: Optional[SessionRecord] = None) -> bool:
+        """
+        세션 중단
+        
+        Args:
+            session_id (str): 세션 ID
+            expected (SessionRecord): 지정하면 현재 레코드가 이 레코드일 때만 중단
+                (그 사이 새 세션으로 교체되었으면 유지)
+        """
+        shard = self._shard(session_id)
+        with shard.lock:
+            record = shard.sessions.get(session_id)
+            if expected is not None and record is not expected:
+                return False
+            
+            # 만료 휠에 남은 항목은 검사 시점에 세션이 없으면 무시됨
+            shard.sessions.pop(session_id, None)
+            worker = shard.workers.pop(session_id, None)
         
-        self.monitoring_workers[session_id] = worker
-        worker.start()
+        # 워커 중단
+        if worker is not None:
+            worker.stop()
         
+        return record is not None or worker is not None
+    
+    def stop_all_sessions(self) -> int:
+        """모든 세션 중단 (프로세스 종료 시)"""
+        stopped = 0
+        for shard in self._shards:
+            for session_id in list(shard.sessions.keys()):
+                if self.stop_session(session_id):
+                    stopped += 1
+        return stopped
+    
+    def touch(self, session_id: str) -> bool:
+        """클라이언트 이벤트 수신 시 하트비트 시각 갱신 (세션이 없으면 False)"""
+        record = self._shard(session_id).sessions.get(session_id)
+        if record is None:
+            return False
+        record.last_seen = time.time()
         return True
     
-    def stop_session(self, session_id: str) -> bool:
-        """세션 중단"""
-        with self._lock:
-            stopped = False
+    def _schedule_expiry(self, record: SessionRecord):
+        with self._wheel_lock:
+            self._wheel.schedule(record.session_id, record.last_seen + self.idle_timeout)
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_loop, name='session-sweeper')
+                self._sweeper.daemon = True
+                self._sweeper.start()
+    
+    def _sweep_loop(self):
+        """만료 휠을 슬롯 간격마다 진행하며 유휴 세션 정리 (스냅샷 저장 주기도 함께 확인)"""
+        while True:
+            time.sleep(self._wheel.slot_seconds)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f'세션 만료 검사 오류: {e}')
+            if time.time() - self._snapshot_at >= SESSION_CONFIG['SNAPSHOT_INTERVAL']:
+                self.purge_restored()
+                self.save_snapshot()
+    
+    def sweep(self, now: float = None) -> int:
+        """
+        만료 시각이 지난 슬롯의 세션 검사
+        
+        하트비트가 갱신된 세션은 새 만료 시각으로 다시 배치하고, 하트비트가 끊긴 세션은
+        소켓이 아직 연결되어 있으면 연장, 끊겼으면 유령 세션으로 보고 정리한다.
+        
+        Returns:
+            int: 정리한 세션 수
+        """
+        now = now or time.time()
+        with self._wheel_lock:
+            due = self._wheel.advance(now)
+            self.sweeps += 1
+        
+        expired = 0
+        for session_id in due:
+            record = self._shard(session_id).sessions.get(session_id)
+            if record is None:
+                continue
             
-            # 워커 중단
-            if session_id in self.monitoring_workers:
-                worker = self.monitoring_workers[session_id]
-                worker.stop()
-                del self.monitoring_workers[session_id]
-                stopped = True
+            if record.last_seen + self.idle_timeout > now:
+                self._schedule_expiry(record)
+                continue
             
-            # 세션 정보 삭제
-            if session_id in self.active_sessions:
-                del self.active_sessions[session_id]
-                stopped = True
+            if self._liveness_check is not None and self._liveness_check(session_id):
+                record.last_seen = now
+                self.renewed_sessions += 1
+                self._schedule_expiry(record)
+                continue
             
-            return stopped
+            # 검사하는 사이 같은 세션 ID로 새 세션이 만들어졌으면 건드리지 않음
+            if self.stop_session(session_id, expected=record):
+                print(f'유휴 세션 만료: {session_id} ({now - record.last_seen:.0f}초 동안 응답 없음)')
+                payload_codec.forget(session_id)
+                self.expired_sessions += 1
+                expired += 1
+        return expired
+    
+    def save_snapshot(self) -> int:
+        """
+        세션 테이블 스냅샷 저장 (주기적으로, 그리고 종료 시 세션 중단 전에 호출)
+        
+        아직 재접속하지 않은 복원 세션도 복원 가능 기간이 남았으면 함께 저장해
+        연달아 재시작해도 잃지 않는다. 프로세스마다 자기 세션만 가지므로 프로세스별 파일
+        (sessions_snapshot.<pid>.json)에 저장해 여러 프로세스가 서로의 스냅샷을 덮어쓰지 않게 한다.
+        
+        Returns:
+            int: 저장한 세션 수
+        """
+        self._snapshot_at = time.time()
+        if not self.snapshot_file:
+            return 0
+        
+        records = [record for shard in self._shards for record in list(shard.sessions.values())]
+        live_ids = {record.session_id for record in records}
+        expires_before = self._snapshot_at - SESSION_CONFIG['RESUME_WINDOW']
+        with self._restored_lock:
+            records += [record for session_id, record in self._restored.items()
+                        if session_id not in live_ids and record.last_seen > expires_before]
+        
+        path = self._process_snapshot_file()
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': self._snapshot_at, 'sessions': [record.to_snapshot() for record in records]},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f'세션 스냅샷 저장 실패: {e}')
+            return 0
+        self.snapshot_saved = len(records)
+        return len(records)
+    
+    def restore_snapshot(self) -> int:
+        """
+        시작 시 스냅샷에서 세션 복원 (워커는 띄우지 않고 재접속을 기다림)
+        
+        마지막 클라이언트 이벤트가 RESUME_WINDOW 안인 세션만 복원한다. 이전 실행의 모든 프로세스 파일을
+        읽으며(재접속은 어느 프로세스로든 올 수 있음), 저장한 지 RESUME_WINDOW가 지난 파일은 삭제한다.
+        재접속한 클라이언트는 claim_restored()로 정류소 정보를 넘겨받는다.
+        
+        Returns:
+            int: 복원한 세션 수
+        """
+        if not self.snapshot_file:
+            return 0
+        
+        expires_before = time.time() - SESSION_CONFIG['RESUME_WINDOW']
+        sessions = []
+        for path in self._snapshot_files():
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if float(data.get('saved_at') or 0) <= expires_before:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            sessions.extend(data.get('sessions', []))
+        
+        restored = 0
+        with self._restored_lock:
+            for item in sessions:
+                try:
+                    record = SessionRecord.from_snapshot(item)
+                except (KeyError, IndexError, TypeError, ValueError):
+                    continue
+                if record.last_seen <= expires_before:
+                    continue
+                self._restored[record.session_id] = record
+                self._restored_by_buses.setdefault(record.bus_numbers, set()).add(record.session_id)
+                restored += 1
+            self.restored_sessions += restored
+        if restored:
+            print(f'세션 스냅샷 복원: {restored}개 (재접속 대기)')
+        return restored
+    
+    def _process_snapshot_file(self) -> str:
+        """이 프로세스의 스냅샷 파일 경로 (SNAPSHOT_FILE 이름에 pid를 붙임)"""
+        root, ext = os.path.splitext(self.snapshot_file)
+        return f'{root}.{os.getpid()}{ext}'
+    
+    def _snapshot_files(self) -> List[str]:
+        """복원할 스냅샷 파일 (모든 프로세스 파일과 pid 없는 이전 형식 파일)"""
+        root, ext = os.path.splitext(self.snapshot_file)
+        paths = [path for path in glob.glob(f'{glob.escape(root)}.*{ext}')
+                 if path[len(root) + 1:len(path) - len(ext)].isdigit()]
+        if os.path.exists(self.snapshot_file):
+            paths.append(self.snapshot_file)
+        return paths
+    
+    def claim_restored(self, session_id: str, lat: float, lng: float, bus_numbers: List[str],
+                       resume_session_id: Optional[str] = None) -> Optional[SessionRecord]:
+        """
+        재접속한 클라이언트의 복원 세션 찾기 (찾으면 대기 목록에서 제거)
+        
+        이전 세션 ID(resume_session_id, 없으면 현재 세션 ID)가 있으면 그 세션을, 없으면 버스 번호가 같고
+        위치가 RESUME_MATCH_RADIUS 안인 세션을 찾는다. ID가 맞아도 버스 번호가 다르거나 위치가
+        RESUME_MATCH_RADIUS 밖이면 (이전 정류소가 맞지 않으므로) 쓰지 않는다.
+        
+        Args:
+            session_id (str): 새 세션 ID
+            lat (float): 위도
+            lng (float): 경도
+            bus_numbers (List[str]): 구독 버스 번호
+            resume_session_id (str): 클라이언트가 보낸 이전 세션 ID
+        
+        Returns:
+            Optional[SessionRecord]: 복원 세션 (없거나 복원 가능 기간이 지났으면 None)
+        """
+        if not self._restored:
+            return None
+        
+        expires_before = time.time() - SESSION_CONFIG['RESUME_WINDOW']
+        bus_numbers = tuple(bus_numbers)
+        radius = SESSION_CONFIG['RESUME_MATCH_RADIUS']
+        with self._restored_lock:
+            record = self._restored.get(resume_session_id or session_id)
+            if (record is None or record.bus_numbers != bus_numbers
+                    or _distance_meters(lat, lng, record.lat, record.lng) > radius):
+                record = None
+                for candidate_id in self._restored_by_buses.get(bus_numbers, ()):
+                    candidate = self._restored[candidate_id]
+                    if _distance_meters(lat, lng, candidate.lat, candidate.lng) <= radius:
+                        record = candidate
+                        break
+            if record is None:
+                return None
+            
+            self._discard_restored(record)
+            if record.last_seen <= expires_before:
+                return None
+            self.resumed_sessions += 1
+        return record
+    
+    def _discard_restored(self, record: SessionRecord):
+        self._restored.pop(record.session_id, None)
+        same_buses = self._restored_by_buses.get(record.bus_numbers)
+        if same_buses is not None:
+            same_buses.discard(record.session_id)
+            if not same_buses:
+                del self._restored_by_buses[record.bus_numbers]
+    
+    def purge_restored(self, now: float = None) -> int:
+        """복원 가능 기간이 지나도록 재접속하지 않은 복원 세션 정리"""
+        expires_before = (now or time.time()) - SESSION_CONFIG['RESUME_WINDOW']
+        with self._restored_lock:
+            expired = [record for record in self._restored.values() if record.last_seen <= expires_before]
+            for record in expired:
+                self._discard_restored(record)
+        return len(expired)
     
     def is_session_active(self, session_id: str) -> bool:
         """세션 활성 상태 확인"""
-        return (session_id in self.active_sessions and 
-                self.active_sessions[session_id].get('active', False))
+        record = self._shard(session_id).sessions.get(session_id)
+        return record is not None and record.active
     
     def get_session_info(self, session_id: str) -> Optional[dict]:
         """세션 정보 조회"""
-        return self.active_sessions.get(session_id)
+        record = self._shard(session_id).sessions.get(session_id)
+        return record.to_dict() if record else None
     
     def get_active_sessions_count(self) -> int:
         """활성 세션 수 조회"""
-        return len(self.active_sessions)
+        return sum(len(shard.sessions) for shard in self._shards)
     
     def is_session_valid_for_flow2(self, session_id):
         """플로우 2 호출 가능한 세션인지 확인"""
         if not session_id:
             return False
-            
-        return (session_id in self.active_sessions and 
-                self.active_sessions[session_id].get('active', False))
+        
+        return self.is_session_active(session_id)
     
     def get_session_station_info(self, session_id):
         """세션의 정류소 정보 반환"""
-        if session_id in self.active_sessions:
-            return self.active_sessions[session_id].get('station_info')
-        return None
-    
-    def update_session_station_info(self, session_id, station_info):
-        """세션에 정류소 정보 저장 """
-        if session_id in self.active_sessions:
-            self.active_sessions[session_id]['station_info'] = station_info
+        record = self._shard(session_id).sessions.get(session_id)
+        return record.station_info if record else None
+    
+    def update_session_station_info(self, session_id, station_info, worker=None):
+        """
+        세션에 정류소 정보 저장 (레코드를 정류소 정보가 반영된 새 레코드로 교체)
+        
+        worker를 주면 그 워커가 현재 세션의 워커일 때만 저장한다
+        (세션이 교체된 뒤 이전 워커가 이전 위치의 정류소를 새 레코드에 쓰지 않도록).
+        """
+        shard = self._shard(session_id)
+        with tracer.lock(shard.lock, 'session.lock_wait'):
+            if worker is not None and shard.workers.get(session_id) is not worker:
+                return
+            record = shard.sessions.get(session_id)
+            if record is not None:
+                shard.sessions[session_id] = record.with_station_info(station_info)
+    
+    def update_session_buses(self, session_id: str, add: List[str] = (),
+                             remove: List[str] = ()) -> Optional[Tuple[str, ...]]:
+        """
+        실행 중인 세션의 구독 버스 번호 추가·제거 (워커를 다시 시작하지 않음)
+        
+        Args:
+            session_id (str): 세션 ID
+            add (List[str]): 추가할 버스 번호
+            remove (List[str]): 제거할 버스 번호
+        
+        Returns:
+            Optional[Tuple[str, ...]]: 변경 후 버스 번호 목록 (세션이 없으면 None)
+        
+        Raises:
+            ValueError: 버스 번호가 모두 제거되거나 최대 개수를 넘는 경우
+        """
+        shard = self._shard(session_id)
+        with shard.lock:
+            record = shard.sessions.get(session_id)
+            if record is None:
+                return None
+            
+            removed = set(remove)
+            bus_numbers = tuple(number for number in record.bus_numbers if number not in removed)
+            bus_numbers += tuple(number for number in dict.fromkeys(add)
+                                 if number not in bus_numbers and number not in removed)
+            if not bus_numbers:
+                raise ValueError('모든 버스 번호를 제거할 수 없습니다 (stop_bus_monitoring 사용)')
+            if len(bus_numbers) > MULTI_BUS_CONFIG['MAX_BUS_NUMBERS']:
+                raise ValueError(f"버스 번호는 최대 {MULTI_BUS_CONFIG['MAX_BUS_NUMBERS']}개까지 구독할 수 있습니다")
+            
+            if bus_numbers != record.bus_numbers:
+                shard.sessions[session_id] = record.with_bus_numbers(bus_numbers)
+                worker = shard.workers.get(session_id)
+                if worker is not None:
+                    worker.set_bus_numbers(bus_numbers)
+        
+        return bus_numbers
+    
+    def get_stats(self) -> Dict:
+        """세션 메모리 사용량 및 만료 통계"""
+        now = time.time()
+        records = [record for shard in self._shards for record in list(shard.sessions.values())]
+        memory_bytes = sum(record.nbytes() for record in records)
+        idle = [record for record in records if now - record.last_seen > self.idle_timeout]
+        ghosts = idle if self._liveness_check is None else [
+            record for record in idle if not self._liveness_check(record.session_id)
+        ]
+        return {
+            'sessions': len(records),
+            'workers': sum(len(shard.workers) for shard in self._shards),
+            'shards': len(self._shards),
+            'memory_bytes': memory_bytes,
+            'bytes_per_session': round(memory_bytes / len(records), 1) if records else 0,
+            'idle_sessions': len(idle),
+            'ghost_sessions': len(ghosts),
+            'expired_ghost_sessions': self.expired_sessions,
+            'renewed_sessions': self.renewed_sessions,
+            'idle_timeout': self.idle_timeout,
+            'sweeps': self.sweeps,
+            'snapshot': {
+                'file': self._process_snapshot_file() if self.snapshot_file else None,
+                'saved_sessions': self.snapshot_saved,
+                'restored_sessions': self.restored_sessions,
+                'resumed_sessions': self.resumed_sessions,
+                'awaiting_resume': len(self._restored)
+            }
+        }
+
+
+def _distance_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """가까운 두 지점 사이 거리 (등장방형 근사, 미터)"""
+    x = math.radians(lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6371000 * math.hypot(x, y)
 
 # 글로벌 세션 매니저 인스턴스
-session_manager = SessionManager()
\ No newline at end of file
+session_manager = SessionManager()
@@ -0,0 +1,227 @@
+import heapq
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from apis.tago_api import TAGOAPIClient, arrival_cache, get_default_client
+from utils.constants import PREFETCH_CONFIG
+
+
+class ArrivalPrefetcher:
+    """
+    모니터링 세션 틱 직전에 정류소 도착 정보를 미리 갱신하는 프리페처
+    
+    워커가 다음 틱 예정 시각을 알려주면 LEAD_TIME 초 앞서 캐시를 갱신해서
+    워커의 _get_bus_update가 항상 따뜻한 캐시를 읽도록 한다.
+    세션별 조회 정류소 통계를 파일로 남겨 다음 부팅 때 상위 정류소를 미리 데운다.
+    """
+    
+    def __init__(self, lead_time: float = None, stats_file: str = None):
+        self.lead_time = lead_time if lead_time is not None else PREFETCH_CONFIG['LEAD_TIME']
+        self.stats_file = stats_file or PREFETCH_CONFIG['STATS_FILE']
+        
+        # session_id -> (due_at, [(city_code, station_id), ...], 예약한 워커)
+        self._due: Dict[str, Tuple[float, List[Tuple[str, str]], object]] = {}
+        # (refresh_at, due_at, session_id) 최소 힙
+        self._heap: List[Tuple[float, float, str]] = []
+        self._cond = threading.Condition()
+        
+        # (city_code, station_id) -> 조회 세션 수 / 정류소명
+        self._watch_counts: Counter = Counter()
+        self._station_names: Dict[Tuple[str, str], str] = {}
+        # session_id -> 조회 통계에 반영된 정류소 키 목록
+        self._session_stations: Dict[str, List[Tuple[str, str]]] = {}
+        
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._last_saved = time.time()
+        
+        self.refreshed = 0
+        self.skipped = 0
+        self.failed = 0
+    
+    @property
+    def client(self) -> TAGOAPIClient:
+        return get_default_client()
+    
+    def _ensure_started(self):
+        """갱신 스레드 시작 (최초 1회)"""
+        if self._thread is not None:
+            return
+        self._executor = ThreadPoolExecutor(
+            max_workers=PREFETCH_CONFIG['WORKERS'],
+            thread_name_prefix='prefetch'
+        )
+        self._thread = threading.Thread(target=self._run, name='arrival-prefetcher')
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def schedule(self, session_id: str, stations: List[Dict], due_at: float, owner: object = None):
+        """
+        세션의 다음 틱 예정 시각 등록
+        
+        Args:
+            session_id (str): 세션 ID
+            stations (List[Dict]): 세션이 조회하는 정류소 정보 리스트
+            due_at (float): 다음 틱 예정 시각 (epoch 초)
+            owner (object): 예약한 워커 (cancel에서 같은 워커의 예약만 해제할 때 사용)
+        """
+        station_keys = [(station['city_code'], station['station_id']) for station in stations]
+        
+        with self._cond:
+            self._ensure_started()
+            self._due[session_id] = (due_at, station_keys, owner)
+            heapq.heappush(self._heap, (due_at - self.lead_time, due_at, session_id))
+            
+            if self._session_stations.get(session_id) != station_keys:
+                self._session_stations[session_id] = station_keys
+                for station_key, station in zip(station_keys, stations):
+                    self._watch_counts[station_key] += 1
+                    self._station_names[station_key] = station.get('station_name', '')
+            
+            self._cond.notify()
+    
+    def cancel(self, session_id: str, owner: object = None):
+        """
+        세션 예약 해제 (힙 항목은 꺼낼 때 무시됨)
+        
+        owner를 주면 그 워커가 등록한 예약일 때만 해제한다 (교체된 이전 워커가 새 워커의 예약을 지우지 않도록).
+        """
+        with self._cond:
+            current = self._due.get(session_id)
+            if owner is not None and current is not None and current[2] is not owner:
+                return
+            self._due.pop(session_id, None)
+            self._session_stations.pop(session_id, None)
+    
+    def _run(self):
+        """예약 시각에 맞춰 갱신 작업 실행"""
+        while True:
+            with self._cond:
+                while True:
+                    now = time.time()
+                    if self._heap and self._heap[0][0] <= now:
+                        _, due_at, session_id = heapq.heappop(self._heap)
+                        current = self._due.get(session_id)
+                        # 취소되었거나 더 최근 예약으로 대체된 항목은 무시
+                        if current is None or current[0] != due_at:
+                            continue
+                        break
+                    timeout = self._heap[0][0] - now if self._heap else PREFETCH_CONFIG['STATS_SAVE_INTERVAL']
+                    self._cond.wait(timeout=min(timeout, PREFETCH_CONFIG['STATS_SAVE_INTERVAL']))
+                    self._maybe_save_stats()
+            
+            for city_code, station_id in current[1]:
+                self._executor.submit(self._refresh, city_code, station_id, due_at)
+    
+    def _refresh(self, city_code: str, station_id: str, due_at: float):
+        """틱 시점에 캐시가 만료될 정류소만 갱신"""
+        age = arrival_cache.age((city_code, station_id, None))
+        if age is not None and age + (due_at - time.time()) < arrival_cache.ttl:
+            # 다른 세션 예약으로 이미 충분히 최근에 갱신됨
+            self.skipped += 1
+            return
+        
+        try:
+            self.client.get_bus_arrival_info(station_id=station_id, city_code=city_code, use_cache=False)
+            self.refreshed += 1
+        except Exception as e:
+            self.failed += 1
+            print(f'프리페치 실패 ({city_code}/{station_id}): {e}')
+    
+    def warm_up(self, top_n: int = None):
+        """이전 실행에서 가장 많이 조회된 정류소 도착 정보를 미리 캐시"""
+        top_n = top_n or PREFETCH_CONFIG['WARMUP_TOP_N']
+        stations = self._load_stats()[:top_n]
+        if not stations:
+            return
+        
+        with self._cond:
+            self._ensure_started()
+            for item in stations:
+                station_key = (item['city_code'], item['station_id'])
+                self._station_names.setdefault(station_key, item.get('station_name', ''))
+        
+        for item in stations:
+            self._executor.submit(self._refresh, item['city_code'], item['station_id'], time.time())
+        print(f'프리페치 워밍업: 정류소 {len(stations)}개')
+    
+    def _load_stats(self) -> List[Dict]:
+        """저장된 정류소 조회 통계 로드 (조회 수 내림차순)"""
+        try:
+            with open(self.stats_file, encoding='utf-8') as f:
+                stations = json.load(f).get('stations', [])
+        except (OSError, ValueError):
+            return []
+        return sorted(stations, key=lambda s: s.get('count', 0), reverse=True)
+    
+    def _maybe_save_stats(self):
+        if time.time() - self._last_saved >= PREFETCH_CONFIG['STATS_SAVE_INTERVAL']:
+            self.save_stats()
+    
+    def save_stats(self):
+        """정류소 조회 통계 저장 (이전 실행 통계와 합산)"""
+        with self._cond:
+            self._last_saved = time.time()
+            if not self._watch_counts:
+                return
+            counts = self._watch_counts
+            self._watch_counts = Counter()
+            current_names = dict(self._station_names)
+        
+        merged = Counter()
+        names = {}
+        for item in self._load_stats():
+            station_key = (item['city_code'], item['station_id'])
+            merged[station_key] = item.get('count', 0)
+            names[station_key] = item.get('station_name', '')
+        merged.update(counts)
+        names.update(current_names)
+        
+        stations = [
+            {
+                'city_code': city_code,
+                'station_id': station_id,
+                'station_name': names.get((city_code, station_id), ''),
+                'count': count
+            }
+            for (city_code, station_id), count in merged.most_common()
+        ]
+        
+        try:
+            os.makedirs(os.path.dirname(self.stats_file) or '.', exist_ok=True)
+            tmp_path = f'{self.stats_file}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': time.time(), 'stations': stations}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.stats_file)
+        except OSError as e:
+            print(f'프리페치 통계 저장 실패: {e}')
+            # 저장하지 못한 수치는 다음 저장 때 다시 반영
+            with self._cond:
+                self._watch_counts.update(counts)
+    
+    def shutdown(self):
+        """조회 통계 저장 후 갱신 작업 중단 (프로세스 종료 시)"""
+        self.save_stats()
+        with self._cond:
+            self._due.clear()
+            executor = self._executor
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def get_stats(self) -> Dict:
+        """프리페처 통계 조회"""
+        return {
+            'scheduled_sessions': len(self._due),
+            'refreshed': self.refreshed,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'arrival_cache': arrival_cache.get_stats()
+        }
+
+
+# 글로벌 프리페처 인스턴스
+arrival_prefetcher = ArrivalPrefetcher()
@@ -0,0 +1,309 @@
+import json
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from apis.tago_api import add_arrival_listener, get_default_client
+from utils.cache import TTLCache
+from utils.concurrency import get_fetch_executor
+from utils.constants import SSE_CONFIG
+from .workers import rank_buses
+
+
+class _StationChannel:
+    """정류소 하나의 도착 정보 이벤트 채널 (구독자가 같은 이벤트·렌더링 결과를 공유)"""
+    
+    __slots__ = ('city_code', 'station_id', 'station_name', 'cond', 'events', 'last_id', 'intervals',
+                 'subscribers', 'next_poll', 'polling', 'emptied_at', '_rendered')
+    
+    def __init__(self, city_code: str, station_id: str, station_name: str):
+        self.city_code = city_code
+        self.station_id = station_id
+        self.station_name = station_name
+        self.cond = threading.Condition()
+        self.events = deque(maxlen=SSE_CONFIG['RESUME_BUFFER'])  # (event_id, arrivals)
+        self.last_id = 0
+        self.intervals: Counter = Counter()  # 구독자 요청 간격별 구독자 수
+        self.subscribers = 0
+        self.next_poll = 0.0
+        self.polling = False
+        self.emptied_at = 0.0
+        self._rendered: Dict[Tuple[int, Tuple[str, ...]], str] = {}  # 마지막 이벤트의 필터별 SSE 프레임
+    
+    def publish(self, arrivals: List[Dict], now: float) -> bool:
+        """새 도착 정보를 이벤트로 추가 (직전과 같으면 무시)"""
+        with self.cond:
+            if self.events and self.events[-1][1] == arrivals:
+                return False
+            # 이벤트 ID는 밀리초 시각 (재연결 시 다른 프로세스에서도 대략 이어 받을 수 있게)
+            self.last_id = max(int(now * 1000), self.last_id + 1)
+            self.events.append((self.last_id, arrivals))
+            self._rendered.clear()
+            self.cond.notify_all()
+            return True
+    
+    def render(self, event_id: int, arrivals: List[Dict], bus_numbers: Tuple[str, ...]) -> str:
+        """이벤트를 SSE 프레임으로 변환 (같은 이벤트·같은 버스 필터는 한 번만 직렬화)"""
+        key = (event_id, bus_numbers)
+        frame = self._rendered.get(key)
+        if frame is None:
+            payload = self._build_update(arrivals, bus_numbers)
+            frame = f'id: {event_id}\nevent: bus_update\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n'
+            if event_id == self.last_id:
+                self._rendered[key] = frame
+        return frame
+    
+    def _build_update(self, arrivals: List[Dict], bus_numbers: Tuple[str, ...]) -> dict:
+        """Socket.IO bus_update와 같은 형식의 업데이트 (버스 번호를 지정하지 않으면 정류소 전체)"""
+        if bus_numbers:
+            arrivals = [bus for bus in arrivals if str(bus['route_name']).strip() in bus_numbers]
+        buses = rank_buses(get_default_client(), arrivals)
+        update = {
+            'timestamp': datetime.now().isoformat(),
+            'bus_found': bool(buses),
+            'station_name': self.station_name,
+            'station_id': self.station_id,
+            'city_code': self.city_code,
+            'bus_numbers': list(bus_numbers),
+            'total_buses': len(arrivals),
+            'buses': buses
+        }
+        if buses:
+            fastest = buses[0]
+            update.update({
+                'bus_number': fastest['bus_number'],
+                'arrival_time': fastest['arrival_time'],
+                'arrival_time_formatted': fastest['arrival_time_formatted'],
+                'remaining_stations': fastest['remaining_stations']
+            })
+        return update
+    
+    def interval(self) -> int:
+        return min(self.intervals) if self.intervals else SSE_CONFIG['DEFAULT_INTERVAL']
+
+
+class _Subscription:
+    """SSE 연결 하나의 구독 정보"""
+    
+    __slots__ = ('channel', 'bus_numbers', 'interval', 'client_addr', 'reason', 'closed')
+    
+    def __init__(self, channel: _StationChannel, bus_numbers: Tuple[str, ...], interval: int, client_addr: str):
+        self.channel = channel
+        self.bus_numbers = bus_numbers
+        self.interval = interval
+        self.client_addr = client_addr
+        self.reason = 'disconnected'
+        self.closed = False
+
+
+class ArrivalStreamHub:
+    """
+    SSE 도착 정보 스트림 허브
+    
+    구독자마다 워커 스레드를 두지 않고 정류소별 채널 하나가 도착 정보를 받아 모든 구독자에게 나눠 준다.
+    채널은 TAGO 조회 결과 리스너로 Socket.IO 세션·프리페처가 조회한 같은 정류소 결과를 그대로 받고,
+    그 사이 새 정보가 없으면 구독자가 요청한 가장 짧은 간격으로 공용 도착 정보 캐시를 통해 조회한다.
+    구독자 연결은 이벤트를 기다리는 스레드 하나(또는 그린렛)와 마지막 이벤트 ID만 가진다.
+    """
+    
+    def __init__(self):
+        self._channels: Dict[Tuple[str, str], _StationChannel] = {}
+        self._clients: Counter = Counter()  # 원격 주소별 연결 수
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stations = TTLCache(ttl=SSE_CONFIG['STATION_TTL'], max_entries=SSE_CONFIG['MAX_STATION_LOOKUPS'])
+        self.connections = 0
+        self.rejected = 0
+        self.resumed = 0
+        self.polls = 0
+        self.poll_failures = 0
+        self.closed: Counter = Counter()  # 종료 사유별 연결 수
+    
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    add_arrival_listener(self._on_arrivals)
+                    self._thread = threading.Thread(target=self._run, name='sse-poller', daemon=True)
+                    self._thread.start()
+    
+    def resolve_station(self, lat: float, lng: float) -> Optional[Dict]:
+        """좌표의 현재 정류소 (재연결이 잦으므로 좌표별로 캐시)"""
+        key = (round(lat, 5), round(lng, 5))
+        station = self._stations.get(key)
+        if station is not None:
+            return station or None
+        
+        client = get_default_client()
+        stations = client.get_stations_by_location(lng=lng, lat=lat)
+        station, _ = client.find_current_station(lat, lng, stations) if stations else (None, '')
+        self._stations.set(key, station or {})
+        return station
+    
+    def open(self, city_code: str, station_id: str, station_name: str = '', bus_numbers: Tuple[str, ...] = (),
+             interval: int = None, client_addr: str = '') -> Optional[_Subscription]:
+        """
+        정류소 채널 구독 (연결 한도를 넘으면 None)
+        
+        Args:
+            city_code (str): 도시코드
+            station_id (str): 정류소 ID
+            station_name (str): 정류소명
+            bus_numbers (Tuple[str, ...]): 구독 버스 번호 (비어 있으면 정류소 전체)
+            interval (int): 조회 간격 (초)
+            client_addr (str): 원격 주소 (주소별 연결 수 제한)
+        
+        Returns:
+            Optional[_Subscription]: 구독 정보 (응답이 끝나면 close()로 해제)
+        """
+        self._ensure_started()
+        interval = interval or SSE_CONFIG['DEFAULT_INTERVAL']
+        with self._lock:
+            if (self.connections >= SSE_CONFIG['MAX_SUBSCRIBERS'] or
+                    self._clients[client_addr] >= SSE_CONFIG['MAX_PER_CLIENT']):
+                self.rejected += 1
+                return None
+            
+            channel = self._channels.get((city_code, station_id))
+            if channel is None:
+                channel = self._channels[(city_code, station_id)] = _StationChannel(city_code, station_id,
+                                                                                    station_name)
+            channel.subscribers += 1
+            channel.intervals[interval] += 1
+            channel.next_poll = min(channel.next_poll, time.time() + interval) if channel.next_poll else 0.0
+            self.connections += 1
+            self._clients[client_addr] += 1
+        return _Subscription(channel, bus_numbers, interval, client_addr)
+    
+    def close(self, subscription: _Subscription):
+        """구독 해제 (응답 종료 시 호출, 여러 번 호출해도 한 번만 반영)"""
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            channel, interval, client_addr = subscription.channel, subscription.interval, subscription.client_addr
+            channel.subscribers -= 1
+            channel.intervals[interval] -= 1
+            if channel.intervals[interval] <= 0:
+                del channel.intervals[interval]
+            if channel.subscribers == 0:
+                channel.emptied_at = time.time()
+            self.connections -= 1
+            self._clients[client_addr] -= 1
+            if self._clients[client_addr] <= 0:
+                del self._clients[client_addr]
+            self.closed[subscription.reason] += 1
+    
+    def stream(self, subscription: _Subscription, last_event_id: Optional[int] = None) -> Iterator[str]:
+        """
+        구독자 SSE 프레임 생성기 (한도에 도달하면 종료, 구독 해제는 close()에서)
+        
+        Args:
+            subscription (_Subscription): open()으로 만든 구독
+            last_event_id (int): Last-Event-ID (지정하면 그 이후 이벤트부터 이어서 전송)
+        """
+        channel, bus_numbers = subscription.channel, subscription.bus_numbers
+        started = time.time()
+        last_sent = started
+        try:
+            yield f"retry: {SSE_CONFIG['RETRY_MS']}\n\n"
+            
+            # 재연결이면 버퍼에 남은 이후 이벤트를 모두, 아니면(또는 버퍼에서 밀려났으면) 최신 이벤트만
+            with channel.cond:
+                events = list(channel.events)
+            if last_event_id and events and events[0][0] <= last_event_id:
+                backlog = [event for event in events if event[0] > last_event_id]
+                with self._lock:
+                    self.resumed += 1
+            else:
+                backlog = events[-1:]
+            for event_id, arrivals in backlog:
+                yield channel.render(event_id, arrivals, bus_numbers)
+                last_sent = time.time()
+            last_id = backlog[-1][0] if backlog else (last_event_id or 0)
+            
+            while True:
+                now = time.time()
+                if now - started >= SSE_CONFIG['MAX_STREAM_SECONDS']:
+                    # 브라우저 EventSource는 Last-Event-ID로 자동 재연결해 이어 받음
+                    subscription.reason = 'lifetime'
+                    yield 'event: reconnect\ndata: {}\n\n'
+                    return
+                if now - last_sent >= SSE_CONFIG['IDLE_TIMEOUT']:
+                    subscription.reason = 'idle'
+                    yield 'event: idle_timeout\ndata: {}\n\n'
+                    return
+                
+                with channel.cond:
+                    channel.cond.wait_for(lambda: channel.last_id > last_id, timeout=SSE_CONFIG['HEARTBEAT'])
+                    latest = channel.events[-1] if channel.events and channel.last_id > last_id else None
+                
+                if latest is None:
+                    # 프록시 유휴 타임아웃 방지 및 끊긴 연결 감지
+                    yield ': keepalive\n\n'
+                    continue
+                # 느린 구독자는 중간 이벤트를 건너뛰고 최신 이벤트만 받음
+                last_id = latest[0]
+                yield channel.render(latest[0], latest[1], bus_numbers)
+                last_sent = time.time()
+        finally:
+            self.close(subscription)
+    
+    def _on_arrivals(self, city_code: str, station_id: str, arrivals: List[Dict], fetched_at: float):
+        """다른 세션·프리페처가 조회한 도착 정보를 구독 중인 채널에 전달"""
+        channel = self._channels.get((city_code, station_id))
+        if channel is not None and channel.subscribers > 0:
+            channel.publish(arrivals, fetched_at)
+            channel.next_poll = time.time() + channel.interval()
+    
+    def _run(self):
+        while True:
+            time.sleep(SSE_CONFIG['POLL_TICK'])
+            now = time.time()
+            due = []
+            with self._lock:
+                for key, channel in list(self._channels.items()):
+                    if channel.subscribers == 0:
+                        # 재연결 이어 받기를 위해 잠시 유지한 뒤 정리
+                        if now - channel.emptied_at >= SSE_CONFIG['RESUME_GRACE']:
+                            del self._channels[key]
+                        continue
+                    if not channel.polling and now >= channel.next_poll:
+                        channel.polling = True
+                        due.append(channel)
+            
+            for channel in due:
+                get_fetch_executor().submit(self._poll, channel)
+    
+    def _poll(self, channel: _StationChannel):
+        """공용 도착 정보 캐시를 통해 조회 (새로 조회하면 리스너로도 전달됨)"""
+        try:
+            arrivals = get_default_client().get_bus_arrival_info(channel.station_id, channel.city_code)
+            channel.publish(arrivals, time.time())
+            with self._lock:
+                self.polls += 1
+        except Exception as e:
+            print(f'SSE 도착 정보 조회 실패 ({channel.city_code}, {channel.station_id}): {e}')
+            with self._lock:
+                self.poll_failures += 1
+        finally:
+            channel.next_poll = time.time() + channel.interval()
+            channel.polling = False
+    
+    def get_stats(self) -> Dict:
+        """SSE 스트림 통계"""
+        with self._lock:
+            return {
+                'connections': self.connections,
+                'channels': sum(1 for channel in self._channels.values() if channel.subscribers),
+                'rejected': self.rejected,
+                'resumed': self.resumed,
+                'polls': self.polls,
+                'poll_failures': self.poll_failures,
+                'closed': dict(self.closed)
+            }
+
+
+# 글로벌 SSE 스트림 허브 인스턴스
+arrival_stream_hub = ArrivalStreamHub()
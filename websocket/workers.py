@@ -1,30 +1,84 @@
 import threading
 import time
 from datetime import datetime
-from typing import Optional
-from config import Config
-from apis.tago_api import TAGOAPIClient
+from typing import List, Optional, Tuple
+from apis.tago_api import get_default_client
+from services.arrival_estimator import arrival_estimator
+from services.arrival_timeseries import arrival_timeseries
+from services.polling_policy import PollDecision, PollingPolicy, polling_policy as default_polling_policy
+from services.route_schedule import local_time
+from services.route_tracker import route_tracker
+from utils.concurrency import get_fetch_executor
+from utils.constants import MULTI_STOP_CONFIG, ROUTE_TRACKING_CONFIG, TAGO_API_CONFIG
+from utils.profiling import profiler
+from utils.tracing import tracer
+from .alerts import ThresholdAlerts
+from .codec import payload_codec
+from .prefetcher import arrival_prefetcher
+
+
+def rank_buses(client, buses: List[dict]) -> List[dict]:
+    """버스 번호별 가장 빠른 버스를 도착 시간 순으로 정렬 (워커·SSE 스트림 업데이트의 buses 항목)"""
+    fastest = {}
+    counts = {}
+    for bus in buses:
+        if bus.get('arrival_time', 0) <= 0:
+            continue
+        bus_number = str(bus['route_name']).strip()
+        counts[bus_number] = counts.get(bus_number, 0) + 1
+        if bus_number not in fastest or bus['arrival_time'] < fastest[bus_number]['arrival_time']:
+            fastest[bus_number] = bus
+    
+    ranked = sorted(fastest.items(), key=lambda item: item[1]['arrival_time'])
+    return [{
+        'bus_number': bus_number,
+        'arrival_time': bus['arrival_time'],
+        'arrival_time_formatted': client.format_arrival_time(bus['arrival_time']),
+        'remaining_stations': bus['remaining_stations'],
+        'vehicle_type': bus['vehicle_type'],
+        'route_type': bus['route_type'],
+        'bus_count': counts[bus_number]
+    } for bus_number, bus in ranked]
+
 
 class BusMonitoringWorker:
     """백그라운드 버스 모니터링 워커"""
     
     def __init__(self, session_id: str, lat: float, lng: float, 
-                 bus_number: str, interval: int, socketio, session_manager):
+                 bus_number: str, interval: int, socketio, session_manager,
+                 estimate_interval: int = 0, multi_stop: Optional[dict] = None,
+                 bus_numbers: Optional[Tuple[str, ...]] = None,
+                 polling_policy: Optional[PollingPolicy] = None, alerts: Optional[dict] = None,
+                 station_info: Optional[dict] = None, initial_delay: float = 0):
         self.session_id = session_id
         self.lat = lat
         self.lng = lng
-        self.bus_number = bus_number
+        self.bus_numbers = tuple(bus_numbers or (bus_number,))  # 구독 버스 번호 (실행 중 교체 가능)
         self.interval = interval
+        self.estimate_interval = estimate_interval  # 0이면 폴링 사이 추정 업데이트 없음
+        self.multi_stop = multi_stop  # {'k', 'radius'} 지정 시 가까운 정류소 여러 곳 동시 모니터링
         self.socketio = socketio
         self.session_manager = session_manager
         self.running = False
+        self.refresh_requested = False  # 구독 변경 등으로 다음 폴링을 앞당길 때 설정
         self.thread: Optional[threading.Thread] = None
+        self.station: Optional[dict] = None  # 최초 틱에서 확정된 현재 정류소
+        self.stations: List[dict] = []  # 모니터링 대상 정류소 (단일 모드는 현재 정류소 1곳)
+        self.last_update: Optional[dict] = None  # 마지막으로 버스를 찾은 폴링 결과
+        self.last_route_key: Optional[str] = None
+        self.route_id: Optional[str] = None  # 정류소 조회로 확인된 노선 ID (이후 노선 위치 조회에 사용)
+        self.vehicle_type = ''  # 마지막 정류소 조회의 차량 유형 (노선 위치 조회 결과에는 없음)
+        self.polling_policy = polling_policy or default_polling_policy  # 틱마다 조회 여부·대기 시간 결정
+        self.alerts = ThresholdAlerts(alerts) if alerts else None  # 지정 시 임계값을 넘을 때만 알림 전송
+        self.initial_delay = initial_delay  # 첫 조회 전 대기 (재시작 후 복원한 세션들의 첫 조회 분산)
         
-        # API 클라이언트 초기화
-        self.client = TAGOAPIClient(
-            api_key=Config.TAGO_API_KEY,
-            base_url=Config.TAGO_BASE_URL
-        )
+        # 복원한 세션은 저장된 정류소를 그대로 사용 (다중 정류소 모드는 대상 정류소 목록을 다시 조회)
+        if station_info and not multi_stop:
+            self.station = station_info
+            self.stations = [station_info]
+        
+        # 공용 API 클라이언트 사용 (연결 풀 공유)
+        self.client = get_default_client()
     
     def start(self):
         """워커 시작"""
@@ -35,62 +89,344 @@ class BusMonitoringWorker:
         self.thread = threading.Thread(target=self._worker_loop)
         self.thread.daemon = True
         self.thread.start()
-        print(f'모니터링 워커 시작: {self.session_id} - {self.bus_number}번')
+        print(f'모니터링 워커 시작: {self.session_id} - {self._bus_label()}번')
     
     def stop(self):
         """워커 중단"""
         self.running = False
-        print(f'모니터링 워커 중단: {self.session_id} - {self.bus_number}번')
+        arrival_prefetcher.cancel(self.session_id, owner=self)
+        print(f'모니터링 워커 중단: {self.session_id} - {self._bus_label()}번')
+    
+    def set_bus_numbers(self, bus_numbers: Tuple[str, ...]):
+        """구독 버스 번호 교체 (다음 틱부터 반영되며 대기 중이면 바로 새 업데이트 전송)"""
+        self.bus_numbers = tuple(bus_numbers)
+        if self.alerts:
+            self.alerts.forget(self.bus_numbers)
+        # 노선 추적은 단일 버스 기준이므로 번호가 바뀌면 다시 확인
+        self.route_id = None
+        self.refresh_requested = True
+    
+    def _bus_label(self, bus_numbers: Tuple[str, ...] = None) -> str:
+        return ', '.join(bus_numbers or self.bus_numbers)
     
     def _worker_loop(self):
         """메인 워커 루프"""
+        if self.initial_delay > 0:
+            self._wait_next_poll(self.initial_delay)
+        
         while self.running and self.session_manager.is_session_active(self.session_id):
             try:
-                # 버스 정보 조회 및 업데이트 전송
-                update_data = self._get_bus_update()
+                with tracer.root('worker.tick', session_id=self.session_id,
+                                 bus_numbers=','.join(self.bus_numbers)) as span:
+                    # 폴링 정책 확인 (운행 시간 외에는 TAGO 조회 없이 운행 없음 보고)
+                    self.refresh_requested = False
+                    decision = self.polling_policy.decide(self)
+                    span.set_attribute('suspended', decision.suspended)
                 
-                if update_data:
-                    self.socketio.emit('bus_update', update_data, room=self.session_id)
+                    # 버스 정보 조회 및 업데이트 전송
+                    if decision.suspended:
+                        update_data = self._get_no_service_update(decision)
+                    else:
+                        update_data = self._get_bus_update()
                 
-                # 다음 업데이트까지 대기
-                for _ in range(self.interval):
-                    if not self.running:
-                        break
-                    time.sleep(1)
+                    if update_data:
+                        if update_data.get('station_id'):
+                            span.set_attribute('station_id', update_data['station_id'])
+                        self._publish(update_data)
+                
+                    # 다음 틱 직전에 도착 정보가 갱신되도록 프리페처에 예약 (노선 추적 중이면 불필요)
+                    if self.running and self.stations and not self.route_id and not decision.suspended:
+                        arrival_prefetcher.schedule(self.session_id, self.stations, time.time() + decision.wait,
+                                                    owner=self)
+                
+                # 다음 폴링까지 대기 (추정 모드면 그 사이 추정 업데이트 전송)
+                self._wait_next_poll(decision.wait)
                 
             except Exception as e:
                 print(f'워커 에러 ({self.session_id}): {e}')
-                self.socketio.emit('error', {
-                    'message': f'모니터링 오류: {str(e)}'
-                }, room=self.session_id)
+                if self.running:
+                    self.socketio.emit('error', {
+                        'message': f'모니터링 오류: {str(e)}'
+                    }, room=self.session_id)
                 break
         
+        arrival_prefetcher.cancel(self.session_id, owner=self)
         print(f'모니터링 워커 종료: {self.session_id}')
     
+    @tracer.traced('worker.publish')
+    def _publish(self, update_data: dict):
+        """업데이트 전송 (알림 구독 시 임계값을 넘은 알림과 저빈도 전체 업데이트만 전송)"""
+        # 중단된(교체된) 워커가 틱 도중 만든 결과는 같은 세션 방의 새 워커 구독자에게 보내지 않음
+        if not self.running:
+            return
+        
+        if self.alerts is None:
+            payload_codec.emit(self.socketio, 'bus_update', update_data, self.session_id)
+            return
+        
+        for event, payload in self.alerts.evaluate(update_data):
+            payload_codec.emit(self.socketio, event, payload, self.session_id)
+    
+    def _wait_next_poll(self, wait: float):
+        """다음 폴링 시각까지 대기하며 필요하면 추정 업데이트 전송"""
+        next_poll = time.time() + wait
+        next_estimate = time.time() + self.estimate_interval if self.estimate_interval else None
+        
+        while self.running:
+            now = time.time()
+            if now >= next_poll or self.refresh_requested:
+                break
+            
+            if next_estimate and now >= next_estimate:
+                estimated_update = self._get_estimated_update()
+                if estimated_update:
+                    self._publish(estimated_update)
+                next_estimate += self.estimate_interval
+            
+            wake_at = min(next_poll, next_estimate) if next_estimate else next_poll
+            time.sleep(max(min(wake_at - now, 1), 0.05))
+    
+    def _get_estimated_update(self) -> Optional[dict]:
+        """마지막 관측 기반 추정 업데이트 데이터 생성"""
+        if not self.last_update or not self.last_route_key:
+            return None
+        
+        estimate = arrival_estimator.estimate(self.last_route_key, self.last_update['station_id'])
+        if not estimate:
+            return None
+        
+        return {
+            **self.last_update,
+            'timestamp': datetime.now().isoformat(),
+            'estimated': True,
+            'arrival_time': estimate['arrival_time'],
+            'arrival_time_formatted': self.client.format_arrival_time(estimate['arrival_time']),
+            'arrival_time_range': [estimate['arrival_time_low'], estimate['arrival_time_high']],
+            'remaining_stations': estimate['remaining_stations'],
+            'observed_at': datetime.fromtimestamp(estimate['observed_at']).isoformat()
+        }
+    
+    def _get_no_service_update(self, decision: PollDecision) -> dict:
+        """운행 시간 외 업데이트 데이터 생성 (TAGO 조회 없음)"""
+        self.last_update = None
+        bus_numbers = self.bus_numbers
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'bus_found': False,
+            'no_service': True,
+            'station_name': self.station['station_name'],
+            'station_id': self.station['station_id'],
+            'bus_number': bus_numbers[0],
+            'bus_numbers': list(bus_numbers),
+            'service_resumes_at': local_time(decision.resume_at).isoformat(),
+            'message': f'{self._bus_label(bus_numbers)}번 버스 {decision.reason}'
+        }
+    
+    def _resolve_station(self) -> Optional[dict]:
+        """현재 정류소 확정 (세션 위치는 고정이므로 최초 1회만 조회)"""
+        if self.station:
+            return self.station
+        
+        stations = self.client.get_stations_by_location(lng=self.lng, lat=self.lat)
+        if not stations:
+            return None
+        
+        current_station, _ = self.client.find_current_station(self.lat, self.lng, stations)
+        if current_station:
+            self.station = current_station
+            self.stations = [current_station]
+            self.session_manager.update_session_station_info(self.session_id, current_station, worker=self)
+        return current_station
+    
+    def _resolve_stations(self) -> List[dict]:
+        """다중 정류소 모드 대상 정류소 확정 (반경 내 가까운 k곳, 최초 1회만 조회)"""
+        if self.stations:
+            return self.stations
+        
+        stations = self.client.get_stations_by_location(lng=self.lng, lat=self.lat)
+        nearest = self.client.find_nearest_stations(
+            self.lat, self.lng, stations, k=self.multi_stop['k'], radius=self.multi_stop['radius']
+        )
+        if not nearest:
+            # 반경 안에 정류소가 없으면 가장 가까운 정류소 1곳이라도 모니터링
+            nearest = self.client.find_nearest_stations(self.lat, self.lng, stations, k=1)
+        
+        if nearest:
+            self.station = nearest[0]
+            self.stations = nearest
+            self.session_manager.update_session_station_info(self.session_id, nearest[0], worker=self)
+        return nearest
+    
+    def _get_station_buses(self, station: dict) -> List[dict]:
+        """
+        정류소의 대상 버스 도착 정보 조회
+        
+        노선이 확인된 뒤에는 노선 위치 조회 결과로 계산하고(같은 노선의 모든 세션이 공유),
+        정류소가 노선 경유 목록에 없거나 노선 위치 정보가 없거나 노선 조회가 실패하면 정류소별 도착 정보를 조회한다.
+        버스를 여러 대 구독 중이면 노선별 조회 대신 정류소 도착 정보 1회 조회를 번호로 걸러서 쓴다.
+        """
+        bus_numbers = self.bus_numbers
+        if self.route_id and len(bus_numbers) == 1 and ROUTE_TRACKING_CONFIG['ENABLED']:
+            try:
+                buses = route_tracker.get_arrivals(station['city_code'], self.route_id, station['station_id'])
+            except Exception as e:
+                print(f'노선 추적 실패 ({self.session_id}, {self.route_id}): {e}')
+                buses = None
+            
+            if buses is not None:
+                for bus in buses:
+                    bus['vehicle_type'] = self.vehicle_type
+                fastest_bus = self.client.find_fastest_bus(buses)
+                if fastest_bus:
+                    # 정류소 조회가 멈추므로 시계열·추정기는 노선 추적 결과로 기록
+                    arrival_timeseries.record_arrivals(station['city_code'], station['station_id'], buses,
+                                                       fastest_bus['located_at'])
+                    if self.estimate_interval:
+                        arrival_estimator.observe(self.route_id, station['station_id'], fastest_bus['arrival_time'],
+                                                  fastest_bus['remaining_stations'], fastest_bus['located_at'])
+                return buses
+        
+        buses = self.client.get_multiple_bus_arrival(
+            station_id=station['station_id'],
+            city_code=station['city_code'],
+            bus_numbers=bus_numbers
+        )
+        if len(bus_numbers) == 1 and self.bus_numbers is bus_numbers:
+            fastest_bus = self.client.find_fastest_bus(buses)
+            if fastest_bus and fastest_bus['route_id']:
+                self.vehicle_type = fastest_bus['vehicle_type']
+                if not self.route_id:
+                    self.route_id = fastest_bus['route_id']
+                    if ROUTE_TRACKING_CONFIG['ENABLED']:
+                        # 노선 추적 첫 틱의 도착 예정 시간이 이번 정류소 조회 결과에서 이어지도록
+                        route_tracker.seed(station['city_code'], self.route_id, fastest_bus['arrival_time'],
+                                           fastest_bus['remaining_stations'])
+        return buses
+    
+    def _rank_buses(self, buses: List[dict]) -> List[dict]:
+        """구독 버스 번호별 가장 빠른 버스를 도착 시간 순으로 정렬 (통합 업데이트의 buses 항목)"""
+        return rank_buses(self.client, buses)
+    
+    def _rank_candidates(self, candidates: List[dict]) -> List[dict]:
+        """
+        정류소별 후보 버스 순위 결정
+        
+        걸어가서 탈 수 있는 버스를 우선하고, 그 안에서는
+        탑승 가능 시각(도착·보행 시간 중 늦은 쪽)과 보행 시간을 합산한 값이 작은 순서로 정렬한다.
+        """
+        walk_weight = MULTI_STOP_CONFIG['WALK_WEIGHT']
+        return sorted(candidates, key=lambda c: (
+            not c['catchable'],
+            max(c['arrival_time'], c['walking_time']) + walk_weight * c['walking_time']
+        ))
+    
+    def _get_multi_stop_update(self) -> dict:
+        """다중 정류소 모드 업데이트 데이터 생성 (정류소별 조회는 동시에, 다른 세션과 공유)"""
+        stations = self._resolve_stations()
+        if not stations:
+            return {
+                'timestamp': datetime.now().isoformat(),
+                'error': '주변에 정류소가 없습니다'
+            }
+        
+        executor = get_fetch_executor()
+        futures = [
+            executor.submit(self._get_station_buses, station)
+            for station in stations
+        ]
+        
+        candidates = []
+        for station, future in zip(stations, futures):
+            try:
+                buses = future.result(timeout=TAGO_API_CONFIG['TIMEOUT'])
+            except Exception as e:
+                print(f'다중 정류소 조회 실패 ({self.session_id}, {station["station_id"]}): {e}')
+                continue
+            
+            fastest_bus = self.client.find_fastest_bus(buses)
+            if not fastest_bus:
+                continue
+            
+            walking_time = round(station['distance'] / MULTI_STOP_CONFIG['WALKING_SPEED'])
+            candidates.append({
+                'station_id': station['station_id'],
+                'station_name': station['station_name'],
+                'bus_number': str(fastest_bus['route_name']).strip(),
+                'distance': round(station['distance']),
+                'walking_time': walking_time,
+                'arrival_time': fastest_bus['arrival_time'],
+                'arrival_time_formatted': self.client.format_arrival_time(fastest_bus['arrival_time']),
+                'remaining_stations': fastest_bus['remaining_stations'],
+                'catchable': walking_time <= fastest_bus['arrival_time'],
+                '_bus': fastest_bus
+            })
+        
+        timestamp = datetime.now().isoformat()
+        
+        if not candidates:
+            self.last_update = None
+            return {
+                'timestamp': timestamp,
+                'bus_found': False,
+                'multi_stop': True,
+                'station_name': self.station['station_name'],
+                'station_id': self.station['station_id'],
+                'bus_number': self.bus_numbers[0],
+                'bus_numbers': list(self.bus_numbers),
+                'stations': [{'station_id': s['station_id'], 'station_name': s['station_name'],
+                              'distance': round(s['distance'])} for s in stations],
+                'message': f'주변 정류소 {len(stations)}곳에서 {self._bus_label()}번 버스를 찾을 수 없습니다'
+            }
+        
+        ranked = self._rank_candidates(candidates)
+        best = ranked[0]
+        best_bus = best.pop('_bus')
+        for candidate in ranked[1:]:
+            candidate.pop('_bus')
+        
+        self.last_route_key = best_bus['route_id'] or str(best_bus['route_name']).strip()
+        self.last_update = {
+            'timestamp': timestamp,
+            'bus_found': True,
+            'multi_stop': True,
+            'station_name': best['station_name'],
+            'station_id': best['station_id'],
+            'bus_number': best['bus_number'],
+            'bus_numbers': list(self.bus_numbers),
+            'arrival_time': best['arrival_time'],
+            'arrival_time_formatted': best['arrival_time_formatted'],
+            'remaining_stations': best['remaining_stations'],
+            'vehicle_type': best_bus['vehicle_type'],
+            'route_type': best_bus['route_type'],
+            'recommended_station': {
+                'station_id': best['station_id'],
+                'station_name': best['station_name'],
+                'distance': best['distance'],
+                'walking_time': best['walking_time']
+            },
+            'guidance': f"{best['station_name']} 정류소({best['distance']}m)에서 {best['bus_number']}번에 탑승하세요",
+            'candidates': ranked
+        }
+        return self.last_update
+    
+    @tracer.traced('worker.bus_update')
     def _get_bus_update(self) -> Optional[dict]:
         """버스 정보 업데이트 데이터 생성"""
         try:
-            # 1. 현재 정류소 찾기
-            stations = self.client.get_stations_by_location(lng=self.lng, lat=self.lat)
-            if not stations:
-                return {
-                    'timestamp': datetime.now().isoformat(),
-                    'error': '주변에 정류소가 없습니다'
-                }
+            if self.multi_stop:
+                return self._get_multi_stop_update()
             
-            current_station, _ = self.client.find_current_station(self.lat, self.lng, stations)
+            # 1. 현재 정류소 찾기 (최초 틱 이후에는 확정된 정류소 재사용)
+            current_station = self._resolve_station()
             if not current_station:
                 return {
                     'timestamp': datetime.now().isoformat(),
-                    'error': '현재 정류소를 찾을 수 없습니다'
+                    'error': '주변에 정류소가 없습니다'
                 }
             
-            # 2. 특정 버스 정보 조회
-            specific_buses = self.client.get_specific_bus_arrival(
-                station_id=current_station['station_id'],
-                city_code=current_station['city_code'],
-                target_bus_number=self.bus_number
-            )
+            # 2. 구독 버스 정보 조회 (프리페처가 데워 둔 캐시 또는 노선 위치 추적 사용)
+            bus_numbers = self.bus_numbers
+            specific_buses = self._get_station_buses(current_station)
             
             # 3. 업데이트 데이터 구성
             timestamp = datetime.now().isoformat()
@@ -101,32 +437,41 @@ class BusMonitoringWorker:
                 if fastest_bus:
                     formatted_time = self.client.format_arrival_time(fastest_bus['arrival_time'])
                     
-                    return {
+                    self.last_route_key = fastest_bus['route_id'] or str(fastest_bus['route_name']).strip()
+                    self.last_update = {
                         'timestamp': timestamp,
                         'bus_found': True,
                         'station_name': current_station['station_name'],
                         'station_id': current_station['station_id'],
-                        'bus_number': self.bus_number,
+                        'bus_number': str(fastest_bus['route_name']).strip(),
+                        'bus_numbers': list(bus_numbers),
                         'arrival_time': fastest_bus['arrival_time'],
                         'arrival_time_formatted': formatted_time,
                         'remaining_stations': fastest_bus['remaining_stations'],
                         'vehicle_type': fastest_bus['vehicle_type'],
                         'route_type': fastest_bus['route_type'],
-                        'total_buses': len(specific_buses)
+                        'total_buses': len(specific_buses),
+                        'buses': self._rank_buses(specific_buses)
                     }
+                    return self.last_update
             
             # 버스를 찾지 못한 경우
+            self.last_update = None
             return {
                 'timestamp': timestamp,
                 'bus_found': False,
                 'station_name': current_station['station_name'],
                 'station_id': current_station['station_id'],
-                'bus_number': self.bus_number,
-                'message': f'{self.bus_number}번 버스를 찾을 수 없습니다'
+                'bus_number': bus_numbers[0],
+                'bus_numbers': list(bus_numbers),
+                'message': f'{self._bus_label(bus_numbers)}번 버스를 찾을 수 없습니다'
             }
             
         except Exception as e:
             return {
                 'timestamp': datetime.now().isoformat(),
                 'error': f'버스 정보 조회 실패: {str(e)}'
-            }
\ No newline at end of file
+            }
+
+# 워커 틱을 온디맨드 프로파일링 대상으로 등록 (프로파일링 중에만 래핑됨)
+profiler.register_target('bus_update', BusMonitoringWorker, '_get_bus_update')
@@ -0,0 +1,17 @@
+# wsgi.py
+"""
+WSGI 서버 진입점
+
+    gunicorn -k eventlet -w 1 wsgi:app
+
+워커 프로세스가 이 모듈을 import할 때 앱을 만들고 그 프로세스의 startup()을 실행한다.
+마스터에서 앱을 미리 만드는 경우(gunicorn --preload)에는 fork된 워커에서 startup()이 다시
+실행되도록 post_fork 훅을 함께 지정한다 (gunicorn -c python:wsgi --preload wsgi:app).
+"""
+
+from app import app, startup  # 처음 참조할 때 앱 생성과 이 프로세스의 startup() 실행
+
+
+def post_fork(server, worker):
+    """gunicorn 훅: 마스터에서 fork된 워커 프로세스마다 startup() 실행"""
+    startup(app)